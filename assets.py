@@ -0,0 +1,254 @@
+"""
+进程级共享资源缓存：
+- 头像按 (路径, 尺寸) 解码并缩放一次后复用，渲染器和 GUI 缩略图共用；
+  界面调用 enable_disk_cache() 后，缩放结果另存到仓库目录下的 .cache/thumbs，下次启动直接读取小图；
+- 字体在进程内只探测一次系统路径，FreeTypeFont 按 (路径, 字号) 复用。
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageFont
+
+from profiling import span
+
+
+DEFAULT_THUMB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "thumbs")
+
+
+class ThumbnailStore:
+    """磁盘缩略图缓存：文件名由 (绝对路径, mtime, 尺寸) 哈希得到，原图变化后自然换新文件"""
+
+    def __init__(self, directory=DEFAULT_THUMB_DIR):
+        self.directory = directory
+
+    def _file(self, abspath, mtime, size):
+        key = hashlib.sha1(f"{abspath}|{mtime}|{size[0]}x{size[1]}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".png")
+
+    def load(self, abspath, mtime, size):
+        try:
+            with Image.open(self._file(abspath, mtime, size)) as f:
+                img = f.convert("RGBA")
+        except (OSError, ValueError):
+            return None
+        return img if img.size == tuple(size) else None
+
+    def save(self, abspath, mtime, size, img):
+        """写入缩略图 (先写临时文件再改名)；目录不可写或编码失败时静默跳过，不留下临时文件"""
+        tmp = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=".png", dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, "PNG", compress_level=1)
+            os.replace(tmp, self._file(abspath, mtime, size))
+            tmp = None
+        except (OSError, ValueError):
+            pass
+        finally:
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+
+class AvatarCache:
+    """
+    LRU 头像缓存，键为 (绝对路径, 尺寸)。
+    每次取用时比对文件 mtime，文件被替换后自动失效重新加载。
+    返回的图片是共享对象，调用方只读使用 (paste / PhotoImage)，不要原地修改。
+    disk 为 ThumbnailStore 时，内存未命中先查磁盘缩略图，解码缩放后也写回磁盘。
+    """
+
+    def __init__(self, maxsize=256, disk=None):
+        self.maxsize = maxsize
+        self.disk = disk
+        self._items = OrderedDict()  # key -> (mtime, image or None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, size):
+        """取 RGBA 头像，文件不存在或无法解码时返回 None"""
+        if not path:
+            return None
+        if isinstance(size, int):
+            size = (size, size)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        key = (os.path.abspath(path), tuple(size))
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        # 锁外解码，避免阻塞其他线程
+        img = self.disk.load(key[0], mtime, size) if self.disk is not None else None
+        if img is None:
+            with span("avatar_decode", path=path):
+                try:
+                    with Image.open(path) as raw:
+                        img = raw.convert("RGBA").resize(size, Image.LANCZOS)
+                except Exception:
+                    img = None  # 解码失败也记下来，同一版本的文件不再重试
+            if img is not None and self.disk is not None:
+                self.disk.save(key[0], mtime, size, img)
+
+        with self._lock:
+            self.misses += 1
+            self._items[key] = (mtime, img)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return img
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ImageLRU:
+    """按像素字节数限额的通用图片 LRU 缓存 (用于渲染好的行图块等)"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # key -> image
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size_of(img):
+        return img.width * img.height * len(img.getbands())
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return img
+
+    def put(self, key, img):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size_of(old)
+            self._items[key] = img
+            self._bytes += self._size_of(img)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= self._size_of(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+# 常见的系统中文字体路径 (Windows/Mac/Linux)，按优先级排列
+SYSTEM_FONTS = [
+    "msyh.ttc", "simhei.ttf", "arialuni.ttf",  # Windows
+    "/System/Library/Fonts/PingFang.ttc",      # MacOS
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf" # Linux
+]
+
+# 所有候选都不可用时的标记，对应 ImageFont.load_default()
+DEFAULT_FONT = "<default>"
+
+
+class FontRegistry:
+    """
+    字体注册表：每个请求路径只解析一次 (用户路径 -> 系统字体 -> 默认字体)，
+    之后按 (实际路径, 字号) 直接返回已加载的字体对象，重绘时不再探测文件系统。
+    """
+
+    def __init__(self, system_fonts=None):
+        self.system_fonts = list(system_fonts if system_fonts is not None else SYSTEM_FONTS)
+        self._resolved = {}  # 请求的 font_path -> 实际使用的路径
+        self._fonts = {}     # (实际路径, 字号) -> FreeTypeFont
+        self._lock = threading.Lock()
+
+    def resolve(self, font_path=None):
+        """返回实际使用的字体路径，找不到可用字体时返回 DEFAULT_FONT"""
+        with self._lock:
+            if font_path in self._resolved:
+                return self._resolved[font_path]
+
+        chosen = DEFAULT_FONT
+        if font_path and os.path.exists(font_path):
+            chosen = font_path
+        else:
+            with span("font_resolve"):
+                for f in self.system_fonts:
+                    try:
+                        font = ImageFont.truetype(f, 16)
+                    except Exception:
+                        continue
+                    chosen = f
+                    with self._lock:
+                        self._fonts[(f, 16)] = font
+                    break
+
+        with self._lock:
+            self._resolved[font_path] = chosen
+        return chosen
+
+    def get(self, font_path=None, size=16):
+        """取指定字号的字体"""
+        path = self.resolve(font_path)
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+        if font is not None:
+            return font
+
+        with span("font_load", path=path, size=size):
+            if path == DEFAULT_FONT:
+                font = ImageFont.load_default()
+            else:
+                font = ImageFont.truetype(path, size)
+        with self._lock:
+            self._fonts[key] = font
+        return font
+
+    def describe(self, font_path=None):
+        """返回一行说明当前使用的字体，用于界面或日志展示"""
+        path = self.resolve(font_path)
+        if path == DEFAULT_FONT:
+            return "默认字体 (不支持中文)"
+        return f"字体: {path}"
+
+    def clear(self):
+        with self._lock:
+            self._resolved.clear()
+            self._fonts.clear()
+
+
+# 全局共享实例
+avatar_cache = AvatarCache()
+font_registry = FontRegistry()
+
+
+def enable_disk_cache(directory=DEFAULT_THUMB_DIR):
+    """让全局头像缓存同时使用磁盘缩略图 (只由界面在启动时调用，命令行与服务不写磁盘)"""
+    avatar_cache.disk = ThumbnailStore(directory)
+
+
+def get_avatar(path, size):
+    """从全局缓存取头像"""
+    return avatar_cache.get(path, size)
@@ -0,0 +1,236 @@
+"""
+批量扫描 (无界面)：在进程池中遍历
+“候选子集 × 触发次数 × 目标回合 × 速度/金数区间”，把结果逐行写入 CSV 或 JSONL，不生成图片。
+
+用法示例：
+    python batch.py -o sweep.csv --times 1-10 --moves 4-8 --min-subset 3
+    python batch.py -o sweep.jsonl --speed-range 100:160 --speed-range 160:300 --cost-range 0:3
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import CONSTANTS, evaluate_teams
+from relics import default_odds
+from roster import load_roster
+
+FIELDS = [
+    "subset", "times", "min_spd", "max_spd", "min_cost", "max_cost",
+    "team", "moves", "speed", "cost", "advance_pct", "spd_pct",
+]
+# --odds 时追加：随机遗器达成所需速度的概率、期望速度词条数 (见 relics.py)
+ODDS_FIELDS = ["hit_rate", "rolls"]
+
+
+def parse_int_list(spec: str):
+    """解析 "1-10" / "4,5,8" / "1-3,6" 形式的整数列表"""
+    values = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            values.extend(range(int(lo), int(hi) + 1))
+        else:
+            values.append(int(part))
+    return sorted(set(values))
+
+
+def parse_range(spec: str):
+    """解析 "MIN:MAX" 形式的区间"""
+    lo, hi = spec.split(":", 1)
+    return float(lo), float(hi)
+
+
+def load_candidates(path=None):
+    """读取候选角色 JSON ({名字: 数据})；不指定时使用 roster.json"""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return load_roster().candidates()
+
+
+def iter_times_configs(candidates: dict, times_values):
+    """
+    遍历触发次数组合。times 只影响拉条不为 0 的角色，其余角色固定为原值，
+    避免生成结果完全相同的重复场景。
+    """
+    varied = [name for name, d in candidates.items() if d["advance"] != 0]
+    for combo in itertools.product(times_values, repeat=len(varied)):
+        yield dict(zip(varied, combo))
+
+
+def iter_subset_masks(n: int, min_size: int, max_size: int):
+    """按大小遍历候选子集，以位掩码表示 (第 i 位对应第 i 个角色)"""
+    for k in range(min_size, max_size + 1):
+        for idx in itertools.combinations(range(n), k):
+            yield sum(1 << i for i in idx)
+
+
+def _subset_label(names, mask: int):
+    return "|".join(name for i, name in enumerate(names) if mask >> i & 1)
+
+
+def sweep_chunk(task):
+    """
+    进程池任务：一个 times 组合 × 一批子集。
+    整个候选表只批量计算一次，各子集与各区间都只是在结果上做掩码。
+    """
+    candidates, times_cfg, subset_masks, moves, speed_ranges, cost_ranges, constants, with_odds = task
+    cands = {name: dict(d, times=times_cfg.get(name, d.get("times", 1))) for name, d in candidates.items()}
+    ev = evaluate_teams(cands, moves, filter_settings={"max_spd": float("inf"), "max_cost": sys.maxsize},
+                        constants=constants)
+
+    names = ev.roster.names
+    team_bits = np.bitwise_or.reduce(np.left_shift(np.uint64(1), ev.teams.astype(np.uint64)), axis=1) \
+        if len(ev.teams) else np.empty(0, dtype=np.uint64)
+    times_label = ";".join(f"{name}={t}" for name, t in times_cfg.items())
+    if with_odds:
+        # 每个进程各自抽样一次 (固定种子，结果一致)，整张速度表一次查询
+        odds = default_odds()
+        hit_rate = np.round(odds.hit_rate(ev.speed), 6)
+        rolls = np.round(odds.expected_rolls(ev.speed), 3)
+
+    rows = []
+    for mask in subset_masks:
+        in_subset = (team_bits & np.uint64(~mask & (2 ** 64 - 1))) == 0
+        subset_label = _subset_label(names, mask)
+        for min_spd, max_spd in speed_ranges:
+            for min_cost, max_cost in cost_ranges:
+                keep = (ev.speed >= min_spd) & (ev.speed <= max_spd)
+                keep &= (in_subset & (ev.cost >= min_cost) & (ev.cost <= max_cost))[:, None]
+                team_idx, move_idx = np.nonzero(keep)
+                order = np.argsort(-ev.cost[team_idx], kind="stable")
+                for t, m in zip(team_idx[order].tolist(), move_idx[order].tolist()):
+                    row = (
+                        subset_label, times_label, min_spd, max_spd, min_cost, max_cost,
+                        "|".join(names[i] for i in ev.teams[t]),
+                        int(ev.moves[m]),
+                        round(float(ev.speed[t, m]), 4),
+                        int(ev.cost[t]),
+                        round(float(ev.total_advance[t]) * 100, 4),
+                        round(float(ev.total_spd_pct[t]) * 100, 4),
+                    )
+                    if with_odds:
+                        row += (float(hit_rate[t, m]), float(rolls[t, m]))
+                    rows.append(row)
+    return rows
+
+
+def iter_tasks(candidates, times_values, moves, speed_ranges, cost_ranges,
+               min_subset, max_subset, chunk_subsets, constants=None, with_odds=False):
+    """生成进程池任务，每个任务最多包含 chunk_subsets 个子集"""
+    n = len(candidates)
+    for times_cfg in iter_times_configs(candidates, times_values):
+        masks = iter_subset_masks(n, min_subset, max_subset)
+        while True:
+            chunk = list(itertools.islice(masks, chunk_subsets))
+            if not chunk:
+                break
+            yield (candidates, times_cfg, chunk, moves, speed_ranges, cost_ranges, constants or CONSTANTS, with_odds)
+
+
+class RowWriter:
+    """按扩展名或 fmt 选择 CSV / JSONL，逐行写出"""
+
+    def __init__(self, f, fmt="csv", fields=FIELDS):
+        self.fmt = fmt
+        self.f = f
+        self.fields = fields
+        if fmt == "csv":
+            self._csv = csv.writer(f)
+            self._csv.writerow(fields)
+
+    def write_rows(self, rows):
+        if self.fmt == "csv":
+            self._csv.writerows(rows)
+        else:
+            for row in rows:
+                self.f.write(json.dumps(dict(zip(self.fields, row)), ensure_ascii=False) + "\n")
+
+
+def run_sweep(tasks, writer: RowWriter, workers=None):
+    """执行任务并按提交顺序流式写出，同时在途的任务数有上限，内存占用保持平稳"""
+    n_rows = 0
+    if workers == 0:
+        for task in tasks:
+            rows = sweep_chunk(task)
+            writer.write_rows(rows)
+            n_rows += len(rows)
+        return n_rows
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = (workers or os.cpu_count() or 1) * 4
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(sweep_chunk, task))
+            if len(pending) >= window:
+                rows = pending.popleft().result()
+                writer.write_rows(rows)
+                n_rows += len(rows)
+        while pending:
+            rows = pending.popleft().result()
+            writer.write_rows(rows)
+            n_rows += len(rows)
+    return n_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="流萤配队速度批量扫描 (输出 CSV / JSONL)")
+    parser.add_argument("-o", "--output", default="-", help="输出文件，- 表示标准输出")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="输出格式，默认按扩展名判断")
+    parser.add_argument("--candidates", help="候选角色 JSON 文件，默认使用界面配置")
+    parser.add_argument("--times", default="1", help="拉条角色的触发次数，如 1-10")
+    parser.add_argument("--moves", default="4-8", help="目标回合，如 4-8 或 4,5")
+    parser.add_argument("--min-subset", type=int, help="候选子集最小人数 (默认全体)")
+    parser.add_argument("--max-subset", type=int, help="候选子集最大人数 (默认全体)")
+    parser.add_argument("--speed-range", action="append", type=parse_range,
+                        help="面板速度区间 MIN:MAX，可重复 (默认 0:999)")
+    parser.add_argument("--cost-range", action="append", type=parse_range,
+                        help="金数区间 MIN:MAX，可重复 (默认 0:99)")
+    parser.add_argument("--workers", type=int, help="进程数，0 表示不用进程池 (默认 CPU 核数)")
+    parser.add_argument("--chunk-subsets", type=int, default=64, help="每个任务包含的子集数")
+    parser.add_argument("--odds", action="store_true", help="追加随机遗器的速度达成率与期望速度词条数")
+    args = parser.parse_args(argv)
+
+    candidates = load_candidates(args.candidates)
+    n = len(candidates)
+    min_subset = args.min_subset if args.min_subset is not None else n
+    max_subset = args.max_subset if args.max_subset is not None else n
+    if min_subset < n and n > 64:
+        parser.error("子集扫描最多支持 64 个候选角色")
+
+    fmt = args.format or ("jsonl" if args.output.endswith((".jsonl", ".json")) else "csv")
+    tasks = iter_tasks(
+        candidates,
+        times_values=parse_int_list(args.times),
+        moves=parse_int_list(args.moves),
+        speed_ranges=args.speed_range or [(0.0, 999.0)],
+        cost_ranges=args.cost_range or [(0.0, 99.0)],
+        min_subset=min_subset,
+        max_subset=max_subset,
+        chunk_subsets=args.chunk_subsets,
+        with_odds=args.odds,
+    )
+    fields = FIELDS + ODDS_FIELDS if args.odds else FIELDS
+
+    t0 = time.perf_counter()
+    if args.output == "-":
+        n_rows = run_sweep(tasks, RowWriter(sys.stdout, fmt, fields), args.workers)
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            n_rows = run_sweep(tasks, RowWriter(f, fmt, fields), args.workers)
+    print(f"完成: {n_rows} 行, 用时 {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+性能基准：用可复现的合成候选表 (8 / 32 / 128 / 512 人) 分阶段计时
+配队枚举、速度计算、筛选、排序、行绘制与 PNG 编码，并记录峰值内存 (进程 RSS)。
+
+结果保存为 JSON，可与其他提交的结果对比：
+    python bench.py -o bench_new.json
+    python bench.py -o bench_new.json --compare bench_old.json
+
+配队 × 回合总行数超过 --vector-limit 时改用流式管线 (result_stream)，
+避免一次性分配过大的数组，对应用例的 mode 记为 "streamed"。
+"""
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import PIL
+
+import speed
+from engine import CONSTANTS, TeamEvaluation, pack_roster, parse_filter_settings, required_speed, valid_teams
+from result_stream import iter_result_batches, iter_team_batches, top_k
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不测内存
+    resource = None
+
+BENCH_VERSION = 2
+DEFAULT_FILTER = {"min_spd": 100, "max_spd": 300, "min_cost": 0, "max_cost": 11}
+
+
+def synthetic_roster(n, times=1, seed=0):
+    """可复现的合成候选表：约四分之一角色与他人共享 base，拉条角色统一使用给定的 times"""
+    rng = random.Random(seed * 100003 + n)
+    n_bases = max(3, n * 3 // 4)
+    roster = {}
+    for i in range(n):
+        advance = rng.choice([0.0, 0.0, 0.2, 0.24])
+        roster[f"c{i:03d}" + ("555" if i % 11 == 0 else "")] = {
+            "spd_pct": rng.choice([0.0, 0.0, 0.1, 0.3]),
+            "advance": advance,
+            "base": f"b{i % n_bases}",
+            "cost": rng.randint(0, 7),
+            "times": times if advance else 1,
+        }
+    return roster
+
+
+class PhaseTimer:
+    """按阶段累计耗时 (毫秒)"""
+
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds * 1000
+
+    def run(self, name, func, *args, **kwargs):
+        t0 = time.perf_counter()
+        out = func(*args, **kwargs)
+        self.add(name, time.perf_counter() - t0)
+        return out
+
+
+def _bench_vectorized(candidates, moves, timer, rows):
+    """与 engine.evaluate_teams 相同的步骤，逐步计时"""
+    roster = timer.run("enumerate", pack_roster, candidates)
+    teams = timer.run("enumerate", valid_teams, roster)
+
+    t0 = time.perf_counter()
+    total_advance = (roster.advance[teams] * roster.times[teams]).sum(axis=1)
+    total_spd_pct = roster.spd_pct[teams].sum(axis=1)
+    cost = roster.cost[teams].sum(axis=1)
+    mv = np.asarray(moves, dtype=np.float64)
+    spd = required_speed(total_advance[:, None], total_spd_pct[:, None], mv[None, :], CONSTANTS)
+    timer.add("evaluate", time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    f_min_spd, f_max_spd, f_min_cost, f_max_cost = parse_filter_settings(DEFAULT_FILTER)
+    mask = (spd >= f_min_spd) & (spd <= f_max_spd)
+    mask &= ((cost >= f_min_cost) & (cost <= f_max_cost))[:, None]
+    t_idx, m_idx = np.nonzero(mask)
+    timer.add("filter", time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    order = np.argsort(-cost[t_idx], kind="stable")
+    timer.add("sort", time.perf_counter() - t0)
+
+    # 取排序后的前 rows 条给绘制阶段使用 (不计时)
+    top = np.zeros_like(mask)
+    top[t_idx[order[:rows]], m_idx[order[:rows]]] = True
+    ev = TeamEvaluation(roster, teams, mv.astype(np.int64), total_advance, total_spd_pct, cost, spd, top)
+    return len(teams), len(order), ev.to_results()
+
+
+def _bench_streamed(candidates, moves, timer, rows):
+    """流式管线：枚举单独计时一遍，再计时 计算 + 筛选 与有界堆排序"""
+    roster = pack_roster(candidates)
+    t0 = time.perf_counter()
+    n_teams = sum(len(t) for t in iter_team_batches(roster))
+    timer.add("enumerate", time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    n_rows = sum(len(b["seq"]) for b in iter_result_batches(roster, moves, DEFAULT_FILTER, CONSTANTS))
+    timer.add("evaluate+filter", time.perf_counter() - t0)
+
+    results = timer.run("sort", top_k, roster, rows, "cost", target_moves_list=moves,
+                        filter_settings=DEFAULT_FILTER, constants=CONSTANTS)
+    return n_teams, n_rows, results
+
+
+def _bench_render(candidates, results, timer):
+    """绘制排序后的前若干行 (清空行缓存与精灵缓存，冷启动) 并编码 PNG"""
+    speed.row_tile_cache.clear()
+    speed.sprite_cache.clear()
+
+    t0 = time.perf_counter()
+    for r in results:
+        speed.render_row_tile(r, candidates)
+    timer.add("draw_rows", time.perf_counter() - t0)
+
+    img = timer.run("compose", speed.generate_team_image_table, candidates, provided_results=results)
+    buf = io.BytesIO()
+    timer.run("png_encode", img.save, buf, format="PNG")
+    return len(results), buf.tell()
+
+
+def _run_once(candidates, mode, moves, rows, timer):
+    if mode == "vectorized":
+        n_teams, n_results, top = _bench_vectorized(candidates, moves, timer, rows)
+    else:
+        n_teams, n_results, top = _bench_streamed(candidates, moves, timer, rows)
+    return (n_teams, n_results) + _bench_render(candidates, top, timer)
+
+
+def _max_rss_mb():
+    """
+    本进程到目前为止的峰值 RSS (MB)。
+    Linux 读 /proc 的 VmHWM：ru_maxrss 会在 fork / exec 时继承父进程的值，子进程里读不准。
+    其他平台用 ru_maxrss (macOS 单位为字节)。
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (2 ** 20 if sys.platform == "darwin" else 1024)
+
+
+def _memory_child(args):
+    """
+    子进程任务：跑一遍用例，返回 (开始前峰值 RSS, 结束后峰值 RSS)。
+    RSS 包含 NumPy 数组与 Pillow 图像缓冲区，这些不经过 Python 分配器，tracemalloc 看不到。
+    """
+    n, times, moves, rows, mode, seed = args
+    before = _max_rss_mb()
+    _run_once(synthetic_roster(n, times, seed), mode, moves, rows, PhaseTimer())
+    return before, _max_rss_mb()
+
+
+def measure_peak_rss(n, times, moves, rows, mode, seed=0):
+    """在全新的子进程 (spawn) 中跑一遍用例，返回 (基线 MB, 峰值 MB)；不支持的平台返回 (None, None)"""
+    if resource is None:
+        return None, None
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_memory_child, (n, times, tuple(moves), rows, mode, seed)).result()
+
+
+def run_case(n, times, moves, rows, vector_limit, seed=0, measure_memory=True):
+    candidates = synthetic_roster(n, times, seed)
+    timer = PhaseTimer()
+    n_combos = math.comb(n, 3) * len(moves)
+    mode = "vectorized" if n_combos <= vector_limit else "streamed"
+
+    t0 = time.perf_counter()
+    n_teams, n_results, drawn, png_bytes = _run_once(candidates, mode, moves, rows, timer)
+    total = time.perf_counter() - t0
+
+    # 内存在独立子进程中测：峰值 RSS 不受本进程之前用例的影响，也不拖慢计时
+    base_rss, peak_rss = measure_peak_rss(n, times, moves, rows, mode, seed) if measure_memory else (None, None)
+
+    return {
+        "name": f"n{n}-t{times}-m{'_'.join(map(str, moves))}",
+        "candidates": n,
+        "times": times,
+        "moves": list(moves),
+        "mode": mode,
+        "teams": int(n_teams),
+        "results": int(n_results),
+        "rows_drawn": drawn,
+        "png_bytes": png_bytes,
+        "phases_ms": {k: round(v, 3) for k, v in timer.phases.items()},
+        "total_ms": round(total * 1000, 3),
+        "base_rss_mb": round(base_rss, 2) if base_rss is not None else None,
+        "peak_rss_mb": round(peak_rss, 2) if peak_rss is not None else None,
+    }
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(new, old):
+    """按用例名对比两份结果，打印各阶段耗时比值 (新 / 旧)"""
+    old_cases = {c["name"]: c for c in old["cases"]}
+    print(f"{'case':<22}{'phase':<18}{'old ms':>10}{'new ms':>10}{'ratio':>8}")
+    for case in new["cases"]:
+        prev = old_cases.get(case["name"])
+        if prev is None:
+            continue
+        for phase, ms in list(case["phases_ms"].items()) + [("total", case["total_ms"])]:
+            before = prev["phases_ms"].get(phase) if phase != "total" else prev["total_ms"]
+            if before:
+                print(f"{case['name']:<22}{phase:<18}{before:>10.1f}{ms:>10.1f}{ms / before:>8.2f}")
+
+
+def main(argv=None):
+    from batch import parse_int_list
+
+    parser = argparse.ArgumentParser(description="计算引擎与表格渲染的性能基准")
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    parser.add_argument("--sizes", default="8,32,128,512", help="候选人数列表")
+    parser.add_argument("--times", default="1,3", help="拉条角色的触发次数列表")
+    parser.add_argument("--moves", action="append", help="目标回合集合，可重复 (默认 4,5 与 4-8)")
+    parser.add_argument("--rows", type=int, default=200, help="绘制与编码的结果行数")
+    parser.add_argument("--vector-limit", type=int, default=5_000_000,
+                        help="配队 × 回合总数超过该值时改用流式管线")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="跳过峰值内存测量 (省去子进程中的第二遍运行)")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    args = parser.parse_args(argv)
+
+    move_sets = [parse_int_list(m) for m in (args.moves or ["4,5", "4-8"])]
+    report = {
+        "version": BENCH_VERSION,
+        "meta": {
+            "git": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "rows": args.rows,
+        },
+        "cases": [],
+    }
+
+    for n in parse_int_list(args.sizes):
+        for times in parse_int_list(args.times):
+            for moves in move_sets:
+                case = run_case(n, times, moves, args.rows, args.vector_limit, args.seed,
+                                measure_memory=not args.no_memory)
+                report["cases"].append(case)
+                phases = "  ".join(f"{k}={v:.1f}" for k, v in case["phases_ms"].items())
+                peak = ("-" if case["peak_rss_mb"] is None
+                        else f"{case['peak_rss_mb']:.1f}MB (+{case['peak_rss_mb'] - case['base_rss_mb']:.1f})")
+                print(f"{case['name']:<22}{case['mode']:<11}{case['total_ms']:>10.1f}ms "
+                      f"peak {peak}  {phases}", file=sys.stderr)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
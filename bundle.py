@@ -0,0 +1,119 @@
+"""
+为 index.html 预先计算结果包，网页按需下载，不再每次点击都在 JS 里枚举组合。
+
+结果只取决于“配队成员 + 成员的触发次数 + 目标回合”，与勾选了哪些候选无关：
+勾选子集只是去掉含未勾选角色的配队。所以只对全体角色算一次，
+每行带上成员下标，网页用勾选状态过滤即可覆盖所有子集，不必为每个子集 (2^n 个) 各存一份。
+
+输出目录结构：
+    manifest.json            角色、全部配队 (按金数降序)、各配队金数 / 速加、可选 times 与回合
+    t1-2-1_m5.json ...       某个 times 组合 × 某个回合：每个配队的全队拉条与所需速度 (列式数组)
+
+times 只影响拉条不为 0 的角色 (manifest 的 varied)，文件名中的数字按 varied 的顺序排列。
+数值都是紧凑的列式数组，适合 gzip。
+
+用法示例：
+    python bundle.py                         # times 1-3，回合 4-8，输出到 web_bundle/
+    python bundle.py --times 1-5 --moves 4-10 --max-files 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from batch import iter_times_configs, parse_int_list
+from engine import TEAM_SIZE, evaluate_teams
+from roster import load_roster
+
+BUNDLE_VERSION = 1
+DEFAULT_BUNDLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_bundle")
+
+
+def chunk_name(times_cfg: dict, varied, moves: int) -> str:
+    """结果块文件名，与 index.html 中 chunkName() 的规则一致"""
+    code = "-".join(str(times_cfg[name]) for name in varied) or "0"
+    return f"t{code}_m{moves}.json"
+
+
+def _dump(path, obj):
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def export_bundle(roster=None, out_dir=DEFAULT_BUNDLE_DIR, times_values=(1, 2, 3), moves=(4, 5, 6, 7, 8),
+                  max_files=2000, team_size=TEAM_SIZE):
+    """
+    写出 manifest.json 与全部结果块，返回 (文件数, 总字节数)。
+    结果块数量 (times 组合数 × 回合数) 超过 max_files 时抛出 ValueError，不写任何文件。
+    """
+    roster = roster or load_roster()
+    candidates = roster.candidates()
+    names = list(candidates)
+    varied = [name for name, d in candidates.items() if d["advance"] != 0]
+    times_values = sorted(set(times_values))
+    moves = sorted(set(moves))
+
+    n_files = len(times_values) ** len(varied) * len(moves)
+    if n_files > max_files:
+        raise ValueError(f"需要写出 {n_files} 个结果块，超过上限 {max_files}；请减少 --times 取值或调大 --max-files")
+
+    os.makedirs(out_dir, exist_ok=True)
+    no_filter = {"max_spd": float("inf"), "max_cost": sys.maxsize}
+    base = evaluate_teams(candidates, moves, no_filter, roster.constants, team_size)
+    # 配队顺序：金数降序的稳定排序 (与 to_results 一致)，各结果块的数组下标都指向这个顺序
+    order = np.argsort(-base.cost, kind="stable")
+
+    total_bytes = 0
+    for times_cfg in iter_times_configs(candidates, times_values):
+        cands = {name: dict(d, times=times_cfg.get(name, d["times"])) for name, d in candidates.items()}
+        ev = evaluate_teams(cands, moves, no_filter, roster.constants, team_size)
+        advance = np.round(ev.total_advance[order] * 100, 4).tolist()
+        for m, mv in enumerate(moves):
+            total_bytes += _dump(os.path.join(out_dir, chunk_name(times_cfg, varied, mv)), {
+                "moves": mv,
+                "advance_pct": advance,
+                "speed": np.round(ev.speed[order, m], 4).tolist(),
+            })
+
+    # manifest 最后写：网页以它的 hash 判断结果包是否与当前 roster.js 一致
+    total_bytes += _dump(os.path.join(out_dir, "manifest.json"), {
+        "version": BUNDLE_VERSION,
+        "hash": roster.hash,
+        "names": names,
+        "varied": varied,
+        "times_values": times_values,
+        "moves": moves,
+        "team_size": team_size,
+        "teams": base.teams[order].ravel().tolist(),
+        "cost": base.cost[order].tolist(),
+        "spd_pct": np.round(base.total_spd_pct[order] * 100, 4).tolist(),
+    })
+    return n_files + 1, total_bytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="为 index.html 预计算分块结果包")
+    parser.add_argument("-o", "--out", default=DEFAULT_BUNDLE_DIR, help="输出目录")
+    parser.add_argument("--times", default="1-3", help="拉条角色的触发次数取值，如 1-3")
+    parser.add_argument("--moves", default="4-8", help="目标回合，如 4-8")
+    parser.add_argument("--max-files", type=int, default=2000, help="结果块数量上限")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        n_files, n_bytes = export_bundle(out_dir=args.out, times_values=parse_int_list(args.times),
+                                         moves=parse_int_list(args.moves), max_files=args.max_files)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"已写出 {n_files} 个文件，共 {n_bytes / 1024:.0f} KB，用时 {time.perf_counter() - t0:.2f}s -> {args.out}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+配队计算引擎：把候选角色打包成数组，用 NumPy 一次性批量计算
+“所有合法配队 × 所有目标回合”的所需面板速度、金数、总拉条以及筛选掩码；
+反过来，evaluate_speeds 对“所有合法配队 × 若干面板速度”求最多回合数与到下一动的差距。
+
+speed.generate_team_image_table 与 gui.TeamImageTableApp 都通过这里取结果，
+绘图代码只负责画图。
+"""
+import threading
+
+import numpy as np
+
+from roster import load_roster
+
+# 常量定义 (流萤基础速度 / 终结技固定速度加成 / 召唤物速度)，取自 roster.json
+CONSTANTS = dict(load_roster().constants)
+
+TEAM_SIZE = 3
+
+
+class Roster:
+    """列式存储的候选角色表：每个属性一列 NumPy 数组，按 names 顺序对齐。"""
+
+    def __init__(self, names, spd_pct, advance, cost, times, base_ids, bases=None):
+        self.names = names
+        self.bases = bases if bases is not None else [None] * len(names)
+        self.spd_pct = spd_pct
+        self.advance = advance
+        self.cost = cost
+        self.times = times
+        self.base_ids = base_ids
+
+    def __len__(self):
+        return len(self.names)
+
+
+def pack_roster(candidates: dict) -> Roster:
+    """把 {名字: 数据} 形式的候选字典打包成 Roster，times 缺省为 1"""
+    names = list(candidates.keys())
+    rows = [candidates[n] for n in names]
+
+    base_index = {}
+    base_ids = [base_index.setdefault(d["base"], len(base_index)) for d in rows]
+
+    return Roster(
+        names=names,
+        spd_pct=np.array([d["spd_pct"] for d in rows], dtype=np.float64),
+        advance=np.array([d["advance"] for d in rows], dtype=np.float64),
+        cost=np.array([d["cost"] for d in rows], dtype=np.int64),
+        times=np.array([d.get("times", 1) for d in rows], dtype=np.int64),
+        base_ids=np.array(base_ids, dtype=np.int64),
+        bases=[d["base"] for d in rows],
+    )
+
+
+def combination_indices(n: int, k: int) -> np.ndarray:
+    """向量化的 n 选 k，返回 (C(n,k), k) 的下标数组，顺序与 itertools.combinations 一致"""
+    if k == 0:
+        return np.empty((1, 0), dtype=np.intp)
+    if k < 0 or k > n:
+        return np.empty((0, max(k, 0)), dtype=np.intp)
+
+    combos = np.arange(n, dtype=np.intp)[:, None]
+    for _ in range(1, k):
+        last = combos[:, -1]
+        counts = n - 1 - last
+        starts = np.cumsum(counts) - counts
+        rows = np.repeat(combos, counts, axis=0)
+        nxt = np.arange(counts.sum(), dtype=np.intp) + np.repeat(last + 1 - starts, counts)
+        combos = np.column_stack([rows, nxt])
+    return combos
+
+
+def valid_teams(roster: Roster, team_size: int = TEAM_SIZE) -> np.ndarray:
+    """所有 base 不重复的配队下标，形状 (T, team_size)"""
+    combos = combination_indices(len(roster), team_size)
+    if team_size < 2 or len(combos) == 0:
+        return combos
+    bases = np.sort(roster.base_ids[combos], axis=1)
+    unique = np.all(np.diff(bases, axis=1) != 0, axis=1)
+    return combos[unique]
+
+
+def parse_filter_settings(filter_settings=None):
+    """解析筛选配置，返回 (min_spd, max_spd, min_cost, max_cost)"""
+    fs = filter_settings or {}
+    return (
+        float(fs.get('min_spd', 0)),
+        float(fs.get('max_spd', 999)),
+        int(fs.get('min_cost', 0)),
+        int(fs.get('max_cost', 99)),
+    )
+
+
+def required_speed(total_advance, total_spd_pct, moves, constants=None):
+    """
+    闭式公式：达到 moves 动所需的面板速度 (已与基础速度取 max)。
+    参数均可为可广播的 NumPy 数组。
+    """
+    c = constants or CONSTANTS
+    countdown_av = 10000.0 / c["summon_speed"]
+    intervals = moves - 1
+    total_distance = (10000.0 * intervals) - (10000.0 * total_advance)
+    req_ingame_speed = total_distance / countdown_av
+    req_panel_speed = req_ingame_speed - c["firefly_ult_flat"] - (c["firefly_base_spd"] * total_spd_pct)
+    return np.maximum(np.maximum(req_panel_speed, 0), c["firefly_base_spd"])
+
+
+def max_moves_at_speed(total_advance, total_spd_pct, panel_speed, constants=None):
+    """
+    反查：面板速度 panel_speed 下能达成的最多回合数 (required_speed 的反函数，可广播)。
+    所需速度 = (m - 1 - 拉条) × 倒计时速度 - 固定加速 - 基础速度 × 速加 ≤ 面板速度，
+    即 m ≤ 1 + 拉条 + (面板速度 + 固定加速 + 基础速度 × 速加) / 倒计时速度。
+    面板速度低于基础速度时为 0 (所需速度不会低于基础速度)。
+    """
+    c = constants or CONSTANTS
+    m = np.floor(1 + total_advance + (panel_speed + c["firefly_ult_flat"] + c["firefly_base_spd"] * total_spd_pct)
+                 / c["summon_speed"])
+    # 恰好落在边界上时，用正向公式校正一步，保证与 required_speed 的判定一致
+    m = np.where(required_speed(total_advance, total_spd_pct, m, c) > panel_speed, m - 1, m)
+    m = np.where(required_speed(total_advance, total_spd_pct, m + 1, c) <= panel_speed, m + 1, m)
+    return np.where(panel_speed >= c["firefly_base_spd"], np.maximum(m, 0), 0).astype(np.int64)
+
+
+class SpeedEvaluation:
+    """
+    反查的批量结果：所有合法配队 × 若干面板速度。
+    panel_speeds: (S,)；max_moves / reached_speed / to_next: (T, S)；
+    reached_speed 为达成 max_moves 所需的速度，to_next 为再多一动还差的速度。
+    """
+
+    def __init__(self, roster, teams, panel_speeds, total_advance, total_spd_pct, cost,
+                 max_moves, reached_speed, to_next):
+        self.roster = roster
+        self.teams = teams
+        self.panel_speeds = panel_speeds
+        self.total_advance = total_advance
+        self.total_spd_pct = total_spd_pct
+        self.cost = cost
+        self.max_moves = max_moves
+        self.reached_speed = reached_speed
+        self.to_next = to_next
+
+    def to_results(self, speed_index=0, filter_settings=None, avatar_paths=None):
+        """
+        第 speed_index 个面板速度下的结果行 (与 TeamEvaluation.to_results 字段相同，另加 panel_speed / to_next)，
+        按回合数降序、金数升序；只保留至少能行动 1 次、金数在筛选范围内、
+        且 speed (达成最多回合所需的速度) 在速度筛选范围内的配队。
+        """
+        avatar_paths = avatar_paths or {}
+        min_spd, max_spd, min_cost, max_cost = parse_filter_settings(filter_settings)
+        moves = self.max_moves[:, speed_index]
+        reached = self.reached_speed[:, speed_index]
+        keep = np.nonzero((moves >= 1) & (self.cost >= min_cost) & (self.cost <= max_cost)
+                          & (reached >= min_spd) & (reached <= max_spd))[0]
+        keep = keep[np.lexsort((self.cost[keep], -moves[keep]))]
+
+        names = self.roster.names
+        panel_speed = float(self.panel_speeds[speed_index])
+        results = []
+        for t in keep.tolist():
+            team = tuple(names[i] for i in self.teams[t])
+            results.append({
+                "team": team,
+                "avatars": [avatar_paths.get(member) for member in team],
+                "moves": int(moves[t]),
+                "advance_pct": float(self.total_advance[t]) * 100,
+                "spd_pct": float(self.total_spd_pct[t]) * 100,
+                "speed": float(self.reached_speed[t, speed_index]),
+                "cost": int(self.cost[t]),
+                "panel_speed": panel_speed,
+                "to_next": float(self.to_next[t, speed_index]),
+            })
+        return results
+
+
+def evaluate_speeds(candidates, panel_speeds, constants=None, team_size: int = TEAM_SIZE) -> SpeedEvaluation:
+    """对所有合法配队 × 所有面板速度做一次反查，不需要逐个目标回合枚举"""
+    roster = candidates if isinstance(candidates, Roster) else pack_roster(candidates)
+    teams = valid_teams(roster, team_size)
+    speeds = np.atleast_1d(np.asarray(panel_speeds, dtype=np.float64))
+
+    total_advance = (roster.advance[teams] * roster.times[teams]).sum(axis=1)
+    total_spd_pct = roster.spd_pct[teams].sum(axis=1)
+    cost = roster.cost[teams].sum(axis=1)
+
+    adv, spd = total_advance[:, None], total_spd_pct[:, None]
+    max_moves = max_moves_at_speed(adv, spd, speeds[None, :], constants)
+    reached = required_speed(adv, spd, np.maximum(max_moves, 1), constants)
+    to_next = required_speed(adv, spd, max_moves + 1, constants) - speeds[None, :]
+    return SpeedEvaluation(roster, teams, speeds, total_advance, total_spd_pct, cost, max_moves, reached, to_next)
+
+
+class TeamEvaluation:
+    """
+    一次批量计算的结果。
+    teams: (T, k) 角色下标；moves: (M,)；speed / mask: (T, M)；
+    total_advance / total_spd_pct / cost: (T,)
+    """
+
+    def __init__(self, roster, teams, moves, total_advance, total_spd_pct, cost, speed, mask):
+        self.roster = roster
+        self.teams = teams
+        self.moves = moves
+        self.total_advance = total_advance
+        self.total_spd_pct = total_spd_pct
+        self.cost = cost
+        self.speed = speed
+        self.mask = mask
+
+    def __len__(self):
+        return int(self.mask.sum())
+
+    def to_results(self, avatar_paths=None):
+        """
+        把通过筛选的 (配队, 回合) 展开为渲染用的字典列表，按金数降序
+        (稳定排序，与旧版逐个 append 后 sort 的顺序一致)
+        """
+        avatar_paths = avatar_paths or {}
+        team_idx, move_idx = np.nonzero(self.mask)
+        order = np.argsort(-self.cost[team_idx], kind="stable")
+        team_idx, move_idx = team_idx[order], move_idx[order]
+
+        names = self.roster.names
+        results = []
+        for t, m in zip(team_idx.tolist(), move_idx.tolist()):
+            team = tuple(names[i] for i in self.teams[t])
+            results.append({
+                "team": team,
+                "avatars": [avatar_paths.get(member) for member in team],
+                "moves": int(self.moves[m]),
+                "advance_pct": float(self.total_advance[t]) * 100,
+                "spd_pct": float(self.total_spd_pct[t]) * 100,
+                "speed": float(self.speed[t, m]),
+                "cost": int(self.cost[t]),
+            })
+        return results
+
+
+def _candidate_signature(roster: Roster, i: int):
+    """单个角色影响计算结果的全部字段"""
+    return (float(roster.spd_pct[i]), float(roster.advance[i]), int(roster.cost[i]),
+            int(roster.times[i]), roster.bases[i])
+
+
+def _teams_touching(roster: Roster, changed_idx, team_size: int) -> np.ndarray:
+    """
+    只枚举至少包含一个 changed 角色的合法配队 (每个配队恰好生成一次)：
+    第 j 个变动角色与“排除它及之前所有变动角色后”的其余角色组合。
+    """
+    n = len(roster)
+    excluded = np.zeros(n, dtype=bool)
+    parts = []
+    for c in changed_idx:
+        excluded[c] = True
+        pool = np.nonzero(~excluded)[0]
+        rest = combination_indices(len(pool), team_size - 1)
+        if len(rest) == 0:
+            continue
+        head = np.full((len(rest), 1), c, dtype=np.intp)
+        parts.append(np.sort(np.hstack([head, pool[rest]]), axis=1))
+    if not parts:
+        return np.empty((0, team_size), dtype=np.intp)
+    teams = np.vstack(parts)
+    if team_size >= 2:
+        bases = np.sort(roster.base_ids[teams], axis=1)
+        teams = teams[np.all(np.diff(bases, axis=1) != 0, axis=1)]
+    return teams
+
+
+class ResultStore:
+    """
+    增量结果缓存：按 (配队, 成员 times, 目标回合) 记住已算出的速度。
+
+    update() 对比上一次的候选角色：只重新计算包含变动角色 (新增 / times 或数据改变) 的配队，
+    其余配队和已算过的回合直接复用；去掉的角色所在配队被丢弃。
+    refilter() 只重新生成筛选掩码，不做任何计算。
+    """
+
+    def __init__(self, constants=None, team_size: int = TEAM_SIZE):
+        self.constants = dict(constants or CONSTANTS)
+        self.team_size = team_size
+        self.roster = None
+        self.teams = None
+        self.total_advance = None
+        self.total_spd_pct = None
+        self.cost = None
+        self.speed_cols = {}  # move -> (T,) 所需速度
+        self.moves = []
+        self.filter_settings = None
+        self.last_stats = {"reused": 0, "evaluated": 0}
+        self._roster_key = None
+        self._lock = threading.Lock()
+
+    def update(self, candidates: dict, target_moves_list=(4, 5), filter_settings=None) -> TeamEvaluation:
+        """同步到新的候选角色和目标回合，返回带筛选掩码的 TeamEvaluation"""
+        with self._lock:
+            new = candidates if isinstance(candidates, Roster) else pack_roster(candidates)
+            moves = [int(m) for m in target_moves_list]
+
+            roster_key = tuple((name, _candidate_signature(new, i)) for i, name in enumerate(new.names))
+            if roster_key == self._roster_key:
+                # 角色完全没变 (例如只改了筛选条件或回合)，配队部分全部复用
+                keep_rows = np.arange(len(self.teams))
+                new_teams = np.empty((0, self.team_size), dtype=np.intp)
+            else:
+                if self.roster is None:
+                    keep_teams = np.empty((0, self.team_size), dtype=np.intp)
+                    keep_rows = np.empty(0, dtype=np.intp)
+                    changed_idx = np.arange(len(new))
+                else:
+                    keep_teams, keep_rows, changed_idx = self._diff(new)
+
+                new_teams = _teams_touching(new, changed_idx, self.team_size)
+                self._merge(new, keep_teams, keep_rows, new_teams)
+                self._roster_key = roster_key
+
+            # 新出现的回合对所有配队计算；已有回合只补算新配队 (在 _merge 中完成)
+            for m in moves:
+                if m not in self.speed_cols:
+                    self.speed_cols[m] = required_speed(self.total_advance, self.total_spd_pct, m, self.constants)
+            self.moves = moves
+            self.last_stats = {"reused": len(keep_rows), "evaluated": len(new_teams)}
+            return self._evaluation(filter_settings)
+
+    def refilter(self, filter_settings=None) -> TeamEvaluation:
+        """仅按新的筛选条件重新生成掩码，复用全部已算结果"""
+        with self._lock:
+            self.last_stats = {"reused": 0 if self.teams is None else len(self.teams), "evaluated": 0}
+            return self._evaluation(filter_settings)
+
+    def _diff(self, new: Roster):
+        """对比新旧 Roster，返回 (可复用的配队[新下标], 对应旧行号, 变动角色下标)"""
+        old = self.roster
+        old_pos = {name: i for i, name in enumerate(old.names)}
+        remap = np.full(len(old), -1, dtype=np.intp)
+        changed = np.zeros(len(new), dtype=bool)
+        for j, name in enumerate(new.names):
+            i = old_pos.get(name)
+            if i is None:
+                changed[j] = True
+                continue
+            remap[i] = j
+            if _candidate_signature(old, i) != _candidate_signature(new, j):
+                changed[j] = True
+
+        mapped = remap[self.teams]
+        ok = np.all(mapped >= 0, axis=1)
+        ok[ok] = ~np.any(changed[mapped[ok]], axis=1)
+        keep_rows = np.nonzero(ok)[0]
+        keep_teams = np.sort(mapped[keep_rows], axis=1)
+        return keep_teams, keep_rows, np.nonzero(changed)[0]
+
+    def _merge(self, new: Roster, keep_teams, keep_rows, new_teams):
+        """拼接复用的配队与新算的配队，并恢复与 valid_teams 一致的字典序"""
+        add_adv = (new.advance[new_teams] * new.times[new_teams]).sum(axis=1)
+        add_pct = new.spd_pct[new_teams].sum(axis=1)
+        add_cost = new.cost[new_teams].sum(axis=1)
+
+        if self.roster is None:
+            old_adv = np.empty(0)
+            old_pct = np.empty(0)
+            old_cost = np.empty(0, dtype=np.int64)
+        else:
+            old_adv = self.total_advance[keep_rows]
+            old_pct = self.total_spd_pct[keep_rows]
+            old_cost = self.cost[keep_rows]
+
+        teams = np.vstack([keep_teams, new_teams]).astype(np.intp)
+        order = np.lexsort(teams.T[::-1]) if len(teams) else np.empty(0, dtype=np.intp)
+
+        speed_cols = {}
+        for m, col in self.speed_cols.items():
+            fresh = required_speed(add_adv, add_pct, m, self.constants)
+            speed_cols[m] = np.concatenate([col[keep_rows], fresh])[order]
+
+        self.roster = new
+        self.teams = teams[order]
+        self.total_advance = np.concatenate([old_adv, add_adv])[order]
+        self.total_spd_pct = np.concatenate([old_pct, add_pct])[order]
+        self.cost = np.concatenate([old_cost, add_cost]).astype(np.int64)[order]
+        self.speed_cols = speed_cols
+
+    def _evaluation(self, filter_settings) -> TeamEvaluation:
+        self.filter_settings = filter_settings
+        n = 0 if self.teams is None else len(self.teams)
+        if self.moves and n:
+            speed = np.column_stack([self.speed_cols[m] for m in self.moves])
+        else:
+            speed = np.empty((n, len(self.moves)))
+        cost = self.cost if self.cost is not None else np.empty(0, dtype=np.int64)
+
+        f_min_spd, f_max_spd, f_min_cost, f_max_cost = parse_filter_settings(filter_settings)
+        mask = (speed >= f_min_spd) & (speed <= f_max_spd)
+        mask &= ((cost >= f_min_cost) & (cost <= f_max_cost))[:, None]
+
+        teams = self.teams if self.teams is not None else np.empty((0, self.team_size), dtype=np.intp)
+        return TeamEvaluation(self.roster, teams, np.asarray(self.moves, dtype=np.int64),
+                              self.total_advance, self.total_spd_pct, cost, speed, mask)
+
+
+def evaluate_teams(
+    candidates: dict,
+    target_moves_list=(4, 5),
+    filter_settings=None,
+    constants=None,
+    team_size: int = TEAM_SIZE,
+) -> TeamEvaluation:
+    """对所有合法配队 × 所有目标回合做一次批量计算"""
+    roster = candidates if isinstance(candidates, Roster) else pack_roster(candidates)
+    teams = valid_teams(roster, team_size)
+    moves = np.asarray(list(target_moves_list), dtype=np.float64)
+
+    total_advance = (roster.advance[teams] * roster.times[teams]).sum(axis=1)
+    total_spd_pct = roster.spd_pct[teams].sum(axis=1)
+    cost = roster.cost[teams].sum(axis=1)
+
+    speed = required_speed(total_advance[:, None], total_spd_pct[:, None], moves[None, :], constants)
+
+    f_min_spd, f_max_spd, f_min_cost, f_max_cost = parse_filter_settings(filter_settings)
+    mask = (speed >= f_min_spd) & (speed <= f_max_spd)
+    mask &= ((cost >= f_min_cost) & (cost <= f_max_cost))[:, None]
+
+    return TeamEvaluation(roster, teams, moves.astype(np.int64), total_advance,
+                          total_spd_pct, cost, speed, mask)
+
+
+def compute_results(candidates: dict, target_moves_list=(4, 5), filter_settings=None,
+                    avatar_paths=None, constants=None):
+    """便捷入口：直接返回渲染用的、已筛选排序的结果列表"""
+    return evaluate_teams(candidates, target_moves_list, filter_settings, constants).to_results(avatar_paths)
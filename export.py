@@ -0,0 +1,139 @@
+"""
+表格导出：直接使用已有的结果列表绘制并编码，不重新计算。
+
+支持的编码设置：
+- PNG：compress_level 0-9 (越小越快，文件越大)，palette=True 时量化为调色板 PNG；
+- WebP 无损；
+- JPEG：quality 1-95。
+
+超高的 PNG 表格按横向切片流式写入磁盘 (逐片 zlib 压缩成 IDAT 块)，不在内存中拼出整张位图。
+所有格式都先写临时文件再改名，中途失败不会留下半个文件。
+"""
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from profiling import span
+from speed import STRIP_ROWS, generate_team_image_table, iter_table_bands, table_height, table_layout
+
+# 导出预设：界面下拉框的选项
+EXPORT_PRESETS = {
+    "PNG": {"fmt": "png", "compress_level": 6},
+    "PNG (快速)": {"fmt": "png", "compress_level": 1},
+    "PNG 256色": {"fmt": "png", "palette": True},
+    "WebP 无损": {"fmt": "webp"},
+    "JPEG 90": {"fmt": "jpeg", "quality": 90},
+}
+
+FORMAT_EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+
+# 超过该高度 (像素) 的真彩色 PNG 改为按切片流式写出
+STREAM_MIN_HEIGHT = 8192
+
+# WebP 单边最大像素
+WEBP_MAX_SIZE = 16383
+
+
+def format_from_path(path):
+    """按扩展名判断输出格式，未知扩展名按 PNG 处理"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".webp":
+        return "webp"
+    if ext in (".jpg", ".jpeg"):
+        return "jpeg"
+    return "png"
+
+
+def encode_image(img, path, fmt="png", compress_level=6, palette=False, colors=256, quality=90):
+    """按编码设置把 PIL 图片写入 path"""
+    if fmt == "png":
+        if palette:
+            img = img.quantize(colors=colors)
+        img.save(path, "PNG", compress_level=compress_level)
+    elif fmt == "webp":
+        if max(img.size) > WEBP_MAX_SIZE:
+            raise ValueError(f"WebP 单边最大 {WEBP_MAX_SIZE} 像素，当前表格为 {img.size[0]}x{img.size[1]}，请改用 PNG")
+        img.save(path, "WEBP", lossless=True)
+    elif fmt == "jpeg":
+        img.save(path, "JPEG", quality=quality)
+    else:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+
+def _png_chunk(f, tag, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(tag)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+
+def write_png_bands(f, width, height, bands, compress_level=6):
+    """
+    把从上到下的 RGB 切片 (与 speed.iter_table_bands 的产出相同) 写成一张 PNG。
+    每行使用 Up 滤波 (与上一行逐字节相减)，表格大面积纯色，压缩率与整图编码相当。
+    """
+    f.write(b"\x89PNG\r\n\x1a\n")
+    _png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    compressor = zlib.compressobj(compress_level)
+    prev = np.zeros(width * 3, dtype=np.uint8)
+    rows_written = 0
+    for _, band in bands:
+        rows = np.asarray(band, dtype=np.uint8).reshape(band.height, width * 3)
+        filtered = np.empty((band.height, width * 3 + 1), dtype=np.uint8)
+        filtered[:, 0] = 2  # Up 滤波
+        filtered[:, 1:] = rows - np.vstack([prev[None, :], rows[:-1]])
+        prev = rows[-1]
+        rows_written += band.height
+        data = compressor.compress(filtered.tobytes())
+        if data:
+            _png_chunk(f, b"IDAT", data)
+    if rows_written != height:
+        raise ValueError(f"切片总高度 {rows_written} 与表格高度 {height} 不一致")
+    _png_chunk(f, b"IDAT", compressor.flush())
+    _png_chunk(f, b"IEND", b"")
+
+
+def export_table(results, candidates: dict, path, avatar_size=64, font_path=None, fmt=None,
+                 compress_level=6, palette=False, colors=256, quality=90, stream=None, workers=None,
+                 progress=None):
+    """
+    把结果列表导出为图片。fmt 默认按扩展名判断；
+    stream 为 None 时，高度超过 STREAM_MIN_HEIGHT 的真彩色 PNG 自动流式写出。
+    progress(已完成行数, 总行数) 在每个切片写出后调用。
+    """
+    fmt = fmt or format_from_path(path)
+    n_rows = len(results)
+    layout = table_layout(avatar_size)
+    height = table_height(n_rows, avatar_size)
+    if stream is None:
+        stream = fmt == "png" and not palette and n_rows > 0 and height > STREAM_MIN_HEIGHT
+
+    if fmt == "webp" and max(layout["total_width"], height) > WEBP_MAX_SIZE:
+        raise ValueError(f"WebP 单边最大 {WEBP_MAX_SIZE} 像素，当前表格高 {height} 像素，请改用 PNG")
+
+    tmp = path + ".part"
+    try:
+        with span("save", path=path, fmt=fmt, rows=n_rows, stream=stream):
+            if stream:
+                def bands():
+                    for k, band in enumerate(iter_table_bands(results, candidates, avatar_size, font_path,
+                                                              workers=workers)):
+                        yield band
+                        if progress is not None:
+                            progress(min(n_rows, (k + 1) * STRIP_ROWS), n_rows)
+                with open(tmp, "wb") as f:
+                    write_png_bands(f, layout["total_width"], height, bands(), compress_level)
+            else:
+                img = generate_team_image_table(candidates, provided_results=results, avatar_size=avatar_size,
+                                                font_path=font_path, workers=workers)
+                if progress is not None:
+                    progress(n_rows, n_rows)
+                encode_image(img, tmp, fmt, compress_level, palette, colors, quality)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
@@ -1,37 +1,64 @@
+import time
+_STARTUP_T0 = time.perf_counter()  # 启动计时起点：本模块开始导入
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk
+from PIL import ImageTk
+import json
 import os
+import queue
+import sys
+import threading
 from typing import Dict, Any
 
+from assets import enable_disk_cache, get_avatar
+from engine import ResultStore, evaluate_speeds, parse_filter_settings
+from export import EXPORT_PRESETS, FORMAT_EXTENSIONS, export_table
+from pareto import pareto_frontier
+from profiling import Milestones, profiler, span
+from relics import default_odds
+from render_worker import RenderWorker
+from result_stream import sort_results, top_k
+from roster import CONSTANT_KEYS, load_roster
+import whatif
+
 # 假设 speed 模块在同目录下
-try:
-    from speed import generate_team_image_table
-except ImportError:
-    # Mock 用于测试
-    def generate_team_image_table(**kwargs):
-        return Image.new('RGB', (800, 200), color='white')
+from speed import render_row_tile, row_tile_top, rows_in_viewport, table_height, table_layout
 
 # --- 配置数据 ---
 CONSTANTS = {
-    "FIREFLY_BASE_SPD": 104.0,
-    "FIREFLY_ULT_FLAT": 60.0,
-    "SUMMON_SPEED": 70.0,
     "AVATAR_SIZE": 64,
     "WINDOW_SIZE": "1100x900", # 稍微调大一点窗口以容纳新增控件
+    "RENDER_COALESCE_MS": 150, # 该时间窗口内的连续输入合并为一次重绘
+    "RENDER_POLL_MS": 30,      # 主线程轮询后台渲染结果的间隔
+    "VIEW_PREFETCH_ROWS": 3,   # 可视区域上下额外预先绘制的行数
+    "FIRST_PAGE_ROWS": 20,     # 完整重算前先用流式 top-k 交给主线程显示的行数
 }
 
-CANDIDATES_DATA = {
-    "大丽花":       {"spd_pct": 0.30, "advance": 0.00, "base": "dahlia", "cost": 1, "img": "avatars/dahlia.jpg", "times": 1},
-    "6魂大丽花":    {"spd_pct": 0.30, "advance": 0.20, "base": "dahlia", "cost": 7, "img": "avatars/dahlia6.jpg", "times": 1},
-    "忘归人":       {"spd_pct": 0.00, "advance": 0.00, "base": "wang", "cost": 1,   "img": "avatars/wang.jpg", "times": 1},
-    "2魂忘归人":    {"spd_pct": 0.00, "advance": 0.24, "base": "wang", "cost": 3,   "img": "avatars/wang2.jpg", "times": 1},
-    "阮·梅":        {"spd_pct": 0.10, "advance": 0.00, "base": "ruan", "cost": 0,   "img": "avatars/ruan.jpg", "times": 1},
-    "开拓者(555)":  {"spd_pct": 0.00, "advance": 0.24, "base": "kaituozhe", "cost": 0, "img": "avatars/aki.jpg", "times": 1},
-    "开拓者":       {"spd_pct": 0.00, "advance": 0.00, "base": "kaituozhe", "cost": 0, "img": "avatars/aki.jpg", "times": 1},
-    "加拉赫/灵砂":  {"spd_pct": 0.00, "advance": 0.00, "base": "heel", "cost": 0,     "img": "avatars/lingsha.jpg", "times": 1},
+# 排序选项 -> result_stream 排序键
+SORT_OPTIONS = {
+    "金数 ↓": "cost",
+    "速度 ↑": "speed",
+    "回合 ↓": "moves",
 }
 
+# 角色数据与公式常量统一来自 roster.json
+ROSTER = load_roster()
+ENGINE_CONSTANTS = ROSTER.constants
+CANDIDATES_DATA = ROSTER.candidates()
+
+# 启动各阶段的显示名 (按发生顺序)
+STARTUP_LABELS = {
+    "import": "导入",
+    "ui": "界面",
+    "window": "首次空闲",
+    "thumbnails": "缩略图",
+    "first_render": "首次渲染",
+}
+
+STARTUP = Milestones(_STARTUP_T0)
+STARTUP.mark("import")
+
 class TeamImageTableApp:
     def __init__(self, root: tk.Tk):
         self.root = root
@@ -41,8 +68,13 @@ class TeamImageTableApp:
         # --- 初始化状态变量 ---
         self.font_path = None
         self.file_path = "team_table.png"
-        self.tk_image = None  
+        self.view = None        # 当前显示的结果: {"results", "candidates", "font_path"}
+        self.row_items = {}     # 行号 -> (canvas 图元 id 列表, PhotoImage)，只保留可视区域附近的行
         self.avatar_thumbs = {} 
+        self.thumb_labels = {}  # 角色名 -> 头像 Label，缩略图加载完成后替换占位图
+        self.thumb_results = queue.Queue()
+        self._startup_reported = False
+        self._thumb_placeholder = tk.PhotoImage(width=CONSTANTS["AVATAR_SIZE"], height=CONSTANTS["AVATAR_SIZE"])
         self.raw_results = []   
         self.filtered_results = [] 
 
@@ -60,15 +92,34 @@ class TeamImageTableApp:
             "min_cost": tk.StringVar(value="0"),
             "max_cost": tk.StringVar(value="11"),
         }
+        self.sort_var = tk.StringVar(value=next(iter(SORT_OPTIONS)))
+        self.export_var = tk.StringVar(value=next(iter(EXPORT_PRESETS)))
+        self.pareto_var = tk.BooleanVar(value=False)  # 只显示每个回合数的最低金数配队
+        self.odds_var = tk.BooleanVar(value=False)  # 每行显示随机遗器的速度达成率
+        self.inverse_var = tk.BooleanVar(value=False)  # 反查：给定面板速度求每个配队最多几动
+        self.panel_speed_var = tk.StringVar(value="160")
         self.candidate_vars = {} 
         self.candidate_times_vars = {} # [新增] 存储每个角色的 times 变量
 
+        # 后台渲染：合并连续输入，只渲染最新一次请求
+        self._render_after_id = None
+        self.result_store = ResultStore(ENGINE_CONSTANTS)  # 增量缓存，只重算变动角色所在的配队
+        self._store_inputs = None  # result_store 最近一次 update 的 (候选, 回合)，只在渲染线程中读写
+        self.speed_index = None  # 默认 times 下全部角色 × 全部回合的磁盘索引，首次渲染时加载
+        self.render_worker = RenderWorker(self._render_job)
+        self.save_results = queue.Queue()  # 后台导出线程的进度与结果
+        self.whatif_window = None
+
         # --- 构建界面 ---
         self._setup_ui()
+        STARTUP.mark("ui")
         
         # --- 初始逻辑 ---
+        # 窗口先以占位图显示：缩略图在后台线程加载，首次计算推迟到第一次空闲 (窗口已绘制) 之后
         self.bind_mouse_wheel()
-        self.refresh_data_and_display()
+        threading.Thread(target=self._load_thumbnails, name="thumbnail-loader", daemon=True).start()
+        self.root.after(CONSTANTS["RENDER_POLL_MS"], self._poll_render_results)
+        self.root.after_idle(self._on_first_idle)
 
     def _setup_ui(self):
         """构建整体UI布局"""
@@ -87,6 +138,11 @@ class TeamImageTableApp:
         btn_frame.pack(side=tk.LEFT)
         ttk.Button(btn_frame, text="生成表格", command=self.refresh_data_and_display).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_frame, text="保存图片", command=self.save_image).pack(side=tk.LEFT, padx=2)
+        ttk.Combobox(btn_frame, textvariable=self.export_var, values=list(EXPORT_PRESETS),
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="常量扫描", command=self.open_whatif).pack(side=tk.LEFT, padx=2)
+        if profiler.enabled:
+            ttk.Button(btn_frame, text="导出Trace", command=self.export_trace).pack(side=tk.LEFT, padx=2)
 
         filter_frame = ttk.Labelframe(parent, text="筛选条件", padding=(5, 0))
         filter_frame.pack(side=tk.LEFT, padx=15)
@@ -101,6 +157,22 @@ class TeamImageTableApp:
         for m in self.target_move_vars.keys():
             ttk.Checkbutton(moves_frame, text=str(m), variable=self.target_move_vars[m], 
                             command=self.refresh_data_and_display).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(moves_frame, text="反查 速度", variable=self.inverse_var,
+                        command=self.refresh_data_and_display).pack(side=tk.LEFT, padx=(8, 2))
+        panel_entry = ttk.Entry(moves_frame, textvariable=self.panel_speed_var, width=5)
+        panel_entry.pack(side=tk.LEFT, padx=2)
+        panel_entry.bind("<Return>", lambda e: self.refresh_data_and_display())
+
+        sort_frame = ttk.Labelframe(parent, text="排序", padding=(5, 0))
+        sort_frame.pack(side=tk.LEFT, padx=5)
+        sort_box = ttk.Combobox(sort_frame, textvariable=self.sort_var, values=list(SORT_OPTIONS),
+                                state="readonly", width=7)
+        sort_box.pack(side=tk.LEFT, padx=2, pady=2)
+        sort_box.bind("<<ComboboxSelected>>", lambda e: self.refresh_data_and_display())
+        ttk.Checkbutton(sort_frame, text="最省", variable=self.pareto_var,
+                        command=self.refresh_data_and_display).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(sort_frame, text="达成率", variable=self.odds_var,
+                        command=self.refresh_data_and_display).pack(side=tk.LEFT, padx=2)
 
         self.info_label = ttk.Label(parent, text="就绪", font=("Microsoft YaHei", 10, "bold"))
         self.info_label.pack(side=tk.RIGHT, padx=10)
@@ -132,18 +204,9 @@ class TeamImageTableApp:
             cell = ttk.Frame(grid_frame, borderwidth=1, relief="solid") # 加个边框看清楚范围
             cell.grid(row=idx // cols, column=idx % cols, padx=4, pady=4, sticky="n")
             
-            # 图片
-            try:
-                if os.path.exists(data["img"]):
-                    pil_img = Image.open(data["img"]).convert("RGBA")
-                    pil_img = pil_img.resize((CONSTANTS["AVATAR_SIZE"], CONSTANTS["AVATAR_SIZE"]), Image.LANCZOS)
-                    tk_thumb = ImageTk.PhotoImage(pil_img)
-                    self.avatar_thumbs[name] = tk_thumb
-                    lbl = tk.Label(cell, image=tk_thumb)
-                else:
-                    raise FileNotFoundError
-            except Exception:
-                lbl = tk.Label(cell, text="No Img", width=8, height=4, bg="#eee")
+            # 图片：先放同尺寸的占位图，缩略图由 _load_thumbnails 在后台加载后替换
+            lbl = tk.Label(cell, image=self._thumb_placeholder, bg="#eee")
+            self.thumb_labels[name] = lbl
             lbl.pack(pady=(2,0))
 
             # 复选框 (放在图片下面)
@@ -178,25 +241,136 @@ class TeamImageTableApp:
         ttk.Button(ctrl_frame, text="全选", command=lambda: self._toggle_all(True)).pack(pady=2)
         ttk.Button(ctrl_frame, text="反选", command=lambda: self._toggle_all(False)).pack(pady=2)
 
+    def _load_thumbnails(self):
+        """后台线程：逐个取缩略图 (磁盘缩略图缓存命中时不解码原图)，PIL 图片交给主线程转换"""
+        for name, data in CANDIDATES_DATA.items():
+            # 与渲染器共用头像缓存，同尺寸的头像只解码缩放一次
+            self.thumb_results.put((name, get_avatar(data["img"], CONSTANTS["AVATAR_SIZE"])))
+        self.thumb_results.put((None, None))
+
+    def _poll_thumbnails(self):
+        """主线程：把已加载的缩略图换到界面上 (PhotoImage 只能在 Tk 线程创建)"""
+        try:
+            while True:
+                name, pil_img = self.thumb_results.get_nowait()
+                if name is None:
+                    STARTUP.mark("thumbnails")
+                    self._report_startup()
+                    continue
+                lbl = self.thumb_labels[name]
+                if pil_img is not None:
+                    with span("photoimage", kind="thumb"):
+                        tk_thumb = ImageTk.PhotoImage(pil_img)
+                    self.avatar_thumbs[name] = tk_thumb
+                    lbl.config(image=tk_thumb, bg=self.root.cget("bg"))
+                else:
+                    lbl.config(image="", text="No Img", width=8, height=4)
+        except queue.Empty:
+            pass
+
+    def _on_first_idle(self):
+        # 窗口已经显示，开始首次计算 (不经过输入合并的等待窗口)
+        STARTUP.mark("window")
+        self._submit_render()
+
+    def _report_startup(self):
+        """缩略图与首次渲染都完成后输出一次启动耗时；设置 HSR_STARTUP_LOG 时追加一行 JSON 记录"""
+        if self._startup_reported or not STARTUP.done("thumbnails", "first_render"):
+            return
+        self._startup_reported = True
+        text = STARTUP.report(STARTUP_LABELS)
+        print(f"启动耗时 ({len(CANDIDATES_DATA)} 个角色): {text}", file=sys.stderr)
+        self.info_label.config(text=f"{self.info_label.cget('text')} | 启动 {STARTUP.marks['first_render']:.0f}ms")
+        log_path = os.environ.get("HSR_STARTUP_LOG")
+        if log_path:
+            record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "roster": ROSTER.hash,
+                      "candidates": len(CANDIDATES_DATA), **{k: round(v, 1) for k, v in STARTUP.marks.items()}}
+            try:
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError:
+                pass
+
     def _setup_display_area(self):
+        """结果区域：虚拟化画布，只绘制并保留可视区域附近的行图块"""
         main_frame = ttk.Frame(self.root)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        self.canvas = tk.Canvas(main_frame, bg="#f0f0f0")
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.canvas.yview)
-        
-        self.scrollable_frame = ttk.Frame(self.canvas)
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
+        self.canvas = tk.Canvas(main_frame, bg="#f0f0f0", highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self.canvas.yview)
         
-        self.canvas_window = self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.bind('<Configure>', lambda e: self.canvas.itemconfig(self.canvas_window, width=e.width))
-        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.configure(yscrollcommand=self._on_canvas_yscroll)
+        self.canvas.bind('<Configure>', lambda e: self._reset_view_items())
         
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def _on_canvas_yscroll(self, first, last):
+        # 视图变化 (滚动 / 缩放) 时同步滚动条，并补画新露出的行
+        self.scrollbar.set(first, last)
+        self._update_visible_rows()
+
+    def _view_offset_x(self):
+        # 表格在画布中水平居中
+        width = table_layout(CONSTANTS["AVATAR_SIZE"])["total_width"]
+        return max(0, (self.canvas.winfo_width() - width) // 2)
+
+    def _reset_view_items(self):
+        """清空画布并按当前结果重建背景与可视行"""
+        self.canvas.delete("all")
+        self.row_items = {}
+        if self.view is None:
+            return
+
+        n_rows = len(self.view["results"])
+        x0 = self._view_offset_x()
+        if n_rows == 0:
+            self.canvas.create_rectangle(x0, 0, x0 + 400, 100, fill="white", outline="")
+            self.canvas.create_text(x0 + 20, 40, text="未找到符合条件的配队", anchor="nw", fill="black")
+            self.canvas.configure(scrollregion=(0, 0, x0 + 400, 100))
+            return
+
+        layout = table_layout(CONSTANTS["AVATAR_SIZE"])
+        width = layout["total_width"]
+        height = table_height(n_rows, CONSTANTS["AVATAR_SIZE"])
+        self.canvas.create_rectangle(x0, 0, x0 + width, height, fill="white", outline="", tags="table_bg")
+        self.canvas.configure(scrollregion=(0, 0, x0 + width, height))
+        self._update_visible_rows()
+
+    def _update_visible_rows(self):
+        """绘制可视区域 (含预取边距) 内缺少的行，释放范围外的行"""
+        if self.view is None or not self.view["results"]:
+            return
+
+        size = CONSTANTS["AVATAR_SIZE"]
+        results = self.view["results"]
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        start, stop = rows_in_viewport(top, bottom, len(results), size, CONSTANTS["VIEW_PREFETCH_ROWS"])
+
+        for i in [i for i in self.row_items if not start <= i < stop]:
+            item_ids, _ = self.row_items.pop(i)
+            for item_id in item_ids:
+                self.canvas.delete(item_id)
+
+        layout = table_layout(size)
+        x0 = self._view_offset_x()
+        margin = layout["margin"]
+        total_height = table_height(len(results), size)
+        for i in range(start, stop):
+            if i in self.row_items:
+                continue
+            tile = render_row_tile(results[i], self.view["candidates"], size, self.view["font_path"])
+            with span("photoimage", row=i):
+                photo = ImageTk.PhotoImage(tile)
+            y = row_tile_top(i, size)
+            item_ids = [self.canvas.create_image(x0, y, image=photo, anchor="nw")]
+            # 分割线 (最后一行之后不画)
+            line_y = y + layout["row_height"] - 1
+            if line_y + 5 < total_height - margin:
+                item_ids.append(self.canvas.create_line(
+                    x0 + margin, line_y, x0 + layout["total_width"] - margin, line_y, fill="#eee"))
+            self.row_items[i] = (item_ids, photo)
 
     def _toggle_all(self, state: bool):
         for var in self.candidate_vars.values():
@@ -230,13 +404,15 @@ class TeamImageTableApp:
             max_s = float(self.filter_vars["max_spd"].get())
             min_c = int(self.filter_vars["min_cost"].get())
             max_c = int(self.filter_vars["max_cost"].get())
+            if self.inverse_var.get():
+                float(self.panel_speed_var.get())
 
-            # 如果你有 self.raw_results 数据，可以在这里筛选
-            # 这里的逻辑仅作为 UI 展示，实际图片生成依赖于 selected_candidates
-            self.info_label.config(text=f"参数有效 | 正在重新计算...")
+            self.info_label.config(text=f"参数有效 | 等待重新计算...", foreground="")
             
-            # 重新生成图片
-            self._update_display_image()
+            # 合并短时间内的连续输入，窗口结束后交给后台线程重新生成图片
+            if self._render_after_id is not None:
+                self.root.after_cancel(self._render_after_id)
+            self._render_after_id = self.root.after(CONSTANTS["RENDER_COALESCE_MS"], self._submit_render)
             
         except ValueError:
             self.info_label.config(text="筛选数值无效", foreground="red")
@@ -245,60 +421,269 @@ class TeamImageTableApp:
         # 统一入口，刷新数据
         self.apply_filter_only()
 
-    def _update_display_image(self, is_save=False):
-        """调用外部库生成图片并显示"""
-        for w in self.scrollable_frame.winfo_children():
-            w.destroy()
+    def _collect_render_params(self) -> Dict[str, Any]:
+        """在主线程读取所有 Tk 变量，打包成后台任务可用的参数快照"""
+        selected_cands = self._get_selected_candidates()
+        return {
+            "candidates": selected_cands,
+            "avatars": {n: d["img"] for n, d in selected_cands.items()},
+            "moves": [m for m, v in self.target_move_vars.items() if v.get()],
+            "filter_settings": {
+                "min_spd": self.filter_vars["min_spd"].get(),
+                "max_spd": self.filter_vars["max_spd"].get(),
+                "min_cost": self.filter_vars["min_cost"].get(),
+                "max_cost": self.filter_vars["max_cost"].get()
+            },
+            "font_path": self.font_path,
+            "sort_key": SORT_OPTIONS.get(self.sort_var.get(), "cost"),
+            "pareto": self.pareto_var.get(),
+            "odds": self.odds_var.get(),
+            "inverse": self.inverse_var.get(),
+            "panel_speed": self.panel_speed_var.get(),
+        }
 
-        try:
-            selected_cands = self._get_selected_candidates()
-            selected_avatars = {n: d["img"] for n, d in selected_cands.items()}
-            selected_moves = [m for m, v in self.target_move_vars.items() if v.get()]
-
-            pil_img = generate_team_image_table(
-                candidates=selected_cands, # 这里传进去的 candidates 现在包含了动态的 times
-                output_image=self.file_path,
-                avatar_paths=selected_avatars,
-                avatar_size=CONSTANTS["AVATAR_SIZE"],
-                target_moves_list=selected_moves,
-                font_path=self.font_path,
-                filter_settings={
-                    "min_spd": self.filter_vars["min_spd"].get(),
-                    "max_spd": self.filter_vars["max_spd"].get(),
-                    "min_cost": self.filter_vars["min_cost"].get(),
-                    "max_cost": self.filter_vars["max_cost"].get()
-                },
-                is_save=is_save
-            )
+    def _submit_render(self):
+        self._render_after_id = None
+        self.render_worker.submit(self._collect_render_params())
+        self.info_label.config(text="计算中...", foreground="")
+
+    def _render_job(self, generation, params, worker=None):
+        """计算 + 绘图 (可在后台线程执行)，任务过期时返回 None"""
+        profile_mark = profiler.mark()
+        t0 = time.perf_counter()
+        with span("compute") as sp:
+            index = None if params["pareto"] or params["inverse"] else self._get_speed_index()
+            if params["inverse"]:
+                # 反查：给定面板速度，所有配队的最多回合数一次算出，不受目标回合勾选限制
+                panel_speed = float(params["panel_speed"])
+                # 默认按回合数降序、金数升序 (to_results 的顺序)，选了其他排序键时再稳定重排
+                results = evaluate_speeds(params["candidates"], [panel_speed], ENGINE_CONSTANTS).to_results(
+                    0, params["filter_settings"], params["avatars"])
+                stats = {"inverse": panel_speed}
+            elif params["pareto"]:
+                # 帕累托前沿：速度 / 金数区间内每个目标回合的最低金数配队 (分支定界，不枚举全部配队)
+                min_spd, max_spd, min_cost, max_cost = parse_filter_settings(params["filter_settings"])
+                results = pareto_frontier(params["candidates"], min_spd, max_spd, params["moves"],
+                                          params["avatars"], ENGINE_CONSTANTS, min_cost=min_cost, max_cost=max_cost)
+                results = sort_results(results, "cost")
+                stats = {"pareto": True}
+            elif index and index.covers(params["candidates"], params["moves"]):
+                # 索引命中 (times 均为默认值)：速度 / 金数区间直接二分查询，不做计算
+                rows = index.query(*parse_filter_settings(params["filter_settings"]),
+                                   selected=list(params["candidates"]), moves=params["moves"])
+                results = index.to_results(rows, params["candidates"], params["avatars"])
+                stats = {"indexed": True}
+            elif self._store_inputs == (params["candidates"], params["moves"]):
+                # 候选与回合都没变，只改了筛选条件：复用已算出的速度，只重新生成掩码
+                evaluation = self.result_store.refilter(params["filter_settings"])
+                stats = dict(self.result_store.last_stats)
+                results = evaluation.to_results(params["avatars"])
+            else:
+                if worker is not None:
+                    # 先用有界堆流式求出第一页交给主线程显示，完整结果算完后再替换
+                    self._submit_first_page(generation, params, worker)
+                # 增量计算：只重算包含变动角色的配队
+                evaluation = self.result_store.update(
+                    params["candidates"], # 这里传进去的 candidates 现在包含了动态的 times
+                    target_moves_list=params["moves"],
+                    filter_settings=params["filter_settings"],
+                )
+                self._store_inputs = (params["candidates"], params["moves"])
+                stats = dict(self.result_store.last_stats)
+                results = evaluation.to_results(params["avatars"])
+            # 除反查外各路径的结果都已按金数降序，其他排序键在此基础上稳定重排
+            if params["sort_key"] != "cost":
+                results = sort_results(results, params["sort_key"])
+            if params["odds"]:
+                # 首次使用时抽样遗器速度分布，之后每次只是对全部行做一次二分查询
+                default_odds().annotate(results)
+            sp.set(rows=len(results), **stats)
+        t1 = time.perf_counter()
+
+        if worker is not None:
+            if worker.is_stale(generation):
+                return None
+            worker.report(generation, f"绘制中... ({len(results)} 条结果)")
+
+        # 只预先绘制第一屏的行图块 (进入缓存)，其余行在滚动到时再画
+        with span("prefetch_rows"):
+            for r in results[:CONSTANTS["VIEW_PREFETCH_ROWS"] * 4]:
+                render_row_tile(r, params["candidates"], CONSTANTS["AVATAR_SIZE"], params["font_path"])
+
+        t2 = time.perf_counter()
+
+        return {
+            "params": params,
+            "results": results,
+            "stats": stats,
+            "compute_ms": (t1 - t0) * 1000,
+            "render_ms": (t2 - t1) * 1000,
+            "profile_mark": profile_mark,
+        }
 
-            self.tk_image = ImageTk.PhotoImage(pil_img)
-            ttk.Label(self.scrollable_frame, image=self.tk_image).pack()
-            self.info_label.config(text=f"生成完成，包含 {len(selected_cands)} 个角色")
-            
-        except Exception as e:
-            ttk.Label(self.scrollable_frame, text=f"生成图片出错:\n{e}", foreground="red").pack(pady=20)
+    def _submit_first_page(self, generation, params, worker):
+        """与完整结果相同排序 (含同分次序) 的前 FIRST_PAGE_ROWS 条，作为部分结果上报"""
+        with span("first_page"):
+            rows = top_k(params["candidates"], CONSTANTS["FIRST_PAGE_ROWS"], params["sort_key"],
+                         target_moves_list=params["moves"], filter_settings=params["filter_settings"],
+                         avatar_paths=params["avatars"], constants=ENGINE_CONSTANTS)
+            for r in rows[:CONSTANTS["VIEW_PREFETCH_ROWS"] * 4]:
+                render_row_tile(r, params["candidates"], CONSTANTS["AVATAR_SIZE"], params["font_path"])
+        if not worker.is_stale(generation):
+            worker.partial(generation, {"params": params, "results": rows})
+
+    def _get_speed_index(self):
+        """加载 (或首次构建) 默认配置的速度索引；缓存目录不可写时退回增量计算"""
+        if self.speed_index is None:
+            from speed_index import load_or_build  # 首次渲染时才需要，推迟导入以加快启动
+            try:
+                self.speed_index = load_or_build(CANDIDATES_DATA, sorted(self.target_move_vars), ENGINE_CONSTANTS)
+            except OSError:
+                self.speed_index = False
+        return self.speed_index
+
+    def _poll_render_results(self):
+        """主线程轮询后台结果：只处理最新任务的消息，过期消息直接丢弃"""
+        try:
+            while True:
+                kind, generation, payload = self.render_worker.results.get_nowait()
+                if self.render_worker.is_stale(generation):
+                    continue
+                if kind == "progress":
+                    self.info_label.config(text=payload, foreground="")
+                elif kind == "partial":
+                    self._show_first_page(payload)
+                elif kind == "done":
+                    self._show_render_result(payload)
+                elif kind == "error":
+                    self._show_render_error(payload)
+        except queue.Empty:
+            pass
+        self._poll_thumbnails()
+        self._poll_save_results()
+        self.root.after(CONSTANTS["RENDER_POLL_MS"], self._poll_render_results)
+
+    def _show_render_result(self, result):
+        """在主线程切换到新的结果，由虚拟化画布按需绘制可视行"""
+        self.filtered_results = result["results"]
+        self.view = {
+            "results": result["results"],
+            "candidates": result["params"]["candidates"],
+            "font_path": result["params"]["font_path"],
+        }
+        self._reset_view_items()
+        text = (f"生成完成，包含 {len(result['params']['candidates'])} 个角色 | "
+                f"{len(result['results'])} 条结果 | "
+                f"{self._format_stats(result['stats'])} | "
+                f"计算 {result['compute_ms']:.0f}ms / 绘制 {result['render_ms']:.0f}ms")
+        if profiler.enabled:
+            # 本次任务开始以来的耗时最多的阶段 (含刚才主线程的 PhotoImage 转换)
+            text += f" | {profiler.format_summary(since=result['profile_mark'])}"
+        self.info_label.config(text=text, foreground="")
+        STARTUP.mark("first_render")
+        self._report_startup()
+
+    def _show_first_page(self, partial):
+        """完整结果算完之前先显示第一页 (排序与完整结果一致，之后只是补上后面的行)"""
+        self.view = {
+            "results": partial["results"],
+            "candidates": partial["params"]["candidates"],
+            "font_path": partial["params"]["font_path"],
+            "preview": True,
+        }
+        self._reset_view_items()
+        self.info_label.config(text=f"已显示前 {len(partial['results'])} 条，完整结果计算中...", foreground="")
+
+    @staticmethod
+    def _format_stats(stats):
+        if stats.get("indexed"):
+            return "索引查询"
+        if stats.get("pareto"):
+            return "帕累托前沿"
+        if "inverse" in stats:
+            return f"反查 面板速度 {stats['inverse']:g}"
+        return f"重算 {stats['evaluated']} / 复用 {stats['reused']} 队"
+
+    def _show_render_error(self, e):
+        self.view = None
+        self._reset_view_items()
+        self.canvas.create_text(20, 20, text=f"生成图片出错:\n{e}", anchor="nw", fill="red")
+        self.info_label.config(text="生成失败", foreground="red")
 
     def save_image(self):
-        if not self.tk_image:
+        """导出当前显示的结果：不重新计算，直接用已有结果和行图块缓存在后台线程绘制并编码"""
+        if self.view is None:
             messagebox.showwarning("警告", "当前没有生成的图片")
             return
-            
+        if self.view.get("preview"):
+            messagebox.showwarning("警告", "完整结果仍在计算，请稍后再保存")
+            return
+
+        preset = EXPORT_PRESETS[self.export_var.get()]
+        ext = FORMAT_EXTENSIONS[preset["fmt"]]
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=ext,
+            filetypes=[(self.export_var.get(), "*" + ext)],
+            initialfile=os.path.splitext(os.path.basename(self.file_path))[0] + ext
+        )
+        if file_path:
+            self.file_path = file_path
+            # 每次保存一个线程：与“只保留最新请求”的渲染线程不同，保存请求不能被后来的请求取代
+            threading.Thread(target=self._save_job, args=(self.view, file_path, preset),
+                             name="save-worker", daemon=True).start()
+            self.info_label.config(text="保存中...", foreground="")
+
+    def _save_job(self, view, path, preset):
+        """后台导出任务：进度与结果放进 save_results，由主线程轮询"""
+        t0 = time.perf_counter()
+        try:
+            export_table(
+                view["results"], view["candidates"], path,
+                avatar_size=CONSTANTS["AVATAR_SIZE"],
+                font_path=view["font_path"],
+                progress=lambda done, total: self.save_results.put(("progress", f"保存中... {done}/{total} 行")),
+                **preset,
+            )
+        except Exception as e:
+            self.save_results.put(("error", e))
+            return
+        self.save_results.put(("done", {"path": path, "ms": (time.perf_counter() - t0) * 1000}))
+
+    def _poll_save_results(self):
+        try:
+            while True:
+                kind, payload = self.save_results.get_nowait()
+                if kind == "progress":
+                    self.info_label.config(text=payload, foreground="")
+                elif kind == "done":
+                    self.info_label.config(text=f"已保存 ({payload['ms']:.0f}ms)", foreground="")
+                    messagebox.showinfo("成功", f"保存成功: {payload['path']}")
+                elif kind == "error":
+                    self.info_label.config(text="保存失败", foreground="red")
+                    messagebox.showerror("错误", f"保存失败: {payload}")
+        except queue.Empty:
+            pass
+
+    def export_trace(self):
+        """导出已收集的计时记录为 Chrome trace 文件"""
         file_path = filedialog.asksaveasfilename(
-            defaultextension=".png",
-            filetypes=[("PNG", "*.png"), ("JPG", "*.jpg")],
-            initialfile="team_table.png"
+            defaultextension=".json",
+            filetypes=[("Chrome Trace", "*.json")],
+            initialfile="trace.json"
         )
-        self.file_path = file_path
         if file_path:
             try:
-                selected_cands = self._get_selected_candidates()
-                selected_avatars = {n: d["img"] for n, d in selected_cands.items()}
-                selected_moves = [m for m, v in self.target_move_vars.items() if v.get()]
-                
-                self._update_display_image(is_save=True)  # 重新生成图片以确保最新
-                messagebox.showinfo("成功", f"保存成功: {file_path}")
-            except Exception as e:
-                messagebox.showerror("错误", f"保存失败: {e}")
+                profiler.export_chrome_trace(file_path)
+                messagebox.showinfo("成功", f"已导出 {len(profiler.spans)} 条记录: {file_path}")
+            except OSError as e:
+                messagebox.showerror("错误", f"导出失败: {e}")
+
+    def open_whatif(self):
+        """打开常量假设分析窗口 (同一时间只保留一个)"""
+        if self.whatif_window is not None and self.whatif_window.top.winfo_exists():
+            self.whatif_window.top.lift()
+            return
+        self.whatif_window = WhatIfWindow(self)
 
     def bind_mouse_wheel(self):
         self.canvas.bind_all("<MouseWheel>", self._on_mouse_wheel)
@@ -311,7 +696,193 @@ class TeamImageTableApp:
         elif event.num == 4 or event.delta > 0:
             self.canvas.yview_scroll(-1, "units")
 
+class WhatIfWindow:
+    """
+    常量假设分析窗口：输入三个公式常量的取值 (如 60:80:1)，在后台批量计算整张配队表并显示热力图。
+    输入变化后自动重算，连续输入只算最新一次 (与主表格共用 RenderWorker 的做法)。
+    """
+
+    LABELS = {"firefly_base_spd": "基础速度", "firefly_ult_flat": "终结技加速", "summon_speed": "倒计时速度"}
+
+    def __init__(self, app):
+        self.app = app
+        self.top = tk.Toplevel(app.root)
+        self.top.title("常量扫描")
+        self.top.geometry("1000x600")
+        self.result = None
+        self.image = None
+        self._photo = None
+        self._after_id = None  # 合并输入的延迟提交
+        self._poll_id = None  # 轮询后台结果
+        self._closed = False
+
+        self.axis_vars = {k: tk.StringVar(value=f"{ENGINE_CONSTANTS[k]:g}") for k in CONSTANT_KEYS}
+        self.panel_var = tk.StringVar(value="160")
+        self.metric_var = tk.StringVar(value=whatif.METRICS["delta"])
+        self.move_var = tk.StringVar()
+
+        bar = ttk.Frame(self.top, padding=6)
+        bar.pack(fill=tk.X)
+        for k, var in self.axis_vars.items():
+            ttk.Label(bar, text=self.LABELS[k]).pack(side=tk.LEFT)
+            entry = ttk.Entry(bar, textvariable=var, width=10)
+            entry.pack(side=tk.LEFT, padx=(2, 8))
+            entry.bind("<KeyRelease>", lambda e: self.schedule())
+        ttk.Label(bar, text="面板速度").pack(side=tk.LEFT)
+        panel_entry = ttk.Entry(bar, textvariable=self.panel_var, width=6)
+        panel_entry.pack(side=tk.LEFT, padx=(2, 8))
+        panel_entry.bind("<KeyRelease>", lambda e: self.schedule())
+        metric_box = ttk.Combobox(bar, textvariable=self.metric_var, values=list(whatif.METRICS.values()),
+                                  state="readonly", width=12)
+        metric_box.pack(side=tk.LEFT, padx=2)
+        metric_box.bind("<<ComboboxSelected>>", lambda e: self.schedule())
+        self.move_box = ttk.Combobox(bar, textvariable=self.move_var, state="readonly", width=5)
+        self.move_box.pack(side=tk.LEFT, padx=2)
+        self.move_box.bind("<<ComboboxSelected>>", lambda e: self.schedule())
+        ttk.Button(bar, text="保存热力图", command=self.save_png).pack(side=tk.LEFT, padx=2)
+        ttk.Button(bar, text="导出CSV", command=self.save_csv).pack(side=tk.LEFT, padx=2)
+        self.status = ttk.Label(self.top, text="", padding=(6, 0))
+        self.status.pack(fill=tk.X)
+
+        frame = ttk.Frame(self.top)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(frame, bg="white")
+        xbar = ttk.Scrollbar(frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        ybar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(xscrollcommand=xbar.set, yscrollcommand=ybar.set)
+        xbar.pack(side=tk.BOTTOM, fill=tk.X)
+        ybar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        self.worker = RenderWorker(self._job, name="whatif-worker")
+        self.top.protocol("WM_DELETE_WINDOW", self.close)
+        # 主窗口关闭等情况下 Toplevel 也会被销毁，同样要取消挂起的回调
+        self.top.bind("<Destroy>", self._on_destroy)
+        self._poll_id = self.top.after(CONSTANTS["RENDER_POLL_MS"], self._poll)
+        self.schedule()
+
+    def _params(self):
+        """在主线程读取输入；取值不合法时抛出 ValueError"""
+        grid = whatif.constant_grid(**{k: whatif.parse_values(v.get()) for k, v in self.axis_vars.items()})
+        if (grid["summon_speed"] <= 0).any():
+            raise ValueError("倒计时速度必须大于 0")
+        moves = [m for m, v in self.app.target_move_vars.items() if v.get()] or [4]
+        self.move_box.configure(values=[f"{m}动" for m in moves])
+        if self.move_var.get() not in self.move_box.cget("values"):
+            self.move_var.set(f"{moves[0]}动")
+        metric = next(k for k, label in whatif.METRICS.items() if label == self.metric_var.get())
+        return {
+            "candidates": self.app._get_selected_candidates(),
+            "grid": grid,
+            "moves": moves,
+            "move_index": moves.index(int(self.move_var.get().rstrip("动"))),
+            "panel_speed": float(self.panel_var.get()),
+            "metric": metric,
+            "font_path": self.app.font_path,
+        }
+
+    def _alive(self):
+        return not self._closed and self.top.winfo_exists()
+
+    def schedule(self):
+        if not self._alive():
+            return
+        if self._after_id is not None:
+            self.top.after_cancel(self._after_id)
+        self._after_id = self.top.after(CONSTANTS["RENDER_COALESCE_MS"], self._submit)
+
+    def _submit(self):
+        self._after_id = None
+        if not self._alive():
+            return
+        try:
+            params = self._params()
+        except ValueError as e:
+            self.status.config(text=f"输入无效: {e}", foreground="red")
+            return
+        self.worker.submit(params)
+        self.status.config(text="计算中...", foreground="")
+
+    def _job(self, generation, params, worker):
+        t0 = time.perf_counter()
+        with span("whatif", points=len(params["grid"]["summon_speed"])):
+            result = whatif.sweep(params["candidates"], params["grid"], params["moves"], params["panel_speed"],
+                                  ENGINE_CONSTANTS)
+        if worker.is_stale(generation):
+            return None
+        t1 = time.perf_counter()
+        img = whatif.render_heatmap(result, params["metric"], params["move_index"], params["font_path"])
+        return {"result": result, "image": img, "compute_ms": (t1 - t0) * 1000,
+                "render_ms": (time.perf_counter() - t1) * 1000}
+
+    def _poll(self):
+        self._poll_id = None
+        if not self._alive():
+            return
+        try:
+            while True:
+                kind, generation, payload = self.worker.results.get_nowait()
+                if self.worker.is_stale(generation):
+                    continue
+                if kind == "done":
+                    self.result = payload["result"]
+                    self.image = payload["image"]
+                    self._photo = ImageTk.PhotoImage(self.image)
+                    self.canvas.delete("all")
+                    self.canvas.create_image(0, 0, image=self._photo, anchor="nw")
+                    self.canvas.configure(scrollregion=(0, 0, self.image.width, self.image.height))
+                    self.status.config(
+                        text=f"{self.result.n_points} 个网格点 × {len(self.result.teams)} 个配队  "
+                             f"计算 {payload['compute_ms']:.0f}ms  绘图 {payload['render_ms']:.0f}ms",
+                        foreground="")
+                elif kind == "error":
+                    self.status.config(text=f"计算出错: {payload}", foreground="red")
+        except queue.Empty:
+            pass
+        self._poll_id = self.top.after(CONSTANTS["RENDER_POLL_MS"], self._poll)
+
+    def save_png(self):
+        if self.result is None:
+            return
+        path = filedialog.asksaveasfilename(parent=self.top, defaultextension=".png",
+                                            filetypes=[("PNG", "*.png")], initialfile="whatif.png")
+        if path:
+            self.image.save(path)
+
+    def save_csv(self):
+        if self.result is None:
+            return
+        path = filedialog.asksaveasfilename(parent=self.top, defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv")], initialfile="whatif.csv")
+        if path:
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                whatif.write_csv(self.result, f)
+
+    def _on_destroy(self, event):
+        if event.widget is self.top:
+            self._teardown()
+
+    def _teardown(self):
+        """取消挂起的 after 回调并停止后台线程；之后到达的结果不再更新控件"""
+        if self._closed:
+            return
+        self._closed = True
+        for after_id in (self._after_id, self._poll_id):
+            if after_id is not None:
+                try:
+                    self.top.after_cancel(after_id)
+                except tk.TclError:
+                    pass
+        self._after_id = self._poll_id = None
+        self.worker.close()
+
+    def close(self):
+        self._teardown()
+        self.top.destroy()
+
+
 def main():
+    enable_disk_cache()  # 缩略图写入仓库下的 .cache/thumbs，下次启动不再解码原图
     root = tk.Tk()
     style = ttk.Style()
     style.theme_use('clam') 
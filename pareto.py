@@ -0,0 +1,216 @@
+"""
+帕累托前沿：给定流萤面板速度 (或速度区间)，求“金数 - 回合数”的帕累托前沿，
+即每个回合数下金数最低的配队，并去掉被“更多回合且金数不更高”支配的点。
+
+由闭式公式可知，面板速度 P 下配队能达成 moves 动，当且仅当
+    W = 总拉条 + 基础速度 / 召唤物速度 × 总速加 >= moves - 1 - (P + 终结技加速) / 召唤物速度
+W 是各角色贡献之和，于是“每个回合数的最低金数配队”变成带 base 不重复约束的
+“选 k 人、W 落在区间内、金数最小”问题，用分支定界求解，不枚举全部配队：
+角色按金数升序排列，剩余名额的最低金数与 W 的可达上下界都可以用前缀和 / 后缀前 k 大值 O(1) 得到。
+
+用法示例：
+    python pareto.py --speed 160
+    python pareto.py --speed-range 140:180 --team-size 4
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from engine import CONSTANTS, TEAM_SIZE, pack_roster, required_speed
+
+_EPS = 1e-9
+
+
+def member_weights(roster, constants=None):
+    """每个角色对 W 的贡献：拉条 × 次数 + 基础速度 / 召唤物速度 × 速加"""
+    c = constants or CONSTANTS
+    return roster.advance * roster.times + (c["firefly_base_spd"] / c["summon_speed"]) * roster.spd_pct
+
+
+def weight_bounds(moves, min_spd, max_spd, constants=None):
+    """
+    所需面板速度落在 [min_spd, max_spd] 内时 W 的取值区间 (w_lo, w_hi)。
+    显示速度不低于基础速度，所以 min_spd 不高于基础速度时没有下界；max_spd 低于基础速度时无解 (返回 None)。
+    """
+    c = constants or CONSTANTS
+    if max_spd < c["firefly_base_spd"]:
+        return None
+    v = c["summon_speed"]
+    w_lo = moves - 1 - (max_spd + c["firefly_ult_flat"]) / v
+    w_hi = moves - 1 - (min_spd + c["firefly_ult_flat"]) / v if min_spd > c["firefly_base_spd"] else float("inf")
+    return w_lo, w_hi
+
+
+class TeamSearch:
+    """在一个候选表上反复求“W 在区间内的最低金数配队”，预处理只做一次"""
+
+    def __init__(self, roster, team_size: int = TEAM_SIZE, constants=None):
+        self.roster = roster
+        self.k = team_size
+        weights = member_weights(roster, constants)
+        # 金数升序，同金数时贡献大的在前 (更早找到可行解)
+        order = np.lexsort((-weights, roster.cost))
+        self.order = order.tolist()
+        self.cost = roster.cost[order].tolist()
+        self.w = weights[order].tolist()
+        self.base = roster.base_ids[order].tolist()
+
+        n, k = len(self.order), self.k
+        self.cost_prefix = [0] + np.cumsum(self.cost).tolist()
+        # top[i][r] / bottom[i][r]：order[i:] 中最大 / 最小的 r 个贡献之和 (忽略 base 约束的松弛界)
+        self.top = [[0.0] * (k + 1) for _ in range(n + 1)]
+        self.bottom = [[0.0] * (k + 1) for _ in range(n + 1)]
+        hi, lo = [], []
+        for i in range(n - 1, -1, -1):
+            hi = sorted(hi + [self.w[i]], reverse=True)[:k]
+            lo = sorted(lo + [self.w[i]])[:k]
+            for r in range(1, k + 1):
+                self.top[i][r] = sum(hi[:r]) if r <= len(hi) else float("-inf")
+                self.bottom[i][r] = sum(lo[:r]) if r <= len(lo) else float("inf")
+
+    def cheapest(self, w_lo, w_hi, accept=None, lower_bound=0, min_cost=0, max_cost=None):
+        """
+        W ∈ [w_lo, w_hi] 且金数在 [min_cost, max_cost] 内的最低金数配队，返回 (金数, 原始下标元组)，无解时返回 None。
+        accept(下标元组) 用于对候选解做精确复核；找到金数等于 lower_bound 的解时立即结束。
+        """
+        k, n = self.k, len(self.order)
+        cost, w, base = self.cost, self.w, self.base
+        cp, top, bottom = self.cost_prefix, self.top, self.bottom
+        # 金数上限直接作为初始界：超过上限的分支和更贵的分支一样被剪掉
+        best = [float("inf") if max_cost is None else max_cost + 1, None]
+        lower_bound = max(lower_bound, min_cost)
+        chosen = []
+        used = set()
+
+        def dfs(start, total_cost, total_w):
+            r = k - len(chosen)
+            if r == 0:
+                if total_cost >= min_cost and w_lo - _EPS <= total_w <= w_hi + _EPS:
+                    team = tuple(sorted(self.order[i] for i in chosen))
+                    if accept is None or accept(team):
+                        best[0], best[1] = total_cost, team
+                return best[0] <= lower_bound
+            for i in range(start, n - r + 1):
+                # 按金数升序，剩余名额至少要花 cost[i:i+r]，后面的 i 只会更贵
+                if total_cost + cp[i + r] - cp[i] >= best[0]:
+                    break
+                # 后缀越短，能凑到的最大 W 越小、最小 W 越大，一旦不可行后面都不可行
+                if total_w + top[i][r] < w_lo - _EPS or total_w + bottom[i][r] > w_hi + _EPS:
+                    break
+                if base[i] in used:
+                    continue
+                chosen.append(i)
+                used.add(base[i])
+                done = dfs(i + 1, total_cost + cost[i], total_w + w[i])
+                used.discard(base[i])
+                chosen.pop()
+                if done:
+                    return True
+            return False
+
+        if n >= k:
+            dfs(0, 0, 0.0)
+        return None if best[1] is None else (best[0], best[1])
+
+
+def pareto_frontier(candidates, min_spd, max_spd=None, target_moves_list=None, avatar_paths=None,
+                    constants=None, team_size: int = TEAM_SIZE, frontier_only=True, min_cost=0, max_cost=None):
+    """
+    所需面板速度在 [min_spd, max_spd] 内 (只给一个速度时为 [0, 速度]，即“面板速度达到该值”)、
+    金数在 [min_cost, max_cost] 内时，每个回合数的最低金数配队。target_moves_list 不给时遍历所有可能达成的回合数。
+    金数条件在搜索中生效，被支配只在满足全部条件的配队之间判断。
+    frontier_only=True 时去掉被支配的点。返回与 TeamEvaluation.to_results 相同格式的结果，按回合数升序。
+    """
+    c = constants or CONSTANTS
+    if max_spd is None:
+        min_spd, max_spd = 0.0, min_spd
+    roster = pack_roster(candidates) if isinstance(candidates, dict) else candidates
+    avatar_paths = avatar_paths or {}
+    search = TeamSearch(roster, team_size, c)
+
+    if target_moves_list is None:
+        bounds = weight_bounds(1, min_spd, max_spd, c)
+        w_max = search.top[0][team_size] if len(roster) >= team_size else float("-inf")
+        if bounds is None or w_max == float("-inf"):
+            return []
+        target_moves_list = range(1, int(np.floor(w_max - bounds[0] + _EPS)) + 2)
+    moves_list = sorted(set(int(m) for m in target_moves_list))
+
+    points = []
+    lower = 0
+    for m in moves_list:
+        bounds = weight_bounds(m, min_spd, max_spd, c)
+        if bounds is None:
+            continue
+
+        def accept(team, m=m):
+            # 用与引擎相同的公式和累加顺序复核，避免边界上的浮点误差
+            idx = np.asarray(team)
+            spd = float(required_speed((roster.advance[idx] * roster.times[idx]).sum(),
+                                       roster.spd_pct[idx].sum(), m, c))
+            return min_spd <= spd <= max_spd
+
+        # 没有速度下界时，能达成 m 动的配队也能达成更少回合，最低金数随 m 单调不减
+        found = search.cheapest(*bounds, accept=accept, lower_bound=lower if bounds[1] == float("inf") else 0,
+                                min_cost=min_cost, max_cost=max_cost)
+        if found is None:
+            continue
+        cost, team = found
+        if bounds[1] == float("inf"):
+            lower = cost
+        points.append((m, cost, team))
+
+    if frontier_only:
+        kept = []
+        for m, cost, team in reversed(points):
+            if not kept or cost < kept[-1][1]:
+                kept.append((m, cost, team))
+        points = kept[::-1]
+
+    results = []
+    for m, cost, team in points:
+        idx = np.asarray(team)
+        total_advance = (roster.advance[idx] * roster.times[idx]).sum()
+        total_spd_pct = roster.spd_pct[idx].sum()
+        names = tuple(roster.names[i] for i in team)
+        results.append({
+            "team": names,
+            "avatars": [avatar_paths.get(name) for name in names],
+            "moves": m,
+            "advance_pct": float(total_advance) * 100,
+            "spd_pct": float(total_spd_pct) * 100,
+            "speed": float(required_speed(total_advance, total_spd_pct, m, c)),
+            "cost": int(cost),
+        })
+    return results
+
+
+def main(argv=None):
+    from batch import load_candidates, parse_int_list, parse_range
+
+    parser = argparse.ArgumentParser(description="金数 - 回合数帕累托前沿 (每个回合数的最低金数配队)")
+    parser.add_argument("--candidates", help="候选角色 JSON 文件，默认使用 roster.json")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--speed", type=float, help="流萤面板速度")
+    group.add_argument("--speed-range", type=parse_range, help="所需面板速度区间 MIN:MAX")
+    parser.add_argument("--moves", help="只看这些回合数，如 4-8 (默认全部)")
+    parser.add_argument("--cost-range", type=parse_range, help="金数区间 MIN:MAX")
+    parser.add_argument("--team-size", type=int, default=TEAM_SIZE)
+    parser.add_argument("--all", action="store_true", help="列出每个回合数的最优解，不去掉被支配的点")
+    args = parser.parse_args(argv)
+
+    candidates = load_candidates(args.candidates)
+    min_spd, max_spd = args.speed_range if args.speed_range else (0.0, args.speed)
+    moves = parse_int_list(args.moves) if args.moves else None
+    min_cost, max_cost = args.cost_range if args.cost_range else (0, None)
+    results = pareto_frontier(candidates, min_spd, max_spd, moves, team_size=args.team_size,
+                              frontier_only=not args.all, min_cost=min_cost, max_cost=max_cost)
+    for r in results:
+        print(f"{r['moves']}动  金数 {r['cost']}  所需速度 {r['speed']:.1f}  {' / '.join(r['team'])}")
+    if not results:
+        print("没有满足条件的配队", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+轻量计时埋点：span() 上下文管理器与 profiled() 装饰器。
+
+默认关闭，关闭时 span() 直接返回共享的空对象，开销只有一次属性判断。
+开启方式：
+- 环境变量 HSR_PROFILE=1 (HSR_PROFILE_JSONL=路径 逐条写 JSON lines，
+  HSR_PROFILE_TRACE=路径 在退出时导出 Chrome trace)；
+- 或在代码中调用 profiler.enable(...)。
+
+内存中只保留最近 MAX_SPANS 条记录 (长时间开着界面也不会无限增长)，完整记录请用 JSONL 输出。
+导出的 trace 文件可在 chrome://tracing 或 https://ui.perfetto.dev 中打开。
+"""
+import atexit
+import collections
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "attrs", "start")
+
+    def __init__(self, profiler, name, attrs):
+        self.profiler = profiler
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._record(self.name, self.start, time.perf_counter(), self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """在 span 内补充属性 (例如结果条数)"""
+        self.attrs.update(attrs)
+
+
+MAX_SPANS = 100_000
+
+
+class Profiler:
+    """收集 span 记录：(名称, 开始秒, 持续秒, 线程 id, 属性)，只保留最近 max_spans 条"""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.enabled = False
+        self.spans = collections.deque(maxlen=max_spans)
+        self._recorded = 0  # 累计记录条数 (含已被挤出的)，mark() 用它定位
+        self._jsonl = None
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def enable(self, jsonl_path=None, trace_path=None):
+        self.enabled = True
+        if jsonl_path:
+            self._jsonl = open(jsonl_path, "a", encoding="utf-8")
+        if trace_path:
+            atexit.register(self.export_chrome_trace, trace_path)
+
+    def disable(self):
+        self.enabled = False
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, attrs)
+
+    def mark(self):
+        """当前记录位置，配合 summary(since=...) 只统计之后的 span"""
+        return self._recorded
+
+    def _record(self, name, start, end, attrs):
+        rec = (name, start - self._t0, end - start, threading.get_ident(), attrs)
+        with self._lock:
+            self.spans.append(rec)
+            self._recorded += 1
+            if self._jsonl is not None:
+                self._jsonl.write(json.dumps({
+                    "name": name, "start_ms": rec[1] * 1000, "dur_ms": rec[2] * 1000,
+                    "thread": rec[3], **attrs,
+                }, ensure_ascii=False, default=str) + "\n")
+                self._jsonl.flush()
+
+    def summary(self, since=0):
+        """按名称汇总：{名称: (次数, 总毫秒)}，按总耗时降序 (只统计仍保留在内存中的记录)"""
+        with self._lock:
+            recent = min(self._recorded - since, len(self.spans))
+            spans = list(itertools.islice(self.spans, len(self.spans) - max(recent, 0), None))
+        totals = {}
+        for name, _, dur, _, _ in spans:
+            count, ms = totals.get(name, (0, 0.0))
+            totals[name] = (count + 1, ms + dur * 1000)
+        return dict(sorted(totals.items(), key=lambda kv: -kv[1][1]))
+
+    def format_summary(self, since=0, limit=4):
+        """一行文字概要，用于界面状态栏"""
+        parts = [f"{name} {ms:.0f}ms" for name, (_, ms) in list(self.summary(since).items())[:limit]]
+        return " / ".join(parts)
+
+    def export_chrome_trace(self, path):
+        """导出 Chrome trace-event 格式 (完整事件 ph=X，时间单位微秒)，只含内存中保留的最近记录"""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        events = [
+            {"name": name, "ph": "X", "ts": start * 1e6, "dur": dur * 1e6,
+             "pid": pid, "tid": tid, "args": {k: str(v) for k, v in attrs.items()}}
+            for name, start, dur, tid, attrs in spans
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return path
+
+
+profiler = Profiler()
+
+
+def span(name, **attrs):
+    """计时上下文：with span("compute"): ..."""
+    if not profiler.enabled:
+        return _NOOP_SPAN
+    return _Span(profiler, name, attrs)
+
+
+def profiled(name=None):
+    """计时装饰器，未开启时直接调用原函数"""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with _Span(profiler, label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Milestones:
+    """启动等一次性流程的里程碑计时：记录各节点距 t0 的毫秒数，每个节点只记第一次"""
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.marks = {}
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = (time.perf_counter() - self.t0) * 1000
+        return self.marks[name]
+
+    def done(self, *names):
+        return all(name in self.marks for name in names)
+
+    def report(self, labels=None):
+        """一行文字：按记录顺序列出各节点，labels 可把节点名换成显示名"""
+        labels = labels or {}
+        return " / ".join(f"{labels.get(name, name)} {ms:.0f}ms" for name, ms in self.marks.items())
+
+
+if os.environ.get("HSR_PROFILE"):
+    profiler.enable(os.environ.get("HSR_PROFILE_JSONL"), os.environ.get("HSR_PROFILE_TRACE"))
@@ -0,0 +1,222 @@
+"""
+遗器速度副词条的蒙特卡洛模拟：估计一套随机满级遗器达到所需面板速度的概率。
+
+模型 (五星遗器 +15)：
+- 每件遗器的副词条按权重不放回抽取，主词条不会出现在副词条里；
+- 初始 3 条 (80%) 或 4 条 (20%)，共强化 5 次；初始 3 条时第一次强化补上第 4 条，其余强化等概率落在 4 条之一；
+- 速度每条 2.0 / 2.3 / 2.6 等概率。
+
+单件遗器的速度分布可以精确算出 (piece_speed_pmf)，整套的分布用 NumPy 批量抽样求和得到，
+之后每行结果只需在排好序的样本上二分，几千行也是一次 searchsorted。
+速度以 0.1 为单位用整数计算，避免浮点累加误差。
+
+用法示例：
+    python relics.py --speed 161.3 --speed 140
+    python relics.py --samples 20000000 --workers 4 --speed 150
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+from math import comb
+
+import numpy as np
+
+from engine import CONSTANTS
+
+# 副词条权重 (与主词条相同的属性不参与抽取)
+SUBSTAT_WEIGHTS = {
+    "HP": 10, "ATK": 10, "DEF": 10, "HP%": 10, "ATK%": 10, "DEF%": 10,
+    "SPD": 4, "CRIT Rate": 6, "CRIT DMG": 6, "EHR": 8, "RES": 8, "BE": 8,
+}
+
+# 流萤常用的六件主词条 (头、手、躯干、脚、球、绳)，None 表示主词条不在副词条池中
+FIREFLY_MAIN_STATS = ("HP", "ATK", "ATK%", "SPD", None, "BE")
+
+SPD_ROLLS = (20, 23, 26)  # 单条速度，单位 0.1
+SPD_MAIN_STAT = 25.032  # 五星速度鞋 +15
+FOUR_SUBSTAT_CHANCE = 0.2
+UPGRADES = 5
+
+DEFAULT_SAMPLES = 2_000_000
+_CHUNK = 1_000_000
+
+
+def _spd_rank_probs(main_stat):
+    """速度在副词条抽取顺序中排第 0..3 位的概率"""
+    pool = {k: w for k, w in SUBSTAT_WEIGHTS.items() if k != main_stat}
+    others = [k for k in pool if k != "SPD"]
+    probs = [0.0] * 4
+    for r in range(4):
+        # 前 r 次抽到其他词条 (有序)，第 r+1 次抽到速度
+        for prefix in permutations(others, r):
+            p, left = 1.0, sum(pool.values())
+            for k in prefix:
+                p *= pool[k] / left
+                left -= pool[k]
+            probs[r] += p * pool["SPD"] / left
+    return probs
+
+
+def _binom_pmf(n, p):
+    return [comb(n, k) * p ** k * (1 - p) ** (n - k) for k in range(n + 1)]
+
+
+def piece_speed_pmf(main_stat):
+    """
+    单件遗器速度副词条的精确分布，返回 (取值数组, 概率数组)，取值单位 0.1。
+    主词条为速度时副词条不可能有速度，分布为 0 点。
+    """
+    if main_stat == "SPD":
+        return np.array([0]), np.array([1.0])
+
+    # 速度排在抽取顺序前 4 位即会出现：初始 4 条时直接在其中，初始 3 条时由第一次强化补上 (占用这次强化)。
+    # 两种情况下之后分别还有 5 / 4 次强化，每次 1/4 概率落在速度上。
+    p_present = sum(_spd_rank_probs(main_stat))
+    n_rolls = np.zeros(UPGRADES + 2)
+    n_rolls[0] = 1.0 - p_present
+    for chance, upgrades in ((FOUR_SUBSTAT_CHANCE, UPGRADES), (1 - FOUR_SUBSTAT_CHANCE, UPGRADES - 1)):
+        for hits, p_hits in enumerate(_binom_pmf(upgrades, 0.25)):
+            n_rolls[1 + hits] += p_present * chance * p_hits
+
+    # k 条速度的取值分布：k 次等概率 {20, 23, 26} 的卷积
+    roll_pmf = np.zeros(SPD_ROLLS[-1] + 1)
+    roll_pmf[list(SPD_ROLLS)] = 1.0 / len(SPD_ROLLS)
+    total = np.zeros(SPD_ROLLS[-1] * (UPGRADES + 1) + 1)
+    dist = np.ones(1)
+    for k, p_k in enumerate(n_rolls):
+        if k:
+            dist = np.convolve(dist, roll_pmf)
+        total[:len(dist)] += p_k * dist
+    values = np.nonzero(total > 0)[0]
+    return values, total[values]
+
+
+def _sample_chunk(args):
+    """进程池任务：抽样 n 套遗器的副词条速度合计 (单位 0.1)"""
+    pmfs, n, seed = args
+    rng = np.random.default_rng(seed)
+    out = np.zeros(n, dtype=np.int32)
+    for values, probs in pmfs:
+        if len(values) == 1:
+            out += values[0]
+            continue
+        cdf = np.cumsum(probs)
+        cdf[-1] = 1.0
+        out += values[np.searchsorted(cdf, rng.random(n, dtype=np.float32), side="right")].astype(np.int32)
+    return out
+
+
+class SpeedOdds:
+    """
+    一套随机遗器的副词条速度分布 (排好序的样本)，以及按所需面板速度查询达成率 / 期望词条数。
+    extra_speed 为遗器以外的固定速度 (光锥、套装等)；速度鞋主词条已按 main_stats 计入。
+    """
+
+    def __init__(self, samples, main_stats=FIREFLY_MAIN_STATS, extra_speed=0.0, constants=None):
+        self.samples = np.sort(np.asarray(samples, dtype=np.int32))
+        self.main_stats = tuple(main_stats)
+        self.extra_speed = extra_speed
+        self.constants = constants or CONSTANTS
+        self._roll_sums = None
+
+    @classmethod
+    def simulate(cls, n_samples=DEFAULT_SAMPLES, main_stats=FIREFLY_MAIN_STATS, extra_speed=0.0,
+                 constants=None, seed=None, workers=0):
+        """抽样 n_samples 套遗器；workers > 0 时分块放进进程池"""
+        pmfs = [piece_speed_pmf(m) for m in main_stats]
+        chunks = [min(_CHUNK, n_samples - i) for i in range(0, n_samples, _CHUNK)]
+        seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+        tasks = [(pmfs, n, s) for n, s in zip(chunks, seeds)]
+        if workers:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_sample_chunk, tasks))
+        else:
+            parts = [_sample_chunk(t) for t in tasks]
+        return cls(np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32),
+                   main_stats, extra_speed, constants)
+
+    def gear_needed(self, panel_speed):
+        """达到面板速度 panel_speed 还需要的副词条速度 (单位 0.1，向上取整，不小于 0)"""
+        c = self.constants
+        main = SPD_MAIN_STAT * self.main_stats.count("SPD")
+        need = np.asarray(panel_speed, dtype=np.float64) - c["firefly_base_spd"] - main - self.extra_speed
+        return np.maximum(np.ceil(np.round(need * 10, 6)), 0).astype(np.int64)
+
+    def hit_rate(self, panel_speed):
+        """一套随机遗器的面板速度不低于 panel_speed 的概率 (可传数组)"""
+        need = self.gear_needed(panel_speed)
+        below = np.searchsorted(self.samples, need, side="left")
+        return 1.0 - below / max(len(self.samples), 1)
+
+    def expected_rolls(self, panel_speed):
+        """
+        凑够所需速度平均要几条速度副词条：E[N] = Σ_n P(前 n 条之和 < 所需)。
+        每条至少 2.0，所以 n 只需算到 所需 / 2.0 为止。
+        """
+        need = self.gear_needed(panel_speed)
+        n_max = int(need.max(initial=0)) // SPD_ROLLS[0] + 1
+        sums = self._sorted_roll_sums(n_max)
+        m = sums.shape[1]
+        expected = np.zeros(need.shape)
+        for n in range(n_max):
+            expected += np.searchsorted(sums[n], need, side="left") / m
+        return expected
+
+    def _sorted_roll_sums(self, n_rows, n=100_000):
+        """前 k 条速度之和 (k = 0..n_rows-1) 的抽样分布，每行排好序；行数不够时重新抽样"""
+        if self._roll_sums is None or len(self._roll_sums) < n_rows:
+            rng = np.random.default_rng(0)
+            rolls = np.asarray(SPD_ROLLS, dtype=np.int32)[rng.integers(0, len(SPD_ROLLS), (n, n_rows - 1))]
+            sums = np.zeros((n_rows, n), dtype=np.int32)
+            sums[1:] = np.cumsum(rolls, axis=1).T
+            sums.sort(axis=1)
+            self._roll_sums = sums
+        return self._roll_sums
+
+    def annotate(self, results):
+        """给结果行加上 hit_rate (达成率 0-1) 与 rolls (期望速度词条数)，原地修改并返回"""
+        if not results:
+            return results
+        speeds = np.fromiter((r["speed"] for r in results), dtype=np.float64, count=len(results))
+        rates = self.hit_rate(speeds).tolist()
+        rolls = self.expected_rolls(speeds).tolist()
+        for r, p, n in zip(results, rates, rolls):
+            r["hit_rate"] = p
+            r["rolls"] = n
+        return results
+
+
+_default_odds = None
+
+
+def default_odds():
+    """界面使用的默认分布 (首次调用时抽样，之后复用)"""
+    global _default_odds
+    if _default_odds is None:
+        _default_odds = SpeedOdds.simulate(seed=0)
+    return _default_odds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="遗器速度副词条蒙特卡洛：达成所需面板速度的概率")
+    parser.add_argument("--speed", type=float, action="append", required=True, help="所需面板速度，可重复")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="抽样套数")
+    parser.add_argument("--workers", type=int, default=0, help="进程数，0 表示单进程")
+    parser.add_argument("--extra-speed", type=float, default=0.0, help="遗器以外的固定速度")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    odds = SpeedOdds.simulate(args.samples, extra_speed=args.extra_speed, seed=args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    print(f"抽样 {args.samples} 套，用时 {elapsed:.2f}s ({args.samples / max(elapsed, 1e-9) / 1e6:.1f} 百万套/秒)",
+          file=sys.stderr)
+    speeds = np.array(args.speed)
+    for spd, p, n in zip(args.speed, odds.hit_rate(speeds), odds.expected_rolls(speeds)):
+        print(f"面板速度 {spd:.1f}: 达成率 {p:.2%}  期望速度词条 {n:.2f}")
+
+
+if __name__ == "__main__":
+    main()
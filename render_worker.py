@@ -0,0 +1,73 @@
+"""
+后台渲染线程：GUI 把“计算 + 绘图”交给这里执行，主线程只负责换图。
+
+只保留最新一次请求 (latest-request-wins)：新请求到来时尚未开始的旧请求被直接替换，
+正在执行的旧请求在阶段之间通过 is_stale() 发现自己已过期后提前退出。
+结果、部分结果、进度和异常都放进 results 队列，由 Tk 主线程用 root.after 轮询取出。
+"""
+import queue
+import threading
+
+
+class RenderWorker:
+    """
+    job_func(generation, params, worker) 在工作线程中执行，
+    返回 None 表示任务已过期被放弃，否则返回值原样交给主线程。
+    """
+
+    def __init__(self, job_func, name="render-worker"):
+        self._job_func = job_func
+        self._cond = threading.Condition()
+        self._pending = None  # (generation, params)
+        self._generation = 0
+        self._closed = False
+        self.results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def submit(self, params):
+        """提交新任务，覆盖尚未开始的旧任务，返回任务编号"""
+        with self._cond:
+            self._generation += 1
+            self._pending = (self._generation, params)
+            self._cond.notify()
+            return self._generation
+
+    def is_stale(self, generation):
+        """任务是否已被更新的请求取代"""
+        return generation != self._generation
+
+    def report(self, generation, message):
+        """工作线程上报进度"""
+        self.results.put(("progress", generation, message))
+
+    def partial(self, generation, payload):
+        """工作线程在任务完成前先交出部分结果 (例如第一页)"""
+        self.results.put(("partial", generation, payload))
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation, params = self._pending
+                self._pending = None
+
+            try:
+                result = self._job_func(generation, params, self)
+            except Exception as e:
+                self.results.put(("error", generation, e))
+                continue
+            if result is not None and not self.is_stale(generation):
+                self.results.put(("done", generation, result))
@@ -0,0 +1,153 @@
+"""
+流式结果管线：按首位角色分块枚举配队，逐块计算与筛选，
+只用一个有界堆保留排序最靠前的 offset + k 条，内存占用与候选规模无关。
+
+排序键可插拔："cost" / "speed" / "moves"，weighted_score(...) 生成的加权分，
+或任意接收批数组字典、返回同长度数组的函数。
+同分时先按金数降序、再按原始枚举顺序，与“to_results (金数降序) 之后再用 sort_results 稳定重排”的结果完全一致。
+"""
+import heapq
+
+import numpy as np
+
+from engine import TEAM_SIZE, combination_indices, pack_roster, parse_filter_settings, required_speed
+
+
+def iter_team_batches(roster, team_size: int = TEAM_SIZE):
+    """按首位角色分块产出合法配队 (B, k)，拼起来与 valid_teams 的顺序一致"""
+    n = len(roster)
+    for first in range(n - team_size + 1):
+        rest = combination_indices(n - first - 1, team_size - 1) + first + 1
+        teams = np.hstack([np.full((len(rest), 1), first, dtype=np.intp), rest])
+        if team_size >= 2 and len(teams):
+            bases = np.sort(roster.base_ids[teams], axis=1)
+            teams = teams[np.all(np.diff(bases, axis=1) != 0, axis=1)]
+        if len(teams):
+            yield teams
+
+
+def iter_result_batches(candidates, target_moves_list=(4, 5), filter_settings=None,
+                        constants=None, team_size: int = TEAM_SIZE):
+    """
+    逐块产出通过筛选的 (配队, 回合) 行，每块是一组等长的数组：
+    teams / moves / speed / cost / advance / spd_pct / seq (原始枚举序号)，
+    以及 teams_done (截至本块已枚举的配队数)
+    """
+    roster = pack_roster(candidates) if isinstance(candidates, dict) else candidates
+    moves = np.asarray(list(target_moves_list), dtype=np.float64)
+    f_min_spd, f_max_spd, f_min_cost, f_max_cost = parse_filter_settings(filter_settings)
+
+    team_offset = 0
+    for teams in iter_team_batches(roster, team_size):
+        total_advance = (roster.advance[teams] * roster.times[teams]).sum(axis=1)
+        total_spd_pct = roster.spd_pct[teams].sum(axis=1)
+        cost = roster.cost[teams].sum(axis=1)
+        speed = required_speed(total_advance[:, None], total_spd_pct[:, None], moves[None, :], constants)
+
+        mask = (speed >= f_min_spd) & (speed <= f_max_spd)
+        mask &= ((cost >= f_min_cost) & (cost <= f_max_cost))[:, None]
+        t_idx, m_idx = np.nonzero(mask)
+        yield {
+            "roster": roster,
+            "teams": teams[t_idx],
+            "moves": moves[m_idx].astype(np.int64),
+            "speed": speed[t_idx, m_idx],
+            "cost": cost[t_idx],
+            "advance": total_advance[t_idx],
+            "spd_pct": total_spd_pct[t_idx],
+            "seq": (team_offset + t_idx) * len(moves) + m_idx,
+            "teams_done": team_offset + len(teams),
+        }
+        team_offset += len(teams)
+
+
+def _row_dict(names, teams_row, moves, speed, cost, advance, spd_pct, avatar_paths):
+    team = tuple(names[i] for i in teams_row)
+    return {
+        "team": team,
+        "avatars": [avatar_paths.get(member) for member in team],
+        "moves": int(moves),
+        "advance_pct": float(advance) * 100,
+        "spd_pct": float(spd_pct) * 100,
+        "speed": float(speed),
+        "cost": int(cost),
+    }
+
+
+# --- 排序键 ---
+SORT_KEYS = {
+    "cost": lambda b: b["cost"],
+    "speed": lambda b: b["speed"],
+    "moves": lambda b: b["moves"],
+}
+
+# 各排序键的默认方向 (True 为降序)：金数沿用表格的降序，速度越低越好，回合越多越好
+DEFAULT_DESCENDING = {"cost": True, "speed": False, "moves": True, "score": False}
+
+
+def weighted_score(cost=1.0, speed=0.0, moves=0.0):
+    """加权分：cost * 金数 + speed * 所需速度 + moves * 回合数，默认升序 (越小越好)"""
+    def key(b):
+        return cost * b["cost"] + speed * b["speed"] + moves * b["moves"]
+    return key
+
+
+def resolve_sort_key(sort_key):
+    """把排序键名称或函数统一成 batch -> 数组 的函数"""
+    if callable(sort_key):
+        return sort_key
+    if sort_key == "score":
+        return weighted_score()
+    try:
+        return SORT_KEYS[sort_key]
+    except KeyError:
+        raise ValueError(f"未知排序键: {sort_key}") from None
+
+
+def top_k(candidates, k, sort_key="cost", descending=None, offset=0,
+          target_moves_list=(4, 5), filter_settings=None, avatar_paths=None,
+          constants=None, team_size: int = TEAM_SIZE):
+    """排序最靠前的 k 条结果 (跳过前 offset 条，可用于分页)，逐块维护有界堆"""
+    if descending is None:
+        descending = DEFAULT_DESCENDING.get(sort_key, True) if isinstance(sort_key, str) else True
+    key_func = resolve_sort_key(sort_key)
+    keep = max(offset + k, 0)
+    sign = -1.0 if descending else 1.0
+
+    # 排序次序为 (主键, -金数, 序号) 升序；堆顶是当前保留的最差一条：堆元素 (-主键, 金数, -序号, 行数据)
+    heap, names = [], None
+    for b in iter_result_batches(candidates, target_moves_list, filter_settings, constants, team_size):
+        names = b["roster"].names
+        primary = sign * np.asarray(key_func(b), dtype=np.float64)
+
+        # 先在块内排序粗选，每块的堆操作次数不超过 keep
+        pick = np.lexsort((b["seq"], -b["cost"], primary))[:keep]
+        for i in pick.tolist():
+            item = (-primary[i], int(b["cost"][i]), -int(b["seq"][i]),
+                    (tuple(b["teams"][i].tolist()), b["moves"][i], b["speed"][i], b["cost"][i],
+                     b["advance"][i], b["spd_pct"][i]))
+            if len(heap) < keep:
+                heapq.heappush(heap, item)
+            elif item[:3] > heap[0][:3]:
+                heapq.heapreplace(heap, item)
+
+    avatar_paths = avatar_paths or {}
+    ranked = sorted(heap, key=lambda item: (-item[0], -item[1], -item[2]))[offset:offset + k]
+    return [_row_dict(names, *item[3], avatar_paths) for item in ranked]
+
+
+def sort_results(results, sort_key="cost", descending=None):
+    """对已有的结果字典列表按同一套排序键重新排序 (稳定排序)"""
+    if descending is None:
+        descending = DEFAULT_DESCENDING.get(sort_key, True) if isinstance(sort_key, str) else True
+    if not results:
+        return list(results)
+    key_func = resolve_sort_key(sort_key)
+    batch = {
+        "cost": np.array([r["cost"] for r in results], dtype=np.int64),
+        "speed": np.array([r["speed"] for r in results], dtype=np.float64),
+        "moves": np.array([r["moves"] for r in results], dtype=np.int64),
+    }
+    primary = np.asarray(key_func(batch), dtype=np.float64)
+    order = np.argsort(-primary if descending else primary, kind="stable")
+    return [results[i] for i in order.tolist()]
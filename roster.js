@@ -0,0 +1,75 @@
+// 由 roster.py 根据 roster.json 生成，请勿手动修改 (python roster.py --export-web)
+window.ROSTER_DATA = {
+ "hash": "050dfa4105b45e19",
+ "constants": {
+  "FIREFLY_BASE_SPD": 104.0,
+  "FIREFLY_ULT_FLAT": 60.0,
+  "SUMMON_SPEED": 70.0
+ },
+ "candidates": {
+  "大丽花": {
+   "spd_pct": 0.3,
+   "advance": 0.0,
+   "base": "dahlia",
+   "cost": 1,
+   "times": 1,
+   "img": "avatars/dahlia.jpg"
+  },
+  "6魂大丽花": {
+   "spd_pct": 0.3,
+   "advance": 0.2,
+   "base": "dahlia",
+   "cost": 7,
+   "times": 1,
+   "img": "avatars/dahlia6.jpg"
+  },
+  "忘归人": {
+   "spd_pct": 0.0,
+   "advance": 0.0,
+   "base": "wang",
+   "cost": 1,
+   "times": 1,
+   "img": "avatars/wang.jpg"
+  },
+  "2魂忘归人": {
+   "spd_pct": 0.0,
+   "advance": 0.24,
+   "base": "wang",
+   "cost": 3,
+   "times": 1,
+   "img": "avatars/wang2.jpg"
+  },
+  "阮·梅": {
+   "spd_pct": 0.1,
+   "advance": 0.0,
+   "base": "ruan",
+   "cost": 0,
+   "times": 1,
+   "img": "avatars/ruan.jpg"
+  },
+  "开拓者(555)": {
+   "spd_pct": 0.0,
+   "advance": 0.24,
+   "base": "kaituozhe",
+   "cost": 0,
+   "times": 1,
+   "img": "avatars/aki.jpg"
+  },
+  "开拓者": {
+   "spd_pct": 0.0,
+   "advance": 0.0,
+   "base": "kaituozhe",
+   "cost": 0,
+   "times": 1,
+   "img": "avatars/aki.jpg"
+  },
+  "加拉赫/灵砂": {
+   "spd_pct": 0.0,
+   "advance": 0.0,
+   "base": "heel",
+   "cost": 0,
+   "times": 1,
+   "img": "avatars/lingsha.jpg"
+  }
+ }
+};
@@ -0,0 +1,202 @@
+"""
+角色与公式常量的唯一数据源：roster.json。
+
+load_roster() 读取并校验一次 (按文件修改时间缓存)，得到列式存储的 RosterData 和内容哈希；
+gui.py / speed.py / batch.py 都从这里取数据，速度索引等缓存以内容哈希为键。
+index.html 使用的 roster.js 由本模块导出：
+
+    python roster.py                 # 校验并打印内容哈希
+    python roster.py --export-web    # 重新生成 roster.js
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+ROSTER_VERSION = 1
+DEFAULT_ROSTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "roster.json")
+DEFAULT_WEB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "roster.js")
+
+CONSTANT_KEYS = ("firefly_base_spd", "firefly_ult_flat", "summon_speed")
+
+# 字段名 -> (类型, 最小值, 最大值)，None 表示不限
+CANDIDATE_FIELDS = {
+    "name": (str, None, None),
+    "spd_pct": (float, 0.0, None),
+    "advance": (float, 0.0, 1.0),
+    "base": (str, None, None),
+    "cost": (int, 0, None),
+    "img": (str, None, None),
+    "times": (int, 1, None),
+}
+
+
+class RosterError(ValueError):
+    """roster.json 内容不合法"""
+
+
+def content_hash(payload) -> str:
+    """任意 JSON 数据的规范化 sha256 (键排序、无多余空白)，取前 16 位"""
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def _check_value(where, field, value, spec):
+    kind, lo, hi = spec
+    if kind is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if not isinstance(value, kind) or isinstance(value, bool):
+        raise RosterError(f"{where}: {field} 应为 {kind.__name__}，实际为 {value!r}")
+    if kind is str and not value:
+        raise RosterError(f"{where}: {field} 不能为空")
+    if lo is not None and value < lo:
+        raise RosterError(f"{where}: {field}={value} 小于 {lo}")
+    if hi is not None and value > hi:
+        raise RosterError(f"{where}: {field}={value} 大于 {hi}")
+    return value
+
+
+def validate(data: dict):
+    """校验原始 JSON，返回 (常量字典, 角色记录列表)，不合法时抛出 RosterError"""
+    if data.get("version") != ROSTER_VERSION:
+        raise RosterError(f"不支持的 roster 版本: {data.get('version')!r}")
+
+    raw_constants = data.get("constants") or {}
+    missing = [k for k in CONSTANT_KEYS if k not in raw_constants]
+    if missing:
+        raise RosterError(f"constants 缺少: {', '.join(missing)}")
+    constants = {k: float(_check_value("constants", k, raw_constants[k], (float, 0.0, None))) for k in CONSTANT_KEYS}
+    if constants["summon_speed"] <= 0:
+        raise RosterError("constants: summon_speed 必须大于 0")
+
+    records = []
+    seen = set()
+    for i, raw in enumerate(data.get("candidates") or []):
+        where = f"candidates[{i}]"
+        unknown = set(raw) - set(CANDIDATE_FIELDS)
+        if unknown:
+            raise RosterError(f"{where}: 未知字段 {', '.join(sorted(unknown))}")
+        rec = {}
+        for field, spec in CANDIDATE_FIELDS.items():
+            if field not in raw:
+                if field == "times":
+                    rec[field] = 1
+                    continue
+                raise RosterError(f"{where}: 缺少字段 {field}")
+            rec[field] = _check_value(where, field, raw[field], spec)
+        if rec["name"] in seen:
+            raise RosterError(f"{where}: 角色名重复 {rec['name']!r}")
+        seen.add(rec["name"])
+        records.append(rec)
+    if not records:
+        raise RosterError("candidates 为空")
+    return constants, records
+
+
+class RosterData:
+    """校验后的角色表：每个字段一列 (数值列为 NumPy 数组)，附带内容哈希"""
+
+    def __init__(self, constants, records, path=None):
+        self.path = path
+        self.constants = constants
+        self.names = [r["name"] for r in records]
+        self.bases = [r["base"] for r in records]
+        self.imgs = [r["img"] for r in records]
+        self.spd_pct = np.array([r["spd_pct"] for r in records], dtype=np.float64)
+        self.advance = np.array([r["advance"] for r in records], dtype=np.float64)
+        self.cost = np.array([r["cost"] for r in records], dtype=np.int64)
+        self.times = np.array([r["times"] for r in records], dtype=np.int64)
+        self.hash = content_hash({"version": ROSTER_VERSION, "constants": constants, "candidates": records})
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, with_img=True) -> dict:
+        """{名字: 数据} 形式的候选字典 (每次返回新副本，调用方可以随意修改)"""
+        out = {}
+        for i, name in enumerate(self.names):
+            d = {
+                "spd_pct": float(self.spd_pct[i]),
+                "advance": float(self.advance[i]),
+                "base": self.bases[i],
+                "cost": int(self.cost[i]),
+                "times": int(self.times[i]),
+            }
+            if with_img:
+                d["img"] = self.imgs[i]
+            out[name] = d
+        return out
+
+    def avatar_paths(self) -> dict:
+        return dict(zip(self.names, self.imgs))
+
+    def web_payload(self) -> dict:
+        """index.html 使用的数据 (常量键沿用页面脚本里的大写写法)"""
+        return {
+            "hash": self.hash,
+            "constants": {k.upper(): v for k, v in self.constants.items()},
+            "candidates": self.candidates(),
+        }
+
+
+_cache = {}  # 绝对路径 -> (mtime, RosterData)
+_cache_lock = threading.Lock()
+
+
+def load_roster(path=None) -> RosterData:
+    """读取并校验 roster 文件，文件未修改时直接返回缓存的结果"""
+    path = os.path.abspath(path or DEFAULT_ROSTER_PATH)
+    mtime = os.stat(path).st_mtime_ns
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+    with open(path, encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise RosterError(f"{path}: JSON 解析失败: {e}") from None
+    roster = RosterData(*validate(data), path=path)
+
+    with _cache_lock:
+        _cache[path] = (mtime, roster)
+    return roster
+
+
+def export_web(roster: RosterData, path=DEFAULT_WEB_PATH):
+    """
+    生成 index.html 加载的 roster.js。
+    内容是一段 JSON 赋给 window.ROSTER_DATA：以 <script> 引入，直接双击打开 (file://) 也能读取。
+    """
+    body = json.dumps(roster.web_payload(), ensure_ascii=False, indent=1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("// 由 roster.py 根据 roster.json 生成，请勿手动修改 (python roster.py --export-web)\n")
+        f.write(f"window.ROSTER_DATA = {body};\n")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="校验 roster.json 并导出网页数据")
+    parser.add_argument("path", nargs="?", default=DEFAULT_ROSTER_PATH)
+    parser.add_argument("--export-web", nargs="?", const=DEFAULT_WEB_PATH, metavar="OUT",
+                        help="生成 index.html 使用的 roster.js")
+    args = parser.parse_args(argv)
+
+    try:
+        roster = load_roster(args.path)
+    except RosterError as e:
+        print(f"校验失败: {e}", file=sys.stderr)
+        return 1
+    print(f"{len(roster)} 个角色，内容哈希 {roster.hash}")
+    if args.export_web:
+        print(f"已导出: {export_web(roster, args.export_web)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""
+本地 HTTP 服务：一台机器为多人提供计算结果，不需要 Tk 桌面，也不依赖网页里的 JS 计算。
+
+只用标准库 asyncio 实现一个最小的 HTTP/1.1 服务 (支持 keep-alive)，计算和绘图放进线程池。
+查询是一个 JSON 对象，规范化后作为缓存键：
+
+    {"selected": ["阮·梅", ...],      # 候选角色，默认全部
+     "times": {"2魂忘归人": 2},       # 触发次数，默认取 roster.json
+     "moves": [4, 5],                 # 目标回合
+     "filters": {"min_spd": 100, "max_spd": 300, "min_cost": 0, "max_cost": 11},
+     "sort": "cost", "page": 0, "page_size": 50, "odds": false}
+
+接口：
+    GET  /api/roster                  角色与常量
+    POST /api/results  (或 GET ?q=)   一页 JSON 结果
+    POST /api/tile     (或 GET ?q=)   同一页渲染成 PNG
+    GET  /api/stats                   缓存命中 / 合并请求计数
+
+响应按规范化查询放进 LRU 缓存；相同查询正在计算时，后到的请求等待同一个结果，不重复计算。
+
+用法示例：
+    python server.py --port 8765
+    curl -d '{"moves": [5], "page_size": 5}' http://127.0.0.1:8765/api/results
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from engine import evaluate_teams, parse_filter_settings
+from profiling import span
+from relics import default_odds
+from result_stream import DEFAULT_DESCENDING, sort_results
+from roster import content_hash, load_roster
+from speed import generate_team_image_table
+
+MAX_BODY = 64 * 1024
+MAX_PAGE_SIZE = 500
+DEFAULT_MOVES = (4, 5)
+
+
+class QueryError(ValueError):
+    """查询内容不合法 (返回 400)"""
+
+
+def _is_int(v):
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def normalize_query(query: dict, roster) -> dict:
+    """
+    校验并规范化查询：名字去重并按 roster 顺序排列、与默认值相同的 times 去掉、区间转为数值。
+    语义相同的查询得到相同的结果，也就共享同一个缓存键。字段类型不对时抛出 QueryError。
+    """
+    if not isinstance(query, dict):
+        raise QueryError("查询应为 JSON 对象")
+    unknown = set(query) - {"selected", "times", "moves", "filters", "sort", "page", "page_size", "odds"}
+    if unknown:
+        raise QueryError(f"未知字段: {', '.join(sorted(unknown))}")
+
+    known = dict(zip(roster.names, roster.times.tolist()))
+    selected = query.get("selected")
+    if selected is None:
+        selected = list(roster.names)
+    else:
+        if not isinstance(selected, list) or not all(isinstance(name, str) for name in selected):
+            raise QueryError("selected 应为角色名列表")
+        missing = [name for name in dict.fromkeys(selected) if name not in known]
+        if missing:
+            raise QueryError(f"未知角色: {', '.join(missing)}")
+        chosen = set(selected)
+        selected = [name for name in roster.names if name in chosen]
+
+    raw_times = query.get("times")
+    if raw_times is None:
+        raw_times = {}
+    if not isinstance(raw_times, dict):
+        raise QueryError("times 应为 {角色名: 次数} 对象")
+    times = {}
+    for name, t in raw_times.items():
+        if name not in known:
+            raise QueryError(f"未知角色: {name}")
+        if not _is_int(t) or t < 1:
+            raise QueryError(f"times[{name}] 应为正整数")
+        if name in selected and t != known[name]:
+            times[name] = t
+
+    moves = query.get("moves")
+    if moves is None or moves == []:
+        moves = list(DEFAULT_MOVES)
+    if not isinstance(moves, list) or not moves or not all(_is_int(m) and m >= 1 for m in moves):
+        raise QueryError("moves 应为正整数列表")
+    moves = sorted(set(moves))
+
+    filters = query.get("filters")
+    if filters is None:
+        filters = {}
+    if not isinstance(filters, dict):
+        raise QueryError("filters 应为对象")
+    bad = [k for k, v in filters.items()
+           if k not in ("min_spd", "max_spd", "min_cost", "max_cost") or not _is_number(v)]
+    if bad:
+        raise QueryError(f"filters 字段不合法: {', '.join(map(str, bad))}")
+    try:
+        min_spd, max_spd, min_cost, max_cost = parse_filter_settings(filters)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise QueryError(f"filters 数值不合法: {e}") from None
+
+    page = query.get("page", 0)
+    page_size = query.get("page_size", 50)
+    if not _is_int(page) or not _is_int(page_size) or page < 0 or not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise QueryError(f"page 应为非负整数，page_size 应为 1-{MAX_PAGE_SIZE} 之间的整数")
+    sort = query.get("sort", "cost")
+    if not isinstance(sort, str) or sort not in DEFAULT_DESCENDING:
+        raise QueryError(f"未知排序键: {sort}")
+    odds = query.get("odds", False)
+    if not isinstance(odds, bool):
+        raise QueryError("odds 应为 true / false")
+
+    return {
+        "roster": roster.hash,
+        "selected": selected,
+        "times": times,
+        "moves": moves,
+        "filters": [min_spd, max_spd, min_cost, max_cost],
+        "sort": sort,
+        "page": page,
+        "page_size": page_size,
+        "odds": odds,
+    }
+
+
+class ResponseCache:
+    """按响应字节数限额的 LRU 缓存，键为 (接口, 规范化查询哈希)"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # key -> (content_type, body, etag)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key, item):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._items[key] = item
+            self._bytes += len(item[1])
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted[1])
+
+    def __len__(self):
+        return len(self._items)
+
+
+class CalculatorService:
+    """
+    查询 -> 响应 (content_type, body, etag)。
+    先查 LRU 缓存；未命中且同一查询正在计算时，等待那一次的结果 (请求合并)；否则在线程池中计算。
+    """
+
+    def __init__(self, roster_path=None, cache_bytes=64 * 1024 * 1024, workers=4, avatar_size=64, font_path=None):
+        self.roster_path = roster_path
+        self.cache = ResponseCache(cache_bytes)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.avatar_size = avatar_size
+        self.font_path = font_path
+        self._inflight = {}  # key -> asyncio.Future
+        self.coalesced = 0
+        self.computed = 0
+
+    def roster(self):
+        return load_roster(self.roster_path)  # 文件未修改时直接返回缓存
+
+    async def respond(self, kind, raw_query):
+        """返回 (content_type, body, etag, 缓存状态)，状态为 hit / miss / coalesced"""
+        roster = self.roster()
+        query = normalize_query(raw_query, roster)
+        key = (kind, content_hash(query))
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return (*cached, "hit")
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return (*await asyncio.shield(pending), "coalesced")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            build = self._build_tile if kind == "tile" else self._build_page
+            content_type, body = await asyncio.get_running_loop().run_in_executor(self.executor, build, roster, query)
+            item = (content_type, body, f'"{hashlib.sha1(body).hexdigest()[:16]}"')
+            self.computed += 1
+            self.cache.put(key, item)
+            future.set_result(item)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 没有等待者时不报“异常未被取回”
+            raise
+        finally:
+            del self._inflight[key]
+        return (*item, "miss")
+
+    def _page_results(self, roster, query):
+        """按规范化查询计算一页结果 (在工作线程中执行)"""
+        candidates = roster.candidates()
+        cands = {name: dict(candidates[name], times=query["times"].get(name, candidates[name]["times"]))
+                 for name in query["selected"]}
+        with span("compute", api=True):
+            ev = evaluate_teams(cands, query["moves"], dict(zip(("min_spd", "max_spd", "min_cost", "max_cost"),
+                                                              query["filters"])), roster.constants)
+            results = ev.to_results({name: d["img"] for name, d in cands.items()})
+            if query["sort"] != "cost":
+                results = sort_results(results, query["sort"])
+        start = query["page"] * query["page_size"]
+        rows = results[start:start + query["page_size"]]
+        if query["odds"]:
+            default_odds().annotate(rows)
+        return cands, rows, len(results)
+
+    def _build_page(self, roster, query):
+        _, rows, total = self._page_results(roster, query)
+        body = {
+            "roster": roster.hash,
+            "total": total,
+            "page": query["page"],
+            "page_size": query["page_size"],
+            "rows": [dict(r, team=list(r["team"])) for r in rows],
+        }
+        return "application/json; charset=utf-8", json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+    def _build_tile(self, roster, query):
+        cands, rows, _ = self._page_results(roster, query)
+        img = generate_team_image_table(cands, provided_results=rows, avatar_size=self.avatar_size,
+                                        font_path=self.font_path)
+        buf = io.BytesIO()
+        with span("save", api=True):
+            img.save(buf, "PNG", compress_level=1)
+        return "image/png", buf.getvalue()
+
+    def stats(self):
+        return {
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "coalesced": self.coalesced,
+            "computed": self.computed,
+            "inflight": len(self._inflight),
+        }
+
+
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def _json_body(obj):
+    return "application/json; charset=utf-8", json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _content_length(headers):
+    """解析 Content-Length，返回 (长度, None) 或 (0, (状态码, content_type, body))"""
+    if "transfer-encoding" in headers:
+        return 0, (411, *_json_body({"error": "不支持分块传输，请提供 Content-Length"}))
+    raw = headers.get("content-length", "")
+    if not raw:
+        return 0, None
+    if not (raw.isascii() and raw.isdigit()):
+        return 0, (400, *_json_body({"error": f"Content-Length 不合法: {raw}"}))
+    length = int(raw)
+    if length > MAX_BODY:
+        return 0, (413, *_json_body({"error": "请求体过大"}))
+    return length, None
+
+
+class ApiServer:
+    """把 HTTP 请求分派给 CalculatorService"""
+
+    def __init__(self, service: CalculatorService):
+        self.service = service
+
+    async def handle(self, method, target, headers, body):
+        """返回 (状态码, content_type, body, 额外响应头)"""
+        url = urlsplit(target)
+        if method == "OPTIONS":
+            return 200, "text/plain", b"", {}
+        if url.path == "/api/roster" and method == "GET":
+            return (200, *_json_body(self.service.roster().web_payload()), {})
+        if url.path == "/api/stats" and method == "GET":
+            return (200, *_json_body(self.service.stats()), {})
+        if url.path not in ("/api/results", "/api/tile"):
+            return (404, *_json_body({"error": f"没有这个接口: {url.path}"}), {})
+        if method not in ("GET", "POST"):
+            return (405, *_json_body({"error": "只支持 GET / POST"}), {})
+
+        try:
+            if method == "POST":
+                raw = json.loads(body or b"{}")
+            else:
+                raw = json.loads(parse_qs(url.query).get("q", ["{}"])[0])
+        except ValueError as e:  # 含 JSONDecodeError 与非法 UTF-8
+            return (400, *_json_body({"error": f"JSON 解析失败: {e}"}), {})
+
+        kind = "tile" if url.path == "/api/tile" else "results"
+        try:
+            content_type, payload, etag, status = await self.service.respond(kind, raw)
+        except QueryError as e:
+            return (400, *_json_body({"error": str(e)}), {})
+        extra = {"X-Cache": status, "ETag": etag}
+        if headers.get("if-none-match") == etag:
+            return 304, content_type, b"", extra
+        return 200, content_type, payload, extra
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length, error = _content_length(headers)
+                if error is not None:
+                    status, content_type, payload, extra = *error, {}
+                    keep_alive = False  # 请求体边界未知，不能继续读同一连接
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, content_type, payload, extra = await self.handle(method.upper(), target, headers, body)
+                    except Exception as e:  # 计算出错时返回 500，连接继续可用
+                        status, content_type, payload, extra = 500, *_json_body({"error": repr(e)}), {}
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and version.upper() == "HTTP/1.1")
+
+                head = [
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(payload)}",
+                    "Access-Control-Allow-Origin: *",
+                    "Access-Control-Allow-Headers: Content-Type, If-None-Match",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                head += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=8765, service=None, ready=None):
+    """启动服务并一直运行；ready 为 asyncio.Event 时在开始监听后 set()"""
+    api = ApiServer(service or CalculatorService())
+    server = await asyncio.start_server(api.serve_connection, host, port)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="流萤配队速度计算 HTTP 服务 (JSON / PNG)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--roster", help="roster.json 路径，默认使用仓库内的文件")
+    parser.add_argument("--workers", type=int, default=4, help="计算 / 绘图线程数")
+    parser.add_argument("--cache-mb", type=int, default=64, help="响应缓存上限 (MB)")
+    parser.add_argument("--font", help="表格字体路径")
+    args = parser.parse_args(argv)
+
+    service = CalculatorService(args.roster, args.cache_mb * 1024 * 1024, args.workers, font_path=args.font)
+    print(f"服务地址: http://{args.host}:{args.port}/api/results", file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
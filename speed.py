@@ -1,31 +1,281 @@
-import itertools
-import csv
-from PIL import Image, ImageDraw, ImageFont
-import os
-import os
-import itertools
-from PIL import Image, ImageDraw, ImageFont
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageDraw
+
+from assets import ImageLRU, font_registry, get_avatar
+from engine import CONSTANTS, compute_results
+from profiling import profiled, span
+from roster import load_roster
+from result_stream import sort_results, top_k
+
+# 行图块向上多留的像素，容纳画在行顶之上的徽标文字
+ROW_TILE_PAD = 4
+
+# 渲染好的行图块缓存：内容不变的行在多次重绘之间直接复用
+row_tile_cache = ImageLRU()
+
+# 头像 + 徽标、文字行等精灵图块缓存：行图块由它们拼贴而成
+sprite_cache = ImageLRU(16 * 1024 * 1024)
+
+# 文本区的行距
+TEXT_LINE_HEIGHT = 18
+
+# 行数达到 STRIP_ROWS 时分条带并行绘制，最后拼接
+STRIP_ROWS = 128
+STRIP_WORKERS = 4
+
+# 行文本可能用到的全部字符，用于检查字形高度
+_TEXT_PROBE = "目标金数面板速度全队拉条加动:0123456789.%- "
+_separable_fonts = {}  # 实际字体路径 -> 是否可逐行缓存
+
+# FreeType 字体对象不保证线程安全，各线程绘制文字时串行化 (贴图不需要加锁)
+_tile_draw_lock = threading.Lock()
 
 def get_default_font(font_path=None, size=16):
-    """辅助函数：尝试获取可用字体，防止报错"""
-    # 1. 尝试用户提供的路径
-    if font_path and os.path.exists(font_path):
-        return ImageFont.truetype(font_path, size)
-    
-    # 2. 尝试常见的系统中文路径 (Windows/Mac/Linux)
-    system_fonts = [
-        "msyh.ttc", "simhei.ttf", "arialuni.ttf",  # Windows
-        "/System/Library/Fonts/PingFang.ttc",      # MacOS
-        "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf" # Linux
+    """辅助函数：获取可用字体，防止报错 (经全局字体注册表缓存，只探测一次系统字体)"""
+    return font_registry.get(font_path, size)
+
+def table_layout(avatar_size=64):
+    """表格尺寸参数"""
+    avatar_area_width = avatar_size * 3 + 30  # 3个头像 + 间隙
+    text_area_width = 280
+    row_height = max(avatar_size + 20, 90) # 保证高度足够放下文本
+    margin = 15
+    return {
+        "avatar_area_width": avatar_area_width,
+        "text_area_width": text_area_width,
+        "row_height": row_height,
+        "margin": margin,
+        "total_width": avatar_area_width + text_area_width + margin * 2,
+    }
+
+def table_height(n_rows, avatar_size=64):
+    """整张表格的高度 (含上下边距)"""
+    layout = table_layout(avatar_size)
+    return n_rows * layout["row_height"] + layout["margin"] * 2
+
+def row_tile_top(index, avatar_size=64):
+    """第 index 行图块在整表中的 y 坐标 (与 generate_team_image_table 的贴图位置一致)"""
+    layout = table_layout(avatar_size)
+    return layout["margin"] + index * layout["row_height"] - ROW_TILE_PAD
+
+def rows_in_viewport(top, bottom, n_rows, avatar_size=64, prefetch=0):
+    """返回与 [top, bottom) 区间相交的行号范围 (start, stop)，两端各多取 prefetch 行"""
+    layout = table_layout(avatar_size)
+    rh = layout["row_height"]
+    start = int((top - layout["margin"] + ROW_TILE_PAD) // rh) - prefetch
+    stop = int((bottom - layout["margin"] + ROW_TILE_PAD) // rh) + 1 + prefetch
+    stop = max(0, min(n_rows, stop))
+    return min(max(0, start), stop), stop
+
+def _row_text_lines(r):
+    # 使用 provided_results 中的预计算数据
+    target = f"目标: {r['moves']} 动"
+    if "to_next" in r:
+        # engine.evaluate_speeds 的反查结果：最多回合数，以及再多一动还差的速度
+        target = f"最多: {r['moves']} 动      再 +{r['to_next']:.1f} 可 {r['moves'] + 1} 动"
+    if "hit_rate" in r:
+        # relics.SpeedOdds.annotate 加上的遗器达成率与期望速度词条数
+        target += f"      达成率 {r['hit_rate']:.1%}  约 {r['rolls']:.1f} 条"
+    return [
+        target,
+        f"金数: {r['cost']}         面板速度: {r['speed']:.1f}",
+        f"全队拉条: {r.get('advance_pct', 0):.0f}%",
+        f"全队速加: {r.get('spd_pct', 0):.0f}%",
     ]
-    for f in system_fonts:
-        try:
-            return ImageFont.truetype(f, size)
-        except:
-            continue
-            
-    # 3. 最后回退到默认（不支持中文）
-    return ImageFont.load_default()
+
+def _row_content(r, candidates: dict):
+    """一行结果的可见内容：(配队, 头像路径, 每人 (金数, 次数), 文本行)"""
+    team = tuple(r["team"])
+    current_avatars = tuple(r.get("avatars", []))
+    # 需要回溯 candidates 获取 cost，防止 provided_results 里没有详细 cost 数据
+    badges = tuple(
+        (candidates.get(name, {}).get("cost", 0), candidates.get(name, {}).get("times", 1))
+        for name in team
+    )
+    return team, current_avatars, badges, tuple(_row_text_lines(r))
+
+def render_row_tile(r, candidates: dict, avatar_size=64, font_path=None):
+    """
+    绘制单行结果图块 (不含分割线)。
+    图块宽为整表宽度，高为 row_height，顶部比行起点高 ROW_TILE_PAD 像素。
+    按行的可见内容缓存，内容不变的行不会重复绘制。
+    """
+    layout = table_layout(avatar_size)
+    team, current_avatars, badges, text_lines = _row_content(r, candidates)
+    key = (team, current_avatars, badges, text_lines, avatar_size, font_path)
+    tile = row_tile_cache.get(key)
+    if tile is not None:
+        return tile
+
+    tile = _draw_row_tile(team, current_avatars, badges, text_lines, layout, avatar_size, font_path)
+    row_tile_cache.put(key, tile)
+    return tile
+
+@profiled("draw_row")
+def _draw_row_tile(team, current_avatars, badges, text_lines, layout, avatar_size, font_path):
+    tile = Image.new("RGB", (layout["total_width"], layout["row_height"]), "white")
+    _draw_row_into(tile, 0, team, current_avatars, badges, text_lines, layout, avatar_size, font_path)
+    return tile
+
+def _draw_row_into(img, top, team, current_avatars, badges, text_lines, layout, avatar_size, font_path):
+    """把一行贴到 img 的 top 处 (top 对应行图块顶部)，头像和文字都取自精灵缓存"""
+    x = layout["margin"]
+
+    # --- A. 头像 + 徽标 ---
+    for i, avatar_path in enumerate(current_avatars):
+        cost, times = badges[i]
+        sprite = avatar_sprite(team[i], avatar_path, cost, times, avatar_size, font_path)
+        img.paste(sprite, (x + i * (avatar_size + 10), top))
+
+    x += layout["avatar_area_width"]
+
+    # --- B. 文本 ---
+    width = layout["total_width"] - x
+    text_y = ROW_TILE_PAD + 5
+    if _lines_separable(font_path):
+        for j, line in enumerate(text_lines):
+            img.paste(text_line_sprite(line, width, font_path), (x, top + text_y + j * TEXT_LINE_HEIGHT))
+    else:
+        sprite = text_block_sprite(text_lines, width, layout["row_height"], text_y, font_path)
+        img.paste(sprite, (x, top))
+
+def avatar_sprite(name, avatar_path, cost, times, avatar_size=64, font_path=None):
+    """
+    单个头像连同徽标的合成图块：宽为一个头像槽位 (头像 + 10 像素间隙)，高为行高，
+    纵坐标与行图块一致。不同 (角色, 金数, 次数) 的组合很少，每种只画一次。
+    """
+    key = ("avatar", name, avatar_path, cost, times, avatar_size, font_path)
+    sprite = sprite_cache.get(key)
+    if sprite is None:
+        with _tile_draw_lock:
+            sprite = _draw_avatar_sprite(name, avatar_path, cost, times, avatar_size, font_path)
+        sprite_cache.put(key, sprite)
+    return sprite
+
+def _draw_avatar_sprite(name, avatar_path, cost, times, avatar_size, font_path):
+    font_main = get_default_font(font_path, 16)
+    sprite = Image.new("RGB", (avatar_size + 10, table_layout(avatar_size)["row_height"]), "white")
+    draw = ImageDraw.Draw(sprite)
+    avatar_x = 0
+    y = ROW_TILE_PAD
+
+    # 绘制底图 (头像经全局缓存解码缩放，每个 (路径, 尺寸) 只处理一次)
+    avatar_img = get_avatar(avatar_path, avatar_size)
+    if avatar_img is not None:
+        sprite.paste(avatar_img, (avatar_x, y), avatar_img)
+    else:
+        draw.rectangle([avatar_x, y, avatar_x+avatar_size, y+avatar_size], outline="#ccc", width=1)
+        # 尝试取名字首字
+        draw.text((avatar_x+20, y+20), (name or "?")[0], fill="#999", font=font_main)
+
+    # 红点 (Cost > 1)
+    if cost > 1:
+        draw.ellipse([avatar_x + avatar_size - 18, y, avatar_x + avatar_size, y + 18], fill="#ff4d4f")
+        draw.text((avatar_x + avatar_size - 13, y - 1), str(cost-1), fill="white", font=font_main)
+
+    # 蓝点 (555)
+    if "555" in name:
+         draw.ellipse([avatar_x + avatar_size - 18, y + 22, avatar_x + avatar_size, y + 40], fill="#1890ff")
+         draw.text((avatar_x + avatar_size - 13, y + 21), "5", fill="white", font=font_main)
+
+    if times > 1:
+         draw.ellipse([avatar_x + avatar_size - 18, y + 44, avatar_x + avatar_size, y + 62], fill="#52c41a")
+         draw.text((avatar_x + avatar_size - 13, y + 43), str(times), fill="white", font=font_main)
+
+    return sprite
+
+def _lines_separable(font_path=None):
+    """
+    文本行的字形是否都落在各自的行距 (TEXT_LINE_HEIGHT) 之内。
+    是则逐行缓存 (目标回合、拉条、速加几行的取值很少，大多能复用)，否则整块缓存。
+    """
+    path = font_registry.resolve(font_path)
+    separable = _separable_fonts.get(path)
+    if separable is None:
+        with _tile_draw_lock:
+            _, top, _, bottom = get_default_font(font_path, 16).getbbox(_TEXT_PROBE)
+        separable = _separable_fonts[path] = top >= 0 and bottom <= TEXT_LINE_HEIGHT
+    return separable
+
+def text_line_sprite(line, width, font_path=None):
+    """单行文字图块 (高 TEXT_LINE_HEIGHT)"""
+    key = ("line", line, width, font_path)
+    sprite = sprite_cache.get(key)
+    if sprite is None:
+        sprite = Image.new("RGB", (width, TEXT_LINE_HEIGHT), "white")
+        with _tile_draw_lock, span("draw_text"):
+            ImageDraw.Draw(sprite).text((0, 0), line, fill="#333", font=get_default_font(font_path, 16))
+        sprite_cache.put(key, sprite)
+    return sprite
+
+def text_block_sprite(lines, width, height, text_y, font_path=None):
+    """整块文字图块 (高为行高，第一行从 text_y 开始)"""
+    key = ("block", lines, width, height, text_y, font_path)
+    sprite = sprite_cache.get(key)
+    if sprite is None:
+        sprite = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(sprite)
+        with _tile_draw_lock, span("draw_text"):
+            font_main = get_default_font(font_path, 16)
+            for j, line in enumerate(lines):
+                draw.text((0, text_y + j * TEXT_LINE_HEIGHT), line, fill="#333", font=font_main)
+        sprite_cache.put(key, sprite)
+    return sprite
+
+@profiled("draw_strip")
+def render_strip(results, start, stop, candidates: dict, avatar_size=64, font_path=None):
+    """把第 start 到 stop-1 行画进一张横向条带 (顶部对齐第 start 行的行图块)，不经过行图块缓存"""
+    layout = table_layout(avatar_size)
+    row_height = layout["row_height"]
+    strip = Image.new("RGB", (layout["total_width"], (stop - start) * row_height), "white")
+    for i in range(start, stop):
+        team, current_avatars, badges, text_lines = _row_content(results[i], candidates)
+        _draw_row_into(strip, (i - start) * row_height, team, current_avatars, badges, text_lines,
+                       layout, avatar_size, font_path)
+    return strip
+
+def _draw_separators(draw, start, stop, n_rows, y_offset, layout):
+    """画第 start 到 stop-1 行下方的分割线 (最后一行之后不画)，y_offset 为画布顶部在整表中的 y 坐标"""
+    margin = layout["margin"]
+    total_height = n_rows * layout["row_height"] + margin * 2
+    for i in range(start, stop):
+        y = margin + (i + 1) * layout["row_height"]
+        if y < total_height - margin:
+            draw.line([margin, y - 5 - y_offset, layout["total_width"] - margin, y - 5 - y_offset],
+                      fill="#eee", width=1)
+
+def iter_table_bands(results, candidates: dict, avatar_size=64, font_path=None, rows_per_band=STRIP_ROWS,
+                     workers=None):
+    """
+    按从上到下的顺序产出整表的横向切片 (切片顶部 y 坐标, 图片)，拼起来就是完整表格 (含边距与分割线)。
+    切片在线程池中并行绘制，同时在途的切片数有上限，导出超高表格时不必持有整张位图。
+    """
+    layout = table_layout(avatar_size)
+    n_rows = len(results)
+    total_height = table_height(n_rows, avatar_size)
+    starts = list(range(0, n_rows, rows_per_band))
+
+    def band(start):
+        stop = min(start + rows_per_band, n_rows)
+        top = 0 if start == 0 else row_tile_top(start, avatar_size)
+        bottom = total_height if stop == n_rows else row_tile_top(stop, avatar_size)
+        img = Image.new("RGB", (layout["total_width"], bottom - top), "white")
+        img.paste(render_strip(results, start, stop, candidates, avatar_size, font_path),
+                  (0, row_tile_top(start, avatar_size) - top))
+        _draw_separators(ImageDraw.Draw(img), start, stop, n_rows, top, layout)
+        return top, img
+
+    workers = workers or STRIP_WORKERS
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for start in starts:
+            pending.append(pool.submit(band, start))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 def generate_team_image_table(
     candidates: dict,
@@ -35,80 +285,44 @@ def generate_team_image_table(
     target_moves_list=[4, 5],
     font_path=None,
     is_save=False,
-    provided_results=None,  # 接收外部计算好的列表
-    filter_settings=None    # 接收筛选配置: {'min_spd': 0, 'max_spd': 999, ...}
+    provided_results=None,  # 接收外部计算好的列表 (或任意可迭代的结果流)
+    filter_settings=None,   # 接收筛选配置: {'min_spd': 0, 'max_spd': 999, ...}
+    sort_key="cost",        # 排序键: cost / speed / moves / score 或自定义函数
+    limit=None,             # 只画排序最靠前的 limit 条 (流式有界堆，不保留全部结果)
+    workers=None            # 分条带并行绘制的线程数 (默认 STRIP_WORKERS)
 ):
     """
     生成配队图片表格。
     优先使用 provided_results，如果没有，则根据 candidates 和 filter_settings 现场计算。
     """
     
-    # 常量定义
-    CONSTANTS = {
-        "firefly_base_spd": 104.0,
-        "firefly_ult_flat": 60.0,
-        "summon_speed": 70.0
-    }
-
     # 1. 准备数据
-    final_results = []
-
     if provided_results is not None:
         # A. 优先路径：直接使用外部传进来的已筛选数据
-        final_results = provided_results
+        final_results = list(provided_results)
     else:
-        # B. 后备路径：内部计算 (保持原有逻辑，但加入 filter_settings)
+        # B. 后备路径：交给计算引擎批量计算 (含 filter_settings 筛选与排序)
         if avatar_paths is None:
             avatar_paths = {name: None for name in candidates}
-            
-        candidate_names = list(candidates.keys())
-        
-        # 解析筛选条件
-        f_min_spd = float(filter_settings.get('min_spd', 0)) if filter_settings else 0
-        f_max_spd = float(filter_settings.get('max_spd', 999)) if filter_settings else 999
-        f_min_cost = int(filter_settings.get('min_cost', 0)) if filter_settings else 0
-        f_max_cost = int(filter_settings.get('max_cost', 99)) if filter_settings else 99
-
-        for team in itertools.combinations(candidate_names, 3):
-            bases = [candidates[m]["base"] for m in team]
-            if len(bases) != len(set(bases)):
-                continue
-
-            total_advance = total_spd_pct = total_cost = 0
-            avatars = []
-            for member in team:
-                d = candidates[member]
-                total_advance += d["advance"] * d["times"]
-                total_spd_pct += d["spd_pct"]
-                total_cost += d["cost"]
-                avatars.append(avatar_paths.get(member))
-
-            for moves in target_moves_list:
-                countdown_av = 10000.0 / CONSTANTS["summon_speed"]
-                intervals = moves - 1
-                total_distance = (10000.0 * intervals) - (10000.0 * total_advance)
-                req_ingame_speed = total_distance / countdown_av
-                req_panel_speed = req_ingame_speed - CONSTANTS["firefly_ult_flat"] - (CONSTANTS["firefly_base_spd"] * total_spd_pct)
-                display_speed = max(0, req_panel_speed, CONSTANTS["firefly_base_spd"])
-                
-                # === 内部筛选逻辑 ===
-                if not (f_min_spd <= display_speed <= f_max_spd):
-                    continue
-                if not (f_min_cost <= total_cost <= f_max_cost):
-                    continue
-
-                final_results.append({
-                    "team": team,
-                    "avatars": avatars,
-                    "moves": moves,
-                    "advance_pct": total_advance * 100,
-                    "spd_pct": total_spd_pct * 100,
-                    "speed": display_speed,
-                    "cost": total_cost
-                })
-        
-        # 排序
-        final_results.sort(key=lambda x: x["cost"], reverse=True)
+        with span("compute", limit=limit):
+            if limit is not None:
+                final_results = top_k(
+                    candidates, limit, sort_key,
+                    target_moves_list=target_moves_list,
+                    filter_settings=filter_settings,
+                    avatar_paths=avatar_paths,
+                    constants=CONSTANTS,
+                )
+            else:
+                final_results = compute_results(
+                    candidates,
+                    target_moves_list=target_moves_list,
+                    filter_settings=filter_settings,
+                    avatar_paths=avatar_paths,
+                    constants=CONSTANTS,
+                )
+                if sort_key != "cost":
+                    final_results = sort_results(final_results, sort_key)
 
     # 如果没有结果，生成一张提示图
     if not final_results:
@@ -120,97 +334,31 @@ def generate_team_image_table(
         return img
 
     # 2. 绘图设置
-    font_main = get_default_font(font_path, 16)
-    font_bold = get_default_font(font_path, 18) # 简单起见，加粗可以用稍大号字体代替，或者加载具体的bold字体
-
-    # 尺寸计算
-    avatar_area_width = avatar_size * 3 + 30  # 3个头像 + 间隙
-    text_area_width = 280
-    row_height = max(avatar_size + 20, 90) # 保证高度足够放下文本
-    margin = 15
-    
-    total_width = avatar_area_width + text_area_width + margin * 2
-    total_height = len(final_results) * row_height + margin * 2
+    layout = table_layout(avatar_size)
+    total_height = table_height(len(final_results), avatar_size)
 
-    img = Image.new("RGB", (total_width, total_height), "white")
+    img = Image.new("RGB", (layout["total_width"], total_height), "white")
     draw = ImageDraw.Draw(img)
 
-    # 3. 绘制每一行
-    y = margin
-    for r in final_results:
-        x = margin
-
-        # --- A. 绘制头像 ---
-        current_avatars = r.get("avatars", [])
-        # 如果传入的是 provided_results，avatars 可能是路径列表
-        
-        for i, avatar_path in enumerate(current_avatars):
-            avatar_x = x + i * (avatar_size + 10)
-            
-            # 绘制底图
-            has_img = False
-            if avatar_path and os.path.exists(avatar_path):
-                try:
-                    avatar_img = Image.open(avatar_path).convert("RGBA")
-                    avatar_img = avatar_img.resize((avatar_size, avatar_size), Image.LANCZOS)
-                    img.paste(avatar_img, (avatar_x, y), avatar_img)
-                    has_img = True
-                except:
-                    pass
-            
-            if not has_img:
-                draw.rectangle([avatar_x, y, avatar_x+avatar_size, y+avatar_size], outline="#ccc", width=1)
-                # 尝试取名字首字
-                name = r["team"][i] if i < len(r["team"]) else "?"
-                draw.text((avatar_x+20, y+20), name[0], fill="#999", font=font_main)
-
-            # 绘制标记 (Cost红点)
-            # 需要回溯 candidates 获取 cost，防止 provided_results 里没有详细 cost 数据
-            # 但通常 provided_results 应该包含 cost。为了保险，我们尝试从 candidates 查
-            char_name = r["team"][i]
-            char_data = candidates.get(char_name, {})
-            cost = char_data.get("cost", 0)
-            times = char_data.get("times", 1)
-
-            # 红点 (Cost > 1)
-            if cost > 1:
-                draw.ellipse([avatar_x + avatar_size - 18, y, avatar_x + avatar_size, y + 18], fill="#ff4d4f")
-                draw.text((avatar_x + avatar_size - 13, y - 1), str(cost-1), fill="white", font=font_main)
-            
-            # 蓝点 (555)
-            if "555" in char_name:
-                 draw.ellipse([avatar_x + avatar_size - 18, y + 22, avatar_x + avatar_size, y + 40], fill="#1890ff")
-                 draw.text((avatar_x + avatar_size - 13, y + 21), "5", fill="white", font=font_main)
-
-            if times > 1:
-                 draw.ellipse([avatar_x + avatar_size - 18, y + 44, avatar_x + avatar_size, y + 62], fill="#52c41a")
-                 draw.text((avatar_x + avatar_size - 13, y + 43), str(times), fill="white", font=font_main)
-
-        x += avatar_area_width
-
-        # --- B. 绘制文本 ---
-        # 使用 provided_results 中的预计算数据
-        text_lines = [
-            f"目标: {r['moves']} 动",
-            f"金数: {r['cost']}         面板速度: {r['speed']:.1f}",
-            f"全队拉条: {r.get('advance_pct', 0):.0f}%",
-            f"全队速加: {r.get('spd_pct', 0):.0f}%",
-        ]
-        
-        text_y = y + 5
-        for line in text_lines:
-            draw.text((x, text_y), line, fill="#333", font=font_main)
-            text_y += 18
-            
-        # 绘制分割线
-        y += row_height
-        if y < total_height - margin:
-            draw.line([margin, y - 5, total_width - margin, y - 5], fill="#eee", width=1)
+    # 3. 贴上各行：行数少时逐行取行图块 (内容相同的行直接复用缓存)，
+    #    行数多时按 STRIP_ROWS 分条带在线程池中并行绘制再拼接
+    n_rows = len(final_results)
+    with span("compose", rows=n_rows):
+        if n_rows >= STRIP_ROWS:
+            for band_top, band in iter_table_bands(final_results, candidates, avatar_size, font_path,
+                                                   workers=workers):
+                img.paste(band, (0, band_top))
+        else:
+            for i, r in enumerate(final_results):
+                tile = render_row_tile(r, candidates, avatar_size, font_path)
+                img.paste(tile, (0, row_tile_top(i, avatar_size)))
+            _draw_separators(draw, 0, n_rows, n_rows, 0, layout)
 
     # 4. 保存与返回
     if is_save:
         try:
-            img.save(output_image)
+            with span("save", path=output_image):
+                img.save(output_image)
             print(f"表格已保存: {output_image}")
         except Exception as e:
             print(f"保存失败: {e}")
@@ -219,29 +367,10 @@ def generate_team_image_table(
 
 # ========== 使用示例 ==========
 if __name__ == "__main__":
-    # 请将你的头像放在 avatars/ 目录下，并按角色名命名
-    avatar_map = {
-        "大丽花": "avatars/dahlia.jpg",
-        "6魂大丽花": "avatars/dahlia6.jpg",
-        "忘归人": "avatars/wang.jpg",
-        "2魂忘归人": "avatars/wang2.jpg",
-        "阮·梅": "avatars/ruan.jpg",
-        "开拓者(555)": "avatars/aki.jpg",
-        "开拓者": "avatars/aki.jpg",
-        "加拉赫/灵砂": "avatars/lingsha.jpg",
-    }
-
-    # ========== 配置 ==========
-    candidates = {
-        "大丽花":       {"spd_pct": 0.30, "advance": 0.00, "base": "dahlia", "cost": 1},
-        "6魂大丽花":    {"spd_pct": 0.30, "advance": 0.20, "base": "dahlia", "cost": 7},
-        "忘归人":       {"spd_pct": 0.00, "advance": 0.00, "base": "wang", "cost": 1},
-        "2魂忘归人":    {"spd_pct": 0.00, "advance": 0.24, "base": "wang", "cost": 3},
-        "阮·梅":        {"spd_pct": 0.10, "advance": 0.00, "base": "ruan", "cost": 0},
-        "开拓者(555)":  {"spd_pct": 0.00, "advance": 0.24, "base": "kaituozhe", "cost": 0},
-        "开拓者":  {"spd_pct": 0.00, "advance": 0.00, "base": "kaituozhe", "cost": 0},
-        "加拉赫/灵砂":  {"spd_pct": 0.00, "advance": 0.00, "base": "heel", "cost": 0},
-    }
+    # 角色数据与头像路径都来自 roster.json (头像放在 avatars/ 目录下)
+    roster = load_roster()
+    candidates = roster.candidates()
+    avatar_map = roster.avatar_paths()
 
     generate_team_image_table(
         candidates=candidates,
@@ -250,4 +379,5 @@ if __name__ == "__main__":
         avatar_size=64,
         font_path="SimSun/SimSun.ttf",  # 可选，换成你系统的中文字体
         is_save=True
-    )
\ No newline at end of file
+    )
+    print(font_registry.describe("SimSun/SimSun.ttf"))
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""
+所需速度的磁盘索引：对“全部候选 × 目标回合”预先算好所需面板速度与金数，
+以紧凑的二进制 (.npy) 保存，加载时内存映射，不做任何计算。
+
+- 索引目录以 (候选数据, times, 目标回合, CONSTANTS) 的哈希命名，数据或常量变化后自动换新索引；
+- records.npy 按所需速度升序排列，速度区间筛选是一次 searchsorted 切片；
+- cost_order.npy / cost_sorted.npy 是按金数排序的下标与键，金数区间同样是切片。
+
+用法示例：
+    python speed_index.py --moves 4-8 --speed-range 140:160 --cost-range 0:3
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from engine import CONSTANTS, TEAM_SIZE, evaluate_teams
+from roster import content_hash
+
+INDEX_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(".cache", "speed_index")
+
+
+def _record_dtype(team_size):
+    return np.dtype([
+        ("members", "<u2", (team_size,)),  # 角色下标 (对应 meta["names"])
+        ("seq", "<u4"),                    # 原始枚举顺序：配队序号 * 回合数 + 回合序号
+        ("moves", "u1"),
+        ("speed", "<f8"),
+        ("cost", "<i2"),
+    ])
+
+
+def roster_hash(candidates: dict, moves, constants=None, team_size=TEAM_SIZE):
+    """候选数据 + times + 回合 + 常量的内容哈希，用作索引键"""
+    payload = {
+        "version": INDEX_VERSION,
+        "team_size": team_size,
+        "candidates": [
+            [name, d["spd_pct"], d["advance"], d["base"], d["cost"], d.get("times", 1)]
+            for name, d in candidates.items()
+        ],
+        "moves": [int(m) for m in moves],
+        "constants": {k: float(v) for k, v in sorted((constants or CONSTANTS).items())},
+    }
+    return content_hash(payload)
+
+
+class SpeedIndex:
+    """已加载 (内存映射) 的速度索引"""
+
+    def __init__(self, path, meta, records, cost_order, cost_sorted):
+        self.path = path
+        self.meta = meta
+        self.names = meta["names"]
+        self.records = records
+        self.cost_order = cost_order
+        self.cost_sorted = cost_sorted
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def key(self):
+        return self.meta["key"]
+
+    def covers(self, candidates: dict, moves) -> bool:
+        """索引能否回答该查询：所选角色都在索引中且 times 一致，回合都已预计算"""
+        times = self.meta["times"]
+        if not set(int(m) for m in moves) <= set(self.meta["moves"]):
+            return False
+        for name, d in candidates.items():
+            if name not in times or times[name] != d.get("times", 1):
+                return False
+        return True
+
+    def query(self, min_spd=0, max_spd=999, min_cost=0, max_cost=99, selected=None, moves=None):
+        """
+        返回满足条件的记录下标，顺序与 TeamEvaluation.to_results 一致 (金数降序，同金数按原始枚举顺序)。
+        速度 / 金数区间用二分定位连续切片，选更窄的那一个，再对切片做其余筛选。
+        """
+        speed = self.records["speed"]
+        s_lo = np.searchsorted(speed, min_spd, side="left")
+        s_hi = np.searchsorted(speed, max_spd, side="right")
+        c_lo = np.searchsorted(self.cost_sorted, min_cost, side="left")
+        c_hi = np.searchsorted(self.cost_sorted, max_cost, side="right")
+
+        if s_hi - s_lo <= c_hi - c_lo:
+            rows = np.arange(s_lo, s_hi)
+            part = self.records[s_lo:s_hi]
+            keep = (part["cost"] >= min_cost) & (part["cost"] <= max_cost)
+        else:
+            rows = np.sort(self.cost_order[c_lo:c_hi])
+            part = self.records[rows]
+            keep = (part["speed"] >= min_spd) & (part["speed"] <= max_spd)
+
+        if selected is not None:
+            sel = np.zeros(len(self.names), dtype=bool)
+            pos = {name: i for i, name in enumerate(self.names)}
+            sel[[pos[name] for name in selected if name in pos]] = True
+            keep &= np.all(sel[part["members"]], axis=1)
+        if moves is not None:
+            keep &= np.isin(part["moves"], np.asarray(list(moves), dtype=np.uint8))
+
+        rows, part = rows[keep], part[keep]
+        order = np.lexsort((part["seq"], -part["cost"].astype(np.int64)))
+        return rows[order]
+
+    def to_results(self, rows, candidates: dict, avatar_paths=None):
+        """把记录展开为渲染用的字典列表 (总拉条 / 速加按当前候选数据现算)"""
+        avatar_paths = avatar_paths or {}
+        results = []
+        for rec in self.records[rows]:
+            team = tuple(self.names[i] for i in rec["members"])
+            results.append({
+                "team": team,
+                "avatars": [avatar_paths.get(member) for member in team],
+                "moves": int(rec["moves"]),
+                "advance_pct": _team_sum(candidates, team, "advance", times=True) * 100,
+                "spd_pct": _team_sum(candidates, team, "spd_pct") * 100,
+                "speed": float(rec["speed"]),
+                "cost": int(rec["cost"]),
+            })
+        return results
+
+    @classmethod
+    def open(cls, path):
+        """以只读内存映射方式打开索引目录"""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"索引版本不匹配: {path}")
+        records = np.load(os.path.join(path, "records.npy"), mmap_mode="r")
+        cost_order = np.load(os.path.join(path, "cost_order.npy"), mmap_mode="r")
+        cost_sorted = np.load(os.path.join(path, "cost_sorted.npy"), mmap_mode="r")
+        return cls(path, meta, records, cost_order, cost_sorted)
+
+
+def _team_sum(candidates, team, field, times=False):
+    # 与引擎相同的累加顺序，保证浮点结果一致
+    total = 0
+    for member in team:
+        d = candidates[member]
+        total += d[field] * d.get("times", 1) if times else d[field]
+    return total
+
+
+def build_index(candidates: dict, moves, constants=None, cache_dir=DEFAULT_CACHE_DIR, team_size=TEAM_SIZE):
+    """计算并写出索引目录 (先写临时目录再改名，写到一半中断不会留下坏索引)，返回目录路径"""
+    key = roster_hash(candidates, moves, constants, team_size)
+    path = os.path.join(cache_dir, key)
+    ev = evaluate_teams(candidates, moves, filter_settings={"max_spd": float("inf"), "max_cost": sys.maxsize},
+                        constants=constants, team_size=team_size)
+
+    n_moves = len(ev.moves)
+    t_idx, m_idx = np.nonzero(np.ones_like(ev.mask))
+    records = np.empty(len(t_idx), dtype=_record_dtype(team_size))
+    records["members"] = ev.teams[t_idx]
+    records["seq"] = t_idx * n_moves + m_idx
+    records["moves"] = ev.moves[m_idx]
+    records["speed"] = ev.speed[t_idx, m_idx]
+    records["cost"] = ev.cost[t_idx]
+    records = records[np.argsort(records["speed"], kind="stable")]
+    cost_order = np.argsort(records["cost"], kind="stable").astype(np.int64)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "key": key,
+        "names": list(candidates.keys()),
+        "times": {name: d.get("times", 1) for name, d in candidates.items()},
+        "moves": [int(m) for m in moves],
+        "constants": dict(constants or CONSTANTS),
+        "rows": int(len(records)),
+    }
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=key + ".", dir=cache_dir)
+    try:
+        np.save(os.path.join(tmp, "records.npy"), records)
+        np.save(os.path.join(tmp, "cost_order.npy"), cost_order)
+        np.save(os.path.join(tmp, "cost_sorted.npy"), records["cost"][cost_order])
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+def load_or_build(candidates: dict, moves, constants=None, cache_dir=DEFAULT_CACHE_DIR, team_size=TEAM_SIZE):
+    """按哈希打开已有索引，不存在或损坏时重新构建"""
+    path = os.path.join(cache_dir, roster_hash(candidates, moves, constants, team_size))
+    try:
+        return SpeedIndex.open(path)
+    except (OSError, ValueError):
+        return SpeedIndex.open(build_index(candidates, moves, constants, cache_dir, team_size))
+
+
+def main(argv=None):
+    from batch import load_candidates, parse_int_list, parse_range
+
+    parser = argparse.ArgumentParser(description="用速度索引查询配队 (首次运行时构建索引)")
+    parser.add_argument("--candidates", help="候选角色 JSON 文件，默认使用界面配置")
+    parser.add_argument("--moves", default="4-8", help="索引包含的目标回合")
+    parser.add_argument("--speed-range", type=parse_range, default=(0.0, 999.0), help="面板速度区间 MIN:MAX")
+    parser.add_argument("--cost-range", type=parse_range, default=(0.0, 99.0), help="金数区间 MIN:MAX")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="忽略已有索引，重新构建")
+    args = parser.parse_args(argv)
+
+    candidates = load_candidates(args.candidates)
+    moves = parse_int_list(args.moves)
+    if args.rebuild:
+        index = SpeedIndex.open(build_index(candidates, moves, cache_dir=args.cache_dir))
+    else:
+        index = load_or_build(candidates, moves, cache_dir=args.cache_dir)
+
+    rows = index.query(*args.speed_range, *args.cost_range)
+    for r in index.to_results(rows, candidates):
+        print(f"{r['moves']}动  速度 {r['speed']:.1f}  金数 {r['cost']}  {' / '.join(r['team'])}")
+    print(f"索引 {index.key}: {len(rows)} / {len(index)} 条", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
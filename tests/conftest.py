@@ -0,0 +1,62 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from roster import load_roster  # noqa: E402
+
+CONSTANTS = {"firefly_base_spd": 104.0, "firefly_ult_flat": 60.0, "summon_speed": 70.0}
+
+
+def brute_force_results(candidates, target_moves_list=(4, 5), filter_settings=None, constants=None):
+    """逐个配队的原始实现 (与最初 speed.py 的循环相同)，作为各种优化版本的对照"""
+    c = constants or CONSTANTS
+    fs = filter_settings or {}
+    f_min_spd, f_max_spd = float(fs.get("min_spd", 0)), float(fs.get("max_spd", 999))
+    f_min_cost, f_max_cost = int(fs.get("min_cost", 0)), int(fs.get("max_cost", 99))
+    results = []
+    for team in itertools.combinations(list(candidates), 3):
+        bases = [candidates[m]["base"] for m in team]
+        if len(bases) != len(set(bases)):
+            continue
+        total_advance = sum(candidates[m]["advance"] * candidates[m].get("times", 1) for m in team)
+        total_spd_pct = sum(candidates[m]["spd_pct"] for m in team)
+        total_cost = sum(candidates[m]["cost"] for m in team)
+        for moves in target_moves_list:
+            req = ((10000.0 * (moves - 1) - 10000.0 * total_advance) / (10000.0 / c["summon_speed"])
+                   - c["firefly_ult_flat"] - c["firefly_base_spd"] * total_spd_pct)
+            speed = max(0, req, c["firefly_base_spd"])
+            if f_min_spd <= speed <= f_max_spd and f_min_cost <= total_cost <= f_max_cost:
+                results.append({"team": team, "moves": moves, "speed": speed, "cost": total_cost,
+                                "advance_pct": total_advance * 100, "spd_pct": total_spd_pct * 100})
+    results.sort(key=lambda r: r["cost"], reverse=True)
+    return results
+
+
+def row_key(r):
+    """比较用：只取计算字段，速度按 1e-9 取整"""
+    return (r["team"], r["moves"], r["cost"], round(r["speed"], 9))
+
+
+@pytest.fixture
+def candidates():
+    return load_roster().candidates()
+
+
+@pytest.fixture
+def synthetic_candidates():
+    """比 roster.json 更大的候选表：同一 base 有多个角色，times 各不相同"""
+    out = {}
+    for i in range(14):
+        out[f"c{i}"] = {
+            "spd_pct": [0.0, 0.1, 0.3][i % 3],
+            "advance": [0.0, 0.24, 0.2, 0.12][i % 4],
+            "base": f"b{i // 2}",
+            "cost": i % 6,
+            "times": 1 + i % 3,
+            "img": None,
+        }
+    return out
@@ -0,0 +1,31 @@
+import os
+
+from PIL import Image
+
+import assets
+from assets import AvatarCache, ThumbnailStore
+
+
+def test_global_cache_does_not_write_to_disk_by_default():
+    assert assets.avatar_cache.disk is None
+    assert os.path.isabs(assets.DEFAULT_THUMB_DIR)
+
+
+def test_thumbnail_roundtrip(tmp_path):
+    src = tmp_path / "a.png"
+    Image.new("RGB", (80, 80), "red").save(src)
+    store = ThumbnailStore(str(tmp_path / "thumbs"))
+    cache = AvatarCache(disk=store)
+    img = cache.get(str(src), 32)
+    mtime = os.stat(src).st_mtime_ns
+    assert store.load(os.path.abspath(src), mtime, (32, 32)).tobytes() == img.tobytes()
+
+
+def test_failed_save_leaves_no_temp_file(tmp_path):
+    class Broken:
+        def save(self, *args, **kwargs):
+            raise OSError("disk full")
+
+    store = ThumbnailStore(str(tmp_path))
+    store.save("/x.png", 1, (8, 8), Broken())
+    assert list(tmp_path.iterdir()) == []
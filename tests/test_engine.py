@@ -0,0 +1,49 @@
+import pytest
+
+from conftest import brute_force_results, row_key
+from engine import ResultStore, compute_results
+
+FILTERS = [
+    None,
+    {"min_spd": 104, "max_spd": 180},
+    {"min_spd": 120, "max_spd": 999, "min_cost": 2, "max_cost": 8},
+    {"min_spd": 0, "max_spd": 150, "min_cost": 0, "max_cost": 3},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_compute_results_matches_brute_force(synthetic_candidates, filters):
+    moves = [4, 5, 6]
+    got = compute_results(synthetic_candidates, moves, filters)
+    assert [row_key(r) for r in got] == [row_key(r) for r in brute_force_results(synthetic_candidates, moves, filters)]
+
+
+def test_refilter_matches_compute_results(synthetic_candidates):
+    store = ResultStore()
+    store.update(synthetic_candidates, [4, 5, 6], FILTERS[0])
+    for filters in FILTERS[1:] + FILTERS[:1]:
+        got = store.refilter(filters).to_results()
+        assert store.last_stats["evaluated"] == 0
+        assert [row_key(r) for r in got] == [row_key(r) for r in compute_results(synthetic_candidates, [4, 5, 6], filters)]
+
+
+def test_update_reuses_unchanged_teams(synthetic_candidates):
+    store = ResultStore()
+    cands = dict(synthetic_candidates)
+    steps = []
+    # 改 times、去掉角色、加回角色、改回合：每一步都应与从头计算一致
+    cands["c3"] = dict(cands["c3"], times=3)
+    steps.append((dict(cands), [4, 5]))
+    del cands["c5"]
+    steps.append((dict(cands), [4, 5]))
+    cands["c5"] = synthetic_candidates["c5"]
+    steps.append((dict(cands), [5, 7]))
+    steps.append((dict(cands), [5, 7]))
+
+    store.update(synthetic_candidates, [4, 5], FILTERS[1])
+    for cands, moves in steps:
+        got = store.update(cands, moves, FILTERS[1]).to_results()
+        assert [row_key(r) for r in got] == [row_key(r) for r in brute_force_results(cands, moves, FILTERS[1])]
+        assert store.last_stats["reused"] > 0
+    assert store.last_stats["evaluated"] == 0
+
@@ -0,0 +1,37 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from engine import compute_results
+from export import export_table, write_png_bands
+from speed import STRIP_ROWS
+
+
+def test_write_png_bands_roundtrip():
+    rng = np.random.default_rng(0)
+    width, heights = 37, [5, 1, 12]
+    bands = [Image.fromarray(rng.integers(0, 256, (h, width, 3), dtype=np.uint8), "RGB") for h in heights]
+    buf = io.BytesIO()
+    write_png_bands(buf, width, sum(heights), enumerate(bands), compress_level=1)
+    buf.seek(0)
+    decoded = np.asarray(Image.open(buf).convert("RGB"))
+    assert np.array_equal(decoded, np.vstack([np.asarray(b) for b in bands]))
+
+
+def test_write_png_bands_rejects_wrong_height():
+    band = Image.new("RGB", (4, 3), "white")
+    with pytest.raises(ValueError):
+        write_png_bands(io.BytesIO(), 4, 5, enumerate([band]))
+
+
+def test_streamed_export_matches_whole_image(tmp_path, candidates):
+    # 跨越多个切片，最后一片不满
+    results = (compute_results(candidates, [4, 5, 6]) * 3)[:STRIP_ROWS * 2 + 3]
+    whole = export_table(results, candidates, str(tmp_path / "whole.png"), stream=False, compress_level=1)
+    streamed = export_table(results, candidates, str(tmp_path / "streamed.png"), stream=True, compress_level=1)
+    with Image.open(whole) as a, Image.open(streamed) as b:
+        assert a.size == b.size
+        assert np.array_equal(np.asarray(a.convert("RGB")), np.asarray(b.convert("RGB")))
+    assert not list(tmp_path.glob("*.part"))
@@ -0,0 +1,39 @@
+import numpy as np
+
+from engine import CONSTANTS, evaluate_speeds, evaluate_teams, max_moves_at_speed, required_speed
+
+MOVES = np.arange(1, 13)
+BRUTE_MOVES = range(1, 60)  # 远大于测试速度下的最多回合数
+
+
+def _brute_max_moves(adv, spd, panel_speed):
+    """逐个回合数检查 required_speed <= 面板速度，取最大的可达回合数"""
+    ok = [m for m in BRUTE_MOVES if required_speed(adv, spd, m, CONSTANTS) <= panel_speed]
+    return max(ok) if ok else 0
+
+
+def test_max_moves_matches_required_speed_including_boundaries(synthetic_candidates):
+    ev = evaluate_teams(synthetic_candidates, MOVES.tolist(), {"max_spd": float("inf"), "max_cost": 10 ** 9})
+    # 恰好等于所需速度的边界值，以及边界两侧
+    boundary = np.unique(ev.speed.ravel())
+    speeds = np.concatenate([boundary, np.nextafter(boundary, -np.inf), np.nextafter(boundary, np.inf),
+                             np.arange(90.0, 320.0, 0.37)])
+    got = max_moves_at_speed(ev.total_advance[:, None], ev.total_spd_pct[:, None], speeds[None, :], CONSTANTS)
+    for t in range(len(ev.teams)):
+        adv, spd = ev.total_advance[t], ev.total_spd_pct[t]
+        expected = [_brute_max_moves(adv, spd, s) for s in speeds]
+        assert got[t].tolist() == expected
+
+
+def test_evaluate_speeds_results_order_and_filters(synthetic_candidates):
+    filters = {"min_spd": 120, "max_spd": 200, "min_cost": 1, "max_cost": 9}
+    rows = evaluate_speeds(synthetic_candidates, [180.0]).to_results(0, filters)
+    assert rows
+    for r in rows:
+        assert 120 <= r["speed"] <= 200 and 1 <= r["cost"] <= 9
+        assert r["speed"] <= 180.0
+        assert r["moves"] == _brute_max_moves(r["advance_pct"] / 100, r["spd_pct"] / 100, 180.0)
+        assert required_speed(r["advance_pct"] / 100, r["spd_pct"] / 100, r["moves"] + 1, CONSTANTS) \
+            == r["to_next"] + 180.0
+    keys = [(-r["moves"], r["cost"]) for r in rows]
+    assert keys == sorted(keys)
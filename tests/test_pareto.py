@@ -0,0 +1,53 @@
+import itertools
+
+import pytest
+
+from conftest import brute_force_results
+from pareto import pareto_frontier
+
+
+def brute_force_frontier(candidates, min_spd, max_spd, moves, min_cost=0, max_cost=99, frontier_only=True):
+    """枚举全部配队：先按全部条件筛选，再取每个回合数的最低金数，最后去掉被支配的点"""
+    rows = brute_force_results(candidates, moves,
+                               {"min_spd": min_spd, "max_spd": max_spd, "min_cost": min_cost, "max_cost": max_cost})
+    best = {}
+    for r in rows:
+        best[r["moves"]] = min(best.get(r["moves"], r["cost"]), r["cost"])
+    points = sorted(best.items())
+    if frontier_only:
+        points = [(m, c) for m, c in points if not any(m2 > m and c2 <= c for m2, c2 in points)]
+    return points
+
+
+CASES = list(itertools.product(
+    [(0, 140), (0, 180), (120, 200), (104, 104), (150, 300)],
+    [(0, 99), (2, 99), (0, 5), (3, 7)],
+    [True, False],
+))
+
+
+@pytest.mark.parametrize("speed_range, cost_range, frontier_only", CASES)
+def test_frontier_matches_brute_force(synthetic_candidates, speed_range, cost_range, frontier_only):
+    moves = list(range(1, 10))
+    got = pareto_frontier(synthetic_candidates, *speed_range, moves, frontier_only=frontier_only,
+                          min_cost=cost_range[0], max_cost=cost_range[1])
+    expected = brute_force_frontier(synthetic_candidates, *speed_range, moves, *cost_range, frontier_only)
+    assert [(r["moves"], r["cost"]) for r in got] == expected
+    for r in got:
+        assert speed_range[0] <= r["speed"] <= speed_range[1]
+        assert cost_range[0] <= r["cost"] <= cost_range[1]
+        assert r["cost"] == sum(synthetic_candidates[name]["cost"] for name in r["team"])
+
+
+def test_cost_filter_applies_before_domination():
+    # 最省的配队 (a + b + c，金数 2) 低于金数下限：不能让它支配满足下限的配队后再被筛掉
+    candidates = {
+        "a": {"spd_pct": 0.0, "advance": 1.0, "base": "a", "cost": 0, "times": 1},
+        "b": {"spd_pct": 0.0, "advance": 0.0, "base": "b", "cost": 1, "times": 1},
+        "c": {"spd_pct": 0.0, "advance": 0.0, "base": "c", "cost": 1, "times": 1},
+        "d": {"spd_pct": 0.0, "advance": 0.0, "base": "d", "cost": 2, "times": 1},
+        "e": {"spd_pct": 0.3, "advance": 0.0, "base": "e", "cost": 3, "times": 1},
+    }
+    got = pareto_frontier(candidates, 0, 200, list(range(1, 8)), min_cost=3)
+    assert got
+    assert [(r["moves"], r["cost"]) for r in got] == brute_force_frontier(candidates, 0, 200, range(1, 8), min_cost=3)
@@ -0,0 +1,21 @@
+from profiling import Profiler
+
+
+def test_spans_are_capped_and_mark_survives_eviction():
+    p = Profiler(max_spans=5)
+    p.enable()
+    for _ in range(3):
+        with p.span("early"):
+            pass
+    mark = p.mark()
+    for _ in range(10):
+        with p.span("late"):
+            pass
+    assert len(p.spans) == 5
+    assert p.summary(since=mark)["late"][0] == 5
+    assert "early" not in p.summary()
+
+    mark = p.mark()
+    with p.span("last"):
+        pass
+    assert list(p.summary(since=mark)) == ["last"]
@@ -0,0 +1,27 @@
+import pytest
+
+from conftest import row_key
+from engine import compute_results
+from result_stream import sort_results, top_k, weighted_score
+
+FILTERS = {"min_spd": 100, "max_spd": 250, "min_cost": 1, "max_cost": 12}
+
+
+@pytest.mark.parametrize("sort_key", ["cost", "speed", "moves", "score"])
+@pytest.mark.parametrize("k, offset", [(1, 0), (25, 0), (25, 40), (10_000, 0)])
+def test_top_k_matches_full_sort(synthetic_candidates, sort_key, k, offset):
+    moves = [4, 5, 7]
+    full = sort_results(compute_results(synthetic_candidates, moves, FILTERS), sort_key)
+    got = top_k(synthetic_candidates, k, sort_key, offset=offset, target_moves_list=moves, filter_settings=FILTERS)
+    assert [row_key(r) for r in got] == [row_key(r) for r in full[offset:offset + k]]
+
+
+def test_top_k_custom_key_and_direction(synthetic_candidates):
+    key = weighted_score(cost=1.0, speed=0.05)
+    full = sort_results(compute_results(synthetic_candidates, [5, 6]), key, descending=True)
+    got = top_k(synthetic_candidates, 30, key, descending=True, target_moves_list=[5, 6])
+    assert [row_key(r) for r in got] == [row_key(r) for r in full[:30]]
+
+
+def test_top_k_empty_when_nothing_passes(synthetic_candidates):
+    assert top_k(synthetic_candidates, 10, filter_settings={"min_spd": 1000, "max_spd": 2000}) == []
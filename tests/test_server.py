@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+
+from engine import compute_results
+from roster import load_roster
+from server import ApiServer, CalculatorService, QueryError, normalize_query
+
+
+@pytest.fixture
+def roster():
+    return load_roster()
+
+
+def test_selected_keeps_roster_order(roster):
+    names = roster.names
+    q = normalize_query({"selected": [names[3], names[0], names[3], names[1]]}, roster)
+    assert q["selected"] == [names[0], names[1], names[3]]
+    assert normalize_query({"selected": [names[1], names[0]]}, roster) == \
+        normalize_query({"selected": [names[0], names[1]]}, roster)
+
+
+@pytest.mark.parametrize("query", [
+    {"selected": ["不存在"]},
+    {"selected": "阮·梅"},
+    {"selected": [1, 2]},
+    {"times": [1, 2]},
+    {"times": {"阮·梅": "2"}},
+    {"moves": 5},
+    {"moves": ["a"]},
+    {"moves": [True]},
+    {"filters": [1, 2]},
+    {"filters": {"min_spd": "fast"}},
+    {"filters": {"max_cost": [3]}},
+    {"filters": {"unknown": 1}},
+    {"page": "1"},
+    {"page_size": 0},
+    {"sort": ["cost"]},
+    {"odds": "yes"},
+    {"extra": 1},
+    [],
+])
+def test_malformed_query_raises_query_error(roster, query):
+    with pytest.raises(QueryError):
+        normalize_query(query, roster)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_results_match_compute_results(roster):
+    service = CalculatorService(workers=2)
+    api = ApiServer(service)
+    query = {"moves": [4, 5, 6], "filters": {"min_spd": 104, "max_spd": 200}, "page_size": 500}
+    status, _, body, _ = _run(api.handle("POST", "/api/results", {}, json.dumps(query).encode()))
+    assert status == 200
+    rows = json.loads(body)["rows"]
+    expected = compute_results(roster.candidates(), [4, 5, 6], {"min_spd": 104, "max_spd": 200})
+    assert [(tuple(r["team"]), r["moves"], r["speed"]) for r in rows] == \
+        [(r["team"], r["moves"], r["speed"]) for r in expected]
+
+
+@pytest.mark.parametrize("body", [
+    b'{"filters": [1]}', b'{"selected": [1]}', b'{"times": 3}', b"not json", b"\xff\xfe",
+])
+def test_handle_returns_400_for_bad_body(body):
+    api = ApiServer(CalculatorService(workers=1))
+    status, _, payload, _ = _run(api.handle("POST", "/api/results", {}, body))
+    assert status == 400
+    assert "error" in json.loads(payload)
+
+
+def test_identical_requests_are_coalesced():
+    service = CalculatorService(workers=2)
+
+    async def burst():
+        return await asyncio.gather(*(service.respond("results", {"moves": [5]}) for _ in range(8)))
+
+    responses = _run(burst())
+    assert service.computed == 1
+    assert service.coalesced == 7
+    assert len({r[1] for r in responses}) == 1
+    assert sorted(r[3] for r in responses) == ["coalesced"] * 7 + ["miss"]
+
+    async def again():
+        return await service.respond("results", {"moves": [5], "selected": None})
+
+    assert _run(again())[3] == "hit"
+    assert service.computed == 1
+
+
+async def _raw_request(data: bytes):
+    api = ApiServer(CalculatorService(workers=1))
+    server = await asyncio.start_server(api.serve_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(data)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    return response
+
+
+@pytest.mark.parametrize("length_header, status", [
+    (b"Content-Length: abc\r\n", b"400"),
+    (b"Content-Length: -5\r\n", b"400"),
+    (b"Content-Length: 99999999\r\n", b"413"),
+    (b"Transfer-Encoding: chunked\r\n", b"411"),
+])
+def test_bad_content_length(length_header, status):
+    response = _run(_raw_request(b"POST /api/results HTTP/1.1\r\n" + length_header + b"\r\n{}"))
+    assert response.startswith(b"HTTP/1.1 " + status)
+
+
+def test_connection_serves_valid_request():
+    body = b'{"moves": [5], "page_size": 1}'
+    response = _run(_raw_request(b"POST /api/results HTTP/1.1\r\nConnection: close\r\nContent-Length: "
+                                 + str(len(body)).encode() + b"\r\n\r\n" + body))
+    assert response.startswith(b"HTTP/1.1 200")
+    assert json.loads(response.split(b"\r\n\r\n", 1)[1])["page_size"] == 1
@@ -0,0 +1,22 @@
+import math
+
+import pytest
+
+from timeline import cross_check, min_panel_speed, simulate
+
+
+def test_cross_check_agrees_with_closed_form(candidates):
+    checked, mismatches = cross_check(candidates, [4, 5, 6])
+    assert checked > 0
+    assert mismatches == []
+
+
+def test_unreachable_target_returns_inf():
+    assert math.isinf(min_panel_speed(200))
+
+
+def test_simulate_rejects_non_finite_speed():
+    with pytest.raises(ValueError):
+        simulate(float("inf"))
+    with pytest.raises(ValueError):
+        simulate(float("nan"))
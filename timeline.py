@@ -0,0 +1,288 @@
+"""
+行动值时间轴模拟器：用优先队列按时间顺序调度流萤、倒计时、额外召唤物的行动以及拉条 / 加速事件，
+用于验证 engine.required_speed 的闭式公式，并覆盖公式无法表达的情况：
+- 拉条在特定时刻或流萤第 k 次行动后才生效 (超出行动条的部分被浪费)；
+- 多个召唤物各自行动并拉条；
+- 有持续时间的速度加成。
+
+最低面板速度通过对模拟结果二分得到 (行动次数随速度单调不减)。
+
+用法示例：
+    python timeline.py --check --moves 4-8 --times 1-3
+    python timeline.py --team "阮·梅,2魂忘归人,开拓者(555)" --moves 5
+"""
+import argparse
+import heapq
+import math
+import sys
+import time
+
+from engine import CONSTANTS, TEAM_SIZE, evaluate_teams
+
+ACTION_GAUGE = 10000.0
+MAX_SPEED = 10000.0
+
+# 同一时刻的处理顺序：定时效果 -> 流萤 -> 召唤物 -> 倒计时 (与闭式公式的“恰好相等也算达成”一致)
+_PRIO_EFFECT, _PRIO_FIREFLY, _PRIO_SUMMON, _PRIO_COUNTDOWN = range(4)
+
+
+class Effect:
+    """
+    作用于流萤的一次效果。
+    kind: "advance" 拉条 value (0.24 即 24%)；"speed" 固定速度 +value；"speed_pct" 基础速度 × value。
+    触发时机二选一：at=行动值时刻，或 after_action=流萤第 k 次行动之后 (默认第 1 次)。
+    duration: 速度加成持续的行动值，None 表示持续到结束。
+    """
+
+    __slots__ = ("kind", "value", "at", "after_action", "duration")
+
+    def __init__(self, kind, value, at=None, after_action=None, duration=None):
+        if kind not in ("advance", "speed", "speed_pct"):
+            raise ValueError(f"未知效果类型: {kind}")
+        self.kind = kind
+        self.value = value
+        self.at = at
+        self.after_action = after_action if after_action is not None or at is not None else 1
+        self.duration = duration
+
+    def __repr__(self):
+        when = f"at={self.at}" if self.at is not None else f"after_action={self.after_action}"
+        return f"Effect({self.kind!r}, {self.value}, {when})"
+
+
+class Summon:
+    """额外的召唤物 / 队友：按自身速度行动，每次行动给流萤拉条 advance"""
+
+    __slots__ = ("name", "speed", "advance")
+
+    def __init__(self, name, speed, advance=0.0):
+        self.name = name
+        self.speed = speed
+        self.advance = advance
+
+
+class _Unit:
+    __slots__ = ("name", "speed", "distance", "since", "version", "priority")
+
+    def __init__(self, name, speed, distance, priority):
+        self.name = name
+        self.speed = speed
+        self.distance = distance  # since 时刻剩余的行动条距离
+        self.since = 0.0
+        self.version = 0
+        self.priority = priority
+
+    def sync(self, t):
+        self.distance = max(self.distance - (t - self.since) * self.speed, 0.0)
+        self.since = t
+
+    def next_time(self):
+        return self.since + self.distance / self.speed
+
+
+def simulate(panel_speed, team_spd_pct=0.0, effects=(), summons=(), constants=None, until=None, trace=None):
+    """
+    模拟终结技后的一轮：流萤立即行动，直到倒计时行动为止。
+    返回倒计时行动前流萤的行动次数；until 给定时达到该次数即提前返回。
+    trace 为列表时按顺序追加 (行动值, 事件名, 说明)。
+    panel_speed 必须是有限值：速度无穷大时流萤一直在 0 时刻行动，倒计时永远轮不到。
+    """
+    if not math.isfinite(panel_speed):
+        raise ValueError(f"面板速度必须是有限值: {panel_speed}")
+    c = constants or CONSTANTS
+    base = c["firefly_base_spd"]
+    ff = _Unit("流萤", panel_speed + c["firefly_ult_flat"] + base * team_spd_pct, 0.0, _PRIO_FIREFLY)
+    countdown = _Unit("倒计时", c["summon_speed"], ACTION_GAUGE, _PRIO_COUNTDOWN)
+    units = [ff, countdown] + [_Unit(s.name, s.speed, ACTION_GAUGE, _PRIO_SUMMON) for s in summons]
+    summon_advance = {u: s.advance for u, s in zip(units[2:], summons)}
+
+    heap = []
+    seq = 0
+
+    def push(t, prio, kind, payload):
+        nonlocal seq
+        heapq.heappush(heap, (t, prio, seq, kind, payload))
+        seq += 1
+
+    def reschedule(unit):
+        unit.version += 1
+        push(unit.next_time(), unit.priority, "act", (unit, unit.version))
+
+    def apply(effect, t):
+        ff.sync(t)
+        if effect.kind == "advance":
+            ff.distance = max(ff.distance - effect.value * ACTION_GAUGE, 0.0)
+        else:
+            flat = effect.value if effect.kind == "speed" else base * effect.value
+            ff.speed += flat
+            if effect.duration is not None:
+                push(t + effect.duration, _PRIO_EFFECT, "expire", flat)
+        reschedule(ff)
+        if trace is not None:
+            trace.append((t, effect.kind, f"{effect.value:g} -> 速度 {ff.speed:.2f} 剩余 {ff.distance:.0f}"))
+
+    after_action = {}
+    for e in effects:
+        if e.at is not None:
+            push(e.at, _PRIO_EFFECT, "effect", e)
+        else:
+            after_action.setdefault(e.after_action, []).append(e)
+    for unit in units:
+        reschedule(unit)
+
+    actions = 0
+    while heap:
+        t, _, _, kind, payload = heapq.heappop(heap)
+        if kind == "effect":
+            apply(payload, t)
+        elif kind == "expire":
+            ff.sync(t)
+            ff.speed -= payload
+            reschedule(ff)
+        else:
+            unit, version = payload
+            if version != unit.version:
+                continue  # 速度或行动条变化后留下的过期条目
+            if trace is not None:
+                trace.append((t, unit.name, "行动"))
+            if unit is countdown:
+                break
+            unit.since, unit.distance = t, ACTION_GAUGE
+            reschedule(unit)
+            if unit is ff:
+                actions += 1
+                if until is not None and actions >= until:
+                    break
+                for e in after_action.get(actions, ()):
+                    apply(e, t)
+            elif summon_advance[unit]:
+                apply(Effect("advance", summon_advance[unit], at=t), t)
+    return actions
+
+
+def min_panel_speed(n_actions, team_spd_pct=0.0, effects=(), summons=(), constants=None, tol=1e-4, hint=None):
+    """
+    倒计时前行动 n_actions 次所需的最低面板速度 (不低于基础速度，与闭式公式口径一致)，
+    对 simulate 二分求得；hint 为预估值时先在其附近确认区间，减少模拟次数。无法达成时返回 inf。
+    """
+    c = constants or CONSTANTS
+
+    def reaches(speed):
+        return simulate(speed, team_spd_pct, effects, summons, c, until=n_actions) >= n_actions
+
+    lo = c["firefly_base_spd"]
+    if reaches(lo):
+        return lo
+    hi = lo * 2
+    if hint is not None and math.isfinite(hint) and hint > lo:
+        if reaches(hint + 1.0):
+            hi = hint + 1.0
+            if hint - 1.0 > lo and not reaches(hint - 1.0):
+                lo = hint - 1.0
+    while not reaches(hi):
+        lo, hi = hi, hi * 2
+        if hi > MAX_SPEED:
+            return float("inf")
+    while hi - lo > tol:
+        mid = (lo + hi) / 2
+        if reaches(mid):
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
+def team_effects(candidates: dict, team):
+    """
+    配队的默认拉条时间线：拉条角色每触发一次产生一个拉条事件，
+    第 j 次触发在流萤第 j 次行动之后生效 (与闭式公式假设的“全部拉条都在倒计时前用上”对应)。
+    """
+    effects = []
+    for name in team:
+        d = candidates[name]
+        if d["advance"]:
+            effects.extend(Effect("advance", d["advance"], after_action=j + 1) for j in range(d.get("times", 1)))
+    return effects
+
+
+def cross_check(candidates: dict, target_moves_list=(4, 5), constants=None, tol=0.01, team_size=TEAM_SIZE):
+    """
+    对所有配队 × 目标回合比较模拟结果与闭式公式，返回 (检查行数, 不一致的行列表)。
+    不一致通常意味着拉条在倒计时之前用不完 (触发次数多于可用行动，或单次行动条被拉满)。
+    """
+    c = constants or CONSTANTS
+    ev = evaluate_teams(candidates, target_moves_list, filter_settings={"max_spd": float("inf"), "max_cost": sys.maxsize},
+                        constants=c, team_size=team_size)
+    names = ev.roster.names
+    mismatches = []
+    for t, members in enumerate(ev.teams.tolist()):
+        team = tuple(names[i] for i in members)
+        effects = team_effects(candidates, team)
+        for m, moves in enumerate(ev.moves.tolist()):
+            closed = float(ev.speed[t, m])
+            simulated = min_panel_speed(int(moves), float(ev.total_spd_pct[t]), effects, constants=c, hint=closed)
+            if not abs(simulated - closed) <= tol:
+                mismatches.append({
+                    "team": team,
+                    "moves": int(moves),
+                    "closed_form": closed,
+                    "simulated": simulated,
+                    "diff": simulated - closed,
+                })
+    return len(ev.teams) * len(ev.moves), mismatches
+
+
+def main(argv=None):
+    from batch import load_candidates, parse_int_list
+
+    parser = argparse.ArgumentParser(description="行动值时间轴模拟 / 闭式公式交叉验证")
+    parser.add_argument("--candidates", help="候选角色 JSON 文件，默认使用界面配置")
+    parser.add_argument("--moves", default="4,5", help="目标回合，如 4-8")
+    parser.add_argument("--times", help="交叉验证时遍历的拉条触发次数 (统一设置)，如 1-3")
+    parser.add_argument("--check", action="store_true", help="所有配队与闭式公式交叉验证")
+    parser.add_argument("--team", help="逗号分隔的配队，打印最低速度与时间轴")
+    parser.add_argument("--speed", type=float, help="打印时间轴时使用的面板速度 (默认最低速度)")
+    args = parser.parse_args(argv)
+
+    candidates = load_candidates(args.candidates)
+    moves = parse_int_list(args.moves)
+
+    if args.team:
+        team = [name.strip() for name in args.team.split(",")]
+        unknown = [name for name in team if name not in candidates]
+        if unknown:
+            parser.error(f"未知角色: {', '.join(unknown)}")
+        spd_pct = sum(candidates[name]["spd_pct"] for name in team)
+        effects = team_effects(candidates, team)
+        for m in moves:
+            need = min_panel_speed(m, spd_pct, effects)
+            if math.isfinite(need):
+                print(f"{m}动: 最低面板速度 {need:.2f}")
+            else:
+                print(f"{m}动: 无法达成 (面板速度 {MAX_SPEED:g} 以内)")
+                if args.speed is None:
+                    continue
+            trace = []
+            simulate(args.speed or need, spd_pct, effects, trace=trace)
+            for t, who, what in trace:
+                print(f"  {t:8.2f}  {who}  {what}")
+
+    if args.check:
+        times_values = parse_int_list(args.times) if args.times else [None]
+        for times in times_values:
+            cands = candidates if times is None else {
+                name: dict(d, times=times if d["advance"] else d.get("times", 1)) for name, d in candidates.items()
+            }
+            t0 = time.perf_counter()
+            checked, mismatches = cross_check(cands, moves)
+            elapsed = time.perf_counter() - t0
+            label = "默认" if times is None else f"times={times}"
+            print(f"[{label}] 检查 {checked} 行，不一致 {len(mismatches)} 行，"
+                  f"{checked / max(elapsed, 1e-9):.0f} 行/秒", file=sys.stderr)
+            for r in mismatches:
+                print(f"  {r['moves']}动  公式 {r['closed_form']:.2f}  模拟 {r['simulated']:.2f}  "
+                      f"{' / '.join(r['team'])}")
+
+
+if __name__ == "__main__":
+    main()
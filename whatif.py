@@ -0,0 +1,259 @@
+"""
+公式常量的假设分析：在 (流萤基础速度, 终结技固定加速, 倒计时速度) 的网格上一次性批量计算整张配队表，
+看每个配队的所需速度、以及给定面板速度下能达成的回合数如何变化。
+
+常量网格 G 个点 × 配队 T 个 × 目标回合 M 个直接用 NumPy 广播算出 (G, T, M) 的速度表，
+几千个网格点也只是一次数组运算；结果可以画成热力图 (行 = 配队，列 = 网格点) 或写成 CSV。
+
+取值写法：单个值 "104"、列表 "100,104"、区间 "60:80:2" (含两端)。
+
+用法示例：
+    python whatif.py --summon-speed 60:80:1 --ult-flat 50:70:5 --moves 5 -o whatif.png --csv whatif.csv
+    python whatif.py --summon-speed 70 --panel-speed 160 --metric max_moves -o moves.png
+"""
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from assets import font_registry
+from engine import TEAM_SIZE, evaluate_teams, max_moves_at_speed, required_speed
+from roster import CONSTANT_KEYS, load_roster
+
+# 热力图配色：(位置, RGB)，之间线性插值
+SEQUENTIAL_STOPS = [(0.0, (68, 1, 84)), (0.25, (59, 82, 139)), (0.5, (33, 145, 140)),
+                    (0.75, (94, 201, 98)), (1.0, (253, 231, 37))]
+DIVERGING_STOPS = [(0.0, (33, 102, 172)), (0.5, (247, 247, 247)), (1.0, (178, 24, 43))]
+
+METRICS = {
+    "speed": "所需面板速度",
+    "delta": "所需速度变化",
+    "max_moves": "可达回合数",
+}
+
+LABEL_WIDTH = 240
+HEADER_HEIGHT = 44
+CELL_HEIGHT = 16
+MAX_IMAGE_WIDTH = 1600
+
+
+def parse_values(spec: str):
+    """解析 "104" / "100,104" / "60:80:2" (含两端) 形式的取值列表"""
+    values = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ":" in part:
+            lo, hi, *step = (float(x) for x in part.split(":"))
+            step = step[0] if step else 1.0
+            if step <= 0:
+                raise ValueError(f"步长必须大于 0: {part}")
+            values.extend(np.round(np.arange(lo, hi + step * 1e-9, step), 6).tolist())
+        else:
+            values.append(float(part))
+    if not values:
+        raise ValueError(f"没有取值: {spec!r}")
+    return sorted(set(values))
+
+
+def constant_grid(**axes):
+    """
+    各常量取值的笛卡尔积，返回 {常量名: (G,) 数组}。
+    未给出的常量取 roster.json 中的值；最后一个常量变化最快。
+    """
+    base = load_roster().constants
+    values = [np.asarray(axes.get(k) if axes.get(k) is not None else [base[k]], dtype=np.float64)
+              for k in CONSTANT_KEYS]
+    mesh = np.meshgrid(*values, indexing="ij")
+    return {k: m.ravel() for k, m in zip(CONSTANT_KEYS, mesh)}
+
+
+class WhatIfResult:
+    """
+    一次网格扫描的结果。
+    grid: {常量名: (G,)}；speed: (G, T, M)；max_moves: (G, T)；
+    baseline_speed: (T, M) / baseline_moves: (T,) 为 roster.json 常量下的值。
+    配队按基准所需速度 (第一个目标回合) 升序排列。
+    """
+
+    def __init__(self, grid, teams, cost, moves, panel_speed, speed, max_moves, baseline_speed, baseline_moves):
+        self.grid = grid
+        self.teams = teams
+        self.cost = cost
+        self.moves = moves
+        self.panel_speed = panel_speed
+        self.speed = speed
+        self.max_moves = max_moves
+        self.baseline_speed = baseline_speed
+        self.baseline_moves = baseline_moves
+
+    @property
+    def n_points(self):
+        return len(next(iter(self.grid.values())))
+
+    def varying_keys(self):
+        return [k for k in CONSTANT_KEYS if len(np.unique(self.grid[k])) > 1]
+
+    def metric(self, name="speed", move_index=0):
+        """(T, G) 的热力图数据"""
+        if name == "speed":
+            return self.speed[:, :, move_index].T
+        if name == "delta":
+            return (self.speed[:, :, move_index] - self.baseline_speed[None, :, move_index]).T
+        if name == "max_moves":
+            return self.max_moves.T.astype(np.float64)
+        raise ValueError(f"未知指标: {name}")
+
+
+def sweep(candidates=None, grid=None, target_moves_list=(4, 5), panel_speed=160.0,
+          base_constants=None, team_size=TEAM_SIZE) -> WhatIfResult:
+    """在常量网格上批量计算全部合法配队 (不做速度 / 金数筛选)"""
+    roster = load_roster()
+    candidates = candidates if candidates is not None else roster.candidates()
+    base_constants = base_constants or roster.constants
+    grid = grid or constant_grid()
+    moves = np.asarray(sorted(set(target_moves_list)), dtype=np.float64)
+
+    ev = evaluate_teams(candidates, moves, {"max_spd": float("inf"), "max_cost": sys.maxsize},
+                        base_constants, team_size)
+    adv, spd = ev.total_advance, ev.total_spd_pct
+    c_grid = {k: v[:, None, None] for k, v in grid.items()}
+    speed = required_speed(adv[None, :, None], spd[None, :, None], moves[None, None, :], c_grid)
+    max_moves = max_moves_at_speed(adv[None, :], spd[None, :], panel_speed, {k: v[:, None] for k, v in grid.items()})
+    baseline_moves = max_moves_at_speed(adv, spd, panel_speed, base_constants)
+
+    order = np.lexsort((-ev.cost, ev.speed[:, 0])) if len(moves) else np.arange(len(ev.teams))
+    names = ev.roster.names
+    return WhatIfResult(
+        grid=grid,
+        teams=[tuple(names[i] for i in ev.teams[t]) for t in order.tolist()],
+        cost=ev.cost[order],
+        moves=moves.astype(np.int64),
+        panel_speed=panel_speed,
+        speed=speed[:, order, :],
+        max_moves=max_moves[:, order],
+        baseline_speed=ev.speed[order],
+        baseline_moves=baseline_moves[order],
+    )
+
+
+def _colorize(values, stops, lo, hi):
+    """把数值映射为 RGB (uint8)，NaN 显示为浅灰"""
+    span_ = hi - lo if hi > lo else 1.0
+    t = np.clip((values - lo) / span_, 0.0, 1.0)
+    pos = np.array([p for p, _ in stops])
+    colors = np.array([c for _, c in stops], dtype=np.float64)
+    rgb = np.stack([np.interp(t, pos, colors[:, ch]) for ch in range(3)], axis=-1)
+    rgb[np.isnan(values)] = (230, 230, 230)
+    return rgb.round().astype(np.uint8)
+
+
+def render_heatmap(result: WhatIfResult, metric="speed", move_index=0, font_path=None, max_width=MAX_IMAGE_WIDTH):
+    """热力图：行 = 配队 (左侧标注成员与金数)，列 = 常量网格点，顶部标注指标、范围与变化的常量"""
+    data = result.metric(metric, move_index)
+    n_teams, n_points = data.shape
+    avail = max_width - LABEL_WIDTH - 10
+    cell_w = max(1, min(24, avail // max(n_points, 1)))
+    # 网格点多于可用像素时按列框采样缩小 (完整数据见 CSV)
+    plot_w = min(cell_w * n_points, avail)
+    width = LABEL_WIDTH + plot_w + 10
+    height = HEADER_HEIGHT + CELL_HEIGHT * n_teams + 10
+
+    finite = data[np.isfinite(data)]
+    lo, hi = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 1.0)
+    if metric == "delta":
+        bound = max(abs(lo), abs(hi), 1e-9)
+        lo, hi, stops = -bound, bound, DIVERGING_STOPS
+    else:
+        stops = SEQUENTIAL_STOPS
+
+    cells = _colorize(data, stops, lo, hi)
+    cells = Image.fromarray(np.repeat(np.repeat(cells, CELL_HEIGHT, axis=0), cell_w, axis=1), "RGB")
+    if cells.width > plot_w:
+        cells = cells.resize((plot_w, cells.height), Image.BOX)
+    img = Image.new("RGB", (width, height), "white")
+    img.paste(cells, (LABEL_WIDTH, HEADER_HEIGHT))
+
+    draw = ImageDraw.Draw(img)
+    font = font_registry.get(font_path, 12)
+    title = METRICS[metric]
+    if metric != "max_moves":
+        title += f" ({int(result.moves[move_index])} 动)"
+    else:
+        title += f" (面板速度 {result.panel_speed:g})"
+    draw.text((10, 6), f"{title}   范围 {lo:.1f} ~ {hi:.1f}", fill="black", font=font)
+    axes = "  ".join(f"{k}: {result.grid[k].min():g}~{result.grid[k].max():g}" for k in result.varying_keys())
+    per_px = f" (每像素约 {n_points / plot_w:.1f} 个)" if cell_w * n_points > plot_w else ""
+    draw.text((10, 24), f"{result.n_points} 个网格点{per_px}  {axes or '常量未变化'}", fill="#555555", font=font)
+    for t, team in enumerate(result.teams):
+        y = HEADER_HEIGHT + t * CELL_HEIGHT + 1
+        draw.text((10, y), f"[{int(result.cost[t])}] {' / '.join(team)}", fill="black", font=font)
+    return img
+
+
+def write_csv(result: WhatIfResult, f):
+    """长表：每行一个 (网格点, 配队, 目标回合)，附带相对基准常量的变化"""
+    writer = csv.writer(f)
+    writer.writerow(list(CONSTANT_KEYS) + ["team", "cost", "moves", "speed", "speed_delta",
+                                           "panel_speed", "max_moves", "max_moves_delta"])
+    team_labels = ["|".join(team) for team in result.teams]
+    grid_rows = np.column_stack([result.grid[k] for k in CONSTANT_KEYS]).tolist()
+    for g, consts in enumerate(grid_rows):
+        speed = np.round(result.speed[g], 4).tolist()
+        delta = np.round(result.speed[g] - result.baseline_speed, 4).tolist()
+        mm = result.max_moves[g].tolist()
+        mm_delta = (result.max_moves[g] - result.baseline_moves).tolist()
+        for t, label in enumerate(team_labels):
+            for m, mv in enumerate(result.moves.tolist()):
+                writer.writerow(consts + [label, int(result.cost[t]), mv, speed[t][m], delta[t][m],
+                                          result.panel_speed, mm[t], mm_delta[t]])
+
+
+def main(argv=None):
+    from batch import load_candidates, parse_int_list
+
+    parser = argparse.ArgumentParser(description="公式常量网格扫描 (热力图 / CSV)")
+    parser.add_argument("--candidates", help="候选角色 JSON 文件，默认使用 roster.json")
+    parser.add_argument("--base-spd", help="流萤基础速度取值，如 104 或 100:110:2")
+    parser.add_argument("--ult-flat", help="终结技固定加速取值")
+    parser.add_argument("--summon-speed", help="倒计时速度取值")
+    parser.add_argument("--moves", default="4,5", help="目标回合，如 4-8")
+    parser.add_argument("--panel-speed", type=float, default=160.0, help="计算可达回合数时的面板速度")
+    parser.add_argument("--metric", choices=list(METRICS), default="speed", help="热力图指标")
+    parser.add_argument("-o", "--output", help="热力图 PNG 路径")
+    parser.add_argument("--csv", help="CSV 路径，- 表示标准输出")
+    parser.add_argument("--font", help="热力图字体路径")
+    args = parser.parse_args(argv)
+
+    try:
+        grid = constant_grid(firefly_base_spd=args.base_spd and parse_values(args.base_spd),
+                             firefly_ult_flat=args.ult_flat and parse_values(args.ult_flat),
+                             summon_speed=args.summon_speed and parse_values(args.summon_speed))
+    except ValueError as e:
+        parser.error(str(e))
+    if np.any(grid["summon_speed"] <= 0):
+        parser.error("倒计时速度必须大于 0")
+
+    t0 = time.perf_counter()
+    result = sweep(load_candidates(args.candidates), grid, parse_int_list(args.moves), args.panel_speed)
+    elapsed = time.perf_counter() - t0
+    print(f"{result.n_points} 个网格点 × {len(result.teams)} 个配队 × {len(result.moves)} 个回合，"
+          f"用时 {elapsed * 1000:.1f}ms", file=sys.stderr)
+
+    if args.output:
+        render_heatmap(result, args.metric, font_path=args.font).save(args.output)
+        print(f"热力图: {args.output}", file=sys.stderr)
+    if args.csv == "-":
+        write_csv(result, sys.stdout)
+    elif args.csv:
+        with open(args.csv, "w", encoding="utf-8", newline="") as f:
+            write_csv(result, f)
+        print(f"CSV: {args.csv}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()